@@ -0,0 +1,136 @@
+"""
+Load-test a story graph with many simultaneous novel runs against a local OpenAI-compatible stand-in server.
+
+Starts --runs runs at once, each on its own thread id of one compiled graph (in-memory checkpointer,
+human-feedback interrupt answered with "approve"). By default every run is driven with ainvoke on one
+event loop, the way `langgraph dev` and the platform server drive them; --sync drives each run with
+invoke on its own OS thread instead, for comparison. Start the server first, e.g.:
+
+    python ../2_SlidesTranslator/benchmarks/fake_openai_server.py --port 8765 --array-len 3 --latency fixed:0.2
+
+then:
+
+    python benchmarks/load_story_runs.py --runs 50
+    python benchmarks/load_story_runs.py --runs 50 --sync
+
+The nodes' progress output is discarded. Prints a JSON report with wall time, completed runs per
+minute, per-run latency, the peak number of Python threads and the server-side request statistics.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from run_story_e2e import SRC_DIR, fetch_stats
+
+
+class ThreadSampler:
+    """samples threading.active_count() in the background and keeps the peak"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_config(index: int) -> dict:
+    return {"configurable": {"thread_id": f"load-{index}"}, "recursion_limit": 5000}
+
+
+def sync_run(graph, index: int, inputs: dict) -> float:
+    config = run_config(index)
+    start = time.perf_counter()
+    graph.invoke(inputs, config)
+    graph.update_state(config, {"human_feedback": "approve"}, as_node="human_feedback")
+    graph.invoke(None, config)
+    return time.perf_counter() - start
+
+
+async def async_run(graph, index: int, inputs: dict) -> float:
+    config = run_config(index)
+    start = time.perf_counter()
+    await graph.ainvoke(inputs, config)
+    await graph.aupdate_state(config, {"human_feedback": "approve"}, as_node="human_feedback")
+    await graph.ainvoke(None, config)
+    return time.perf_counter() - start
+
+
+async def async_runs(graph, runs: int, inputs: dict) -> list:
+    return await asyncio.gather(*(async_run(graph, i, inputs) for i in range(runs)))
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many story graphs at once against a local OpenAI-compatible server")
+    parser.add_argument("--story", choices=["English", "Chinese"], default="English")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8765/v1")
+    parser.add_argument("--prompt", default="A lighthouse keeper discovers the sea is slowly forgetting its own tides.")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--sync", action="store_true", help="drive each run with invoke on its own thread")
+    args = parser.parse_args()
+
+    # must be set before the graph module builds its model
+    os.environ["DEEPSEEK_API_BASE"] = args.base_url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "sk-local")
+    sys.path.insert(0, SRC_DIR)
+
+    import importlib
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    module = importlib.import_module(f"{args.story}_Story.graph")
+    graph = module.builder.compile(checkpointer=InMemorySaver(), interrupt_before=["human_feedback"])
+    inputs = {"messages": [{"role": "user", "content": args.prompt}]}
+
+    request = urllib.request.Request(args.base_url.rsplit("/v1", 1)[0] + "/config", method="POST",
+                                     data=json.dumps({"reset_stats": True}).encode())
+    urllib.request.urlopen(request).close()
+
+    start = time.perf_counter()
+    with ThreadSampler() as threads, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if args.sync:
+            with ThreadPoolExecutor(max_workers=args.runs) as pool:
+                latencies = list(pool.map(lambda i: sync_run(graph, i, inputs), range(args.runs)))
+        else:
+            latencies = asyncio.run(async_runs(graph, args.runs, inputs))
+    elapsed = time.perf_counter() - start
+
+    server = fetch_stats(args.base_url)
+    report = {
+        "story": args.story,
+        "mode": "sync" if args.sync else "async",
+        "runs": args.runs,
+        "elapsed_seconds": round(elapsed, 3),
+        "runs_per_minute": round(args.runs / elapsed * 60, 1),
+        "run_seconds": {"p50": round(percentile(latencies, 0.5), 3), "p95": round(percentile(latencies, 0.95), 3),
+                        "max": round(max(latencies), 3)},
+        "peak_threads": threads.peak,
+        "server": {key: server[key] for key in ("requests", "requests_per_second", "max_in_flight", "status")},
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Run a story graph end to end against a local OpenAI-compatible stand-in server.
+
+The graphs build their model with `init_chat_model(model_provider="deepseek", ...)`,
+which reads `DEEPSEEK_API_BASE` / `DEEPSEEK_API_KEY` from the environment, so no code
+change is needed to point them at a local server. Start the server first, e.g.:
+
+    python ../2_SlidesTranslator/benchmarks/fake_openai_server.py --port 8765 --array-len 3 --latency exp:0.05
+
+then:
+
+    python benchmarks/run_story_e2e.py --story English --base-url http://127.0.0.1:8765/v1
+    python benchmarks/run_story_e2e.py --outline-mode parallel --outline-reconcile
+    python benchmarks/run_story_e2e.py --writing-mode parallel --writing-concurrency 8
+
+The human-feedback interrupt is answered with "approve" automatically. Prints a JSON
+report with wall time, node counts and the server-side request/token statistics.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import urllib.request
+from collections import Counter
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def fetch_stats(base_url: str) -> dict:
+    with urllib.request.urlopen(base_url.rsplit("/v1", 1)[0] + "/stats") as resp:
+        return json.loads(resp.read())
+
+
+class TimedSerializer:
+    """wraps the checkpointer's serializer to accumulate the time spent serializing state"""
+
+    def __init__(self, serde):
+        self.serde = serde
+        self.dump_seconds = 0.0
+        self.dumps = 0
+
+    def dumps_typed(self, obj):
+        start = time.perf_counter()
+        try:
+            return self.serde.dumps_typed(obj)
+        finally:
+            self.dump_seconds += time.perf_counter() - start
+            self.dumps += 1
+
+    def loads_typed(self, data):
+        return self.serde.loads_typed(data)
+
+
+def checkpoint_report(saver, serde: TimedSerializer) -> dict:
+    """bytes the checkpointer stored (in total, and the largest single version of each channel) and serialization time"""
+    largest = Counter()
+    total = 0
+    for (_, _, channel, _), (_, data) in saver.blobs.items():
+        total += len(data)
+        largest[channel] = max(largest[channel], len(data))
+    return {
+        "total_bytes": total,
+        "largest_channel_bytes": dict(largest.most_common(6)),
+        "serialize_calls": serde.dumps,
+        "serialize_seconds": round(serde.dump_seconds, 3),
+    }
+
+
+def speculation_report(stats) -> dict:
+    if not stats:
+        return {}
+    attempts = stats["hits"] + stats["misses"]
+    return {**stats, "hit_rate": round(stats["hits"] / attempts, 3) if attempts else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a story graph against a local OpenAI-compatible server")
+    parser.add_argument("--story", choices=["English", "Chinese"], default="English")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8765/v1")
+    parser.add_argument("--prompt", default="A lighthouse keeper discovers the sea is slowly forgetting its own tides.")
+    parser.add_argument("--outline-mode", choices=["sequential", "parallel"], default="sequential")
+    parser.add_argument("--outline-concurrency", type=int, default=8)
+    parser.add_argument("--outline-reconcile", action="store_true")
+    parser.add_argument("--summary-token-budget", type=int, default=2000)
+    parser.add_argument("--summary-keep-chapters", type=int, default=5)
+    parser.add_argument("--retrieval-token-budget", type=int, default=1500)
+    parser.add_argument("--manuscript-dir", default=None, help="write manuscript chunks to a JSONL file here")
+    parser.add_argument("--no-pipeline-summaries", action="store_true",
+                        help="summarize each scene before moving on instead of in the background")
+    parser.add_argument("--speculative", action="store_true",
+                        help="draft the next scene while the editor reviews the current one")
+    parser.add_argument("--writing-mode", choices=["sequential", "parallel"], default="sequential")
+    parser.add_argument("--writing-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    # must be set before the graph module builds its model
+    os.environ["DEEPSEEK_API_BASE"] = args.base_url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "sk-local")
+    sys.path.insert(0, SRC_DIR)
+
+    import importlib
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    module = importlib.import_module(f"{args.story}_Story.graph")
+    serde = TimedSerializer(JsonPlusSerializer())
+    saver = InMemorySaver(serde=serde)
+    graph = module.builder.compile(checkpointer=saver, interrupt_before=["human_feedback"])
+    config = {"configurable": {"thread_id": "e2e"}, "recursion_limit": 5000}
+
+    nodes = Counter()
+    node_seconds = Counter()
+    start = last = time.perf_counter()
+    inputs = {
+        "messages": [{"role": "user", "content": args.prompt}],
+        "outline_mode": args.outline_mode,
+        "outline_concurrency": args.outline_concurrency,
+        "outline_reconcile": args.outline_reconcile,
+        "summary_token_budget": args.summary_token_budget,
+        "summary_keep_chapters": args.summary_keep_chapters,
+        "retrieval_token_budget": args.retrieval_token_budget,
+        "pipeline_summaries": not args.no_pipeline_summaries,
+        "speculative_drafting": args.speculative,
+        "writing_mode": args.writing_mode,
+        "writing_concurrency": args.writing_concurrency,
+    }
+    if args.manuscript_dir:
+        inputs["manuscript_dir"] = args.manuscript_dir
+    for update in graph.stream(inputs, config, stream_mode="updates"):
+        nodes.update(update.keys())
+        now = time.perf_counter()
+        for name in update:
+            node_seconds[name] += now - last
+        last = now
+    graph.update_state(config, {"human_feedback": "approve"}, as_node="human_feedback")
+    for update in graph.stream(None, config, stream_mode="updates", subgraphs=True):
+        _, payload = update
+        nodes.update(payload.keys())
+        now = time.perf_counter()
+        for name in payload:
+            node_seconds[name] += now - last
+        last = now
+    elapsed = time.perf_counter() - start
+
+    state = graph.get_state(config).values
+    report = {
+        "story": args.story,
+        "elapsed_seconds": round(elapsed, 3),
+        "novel_title": state.get("novel_title"),
+        "chapters": len(state.get("chapter_outline", [])),
+        "scenes": sum(len(ch.scenes) for ch in state.get("scene_outline", [])),
+        "novel_chars": len(state.get("final_novel_text", "") or ""),
+        "summary_chars": len(state.get("novel_summary", "") or ""),
+        "node_runs": dict(nodes),
+        # time between consecutive updates, attributed to the node that produced the update
+        "node_seconds": {name: round(seconds, 3) for name, seconds in node_seconds.items()},
+        "speculation": speculation_report(state.get("speculation_stats")),
+        "checkpoints": checkpoint_report(saver, serde),
+        # peak resident memory of this process (ru_maxrss is KiB on Linux)
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "server": fetch_stats(args.base_url),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
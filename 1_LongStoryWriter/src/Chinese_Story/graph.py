@@ -1,20 +1,32 @@
-from langchain.chat_models import init_chat_model
-from typing import List
+import asyncio
+import time
+from typing import List, Optional, Tuple
 from langgraph.graph import StateGraph, START, END
 
 from Chinese_Story.state import *
 from Chinese_Story.prompts import *
+from story_common.context import OutlineContext, split_opening
+from story_common.memory import SummaryEntry, SummaryMemory
+from story_common.retrieval import index_scene, load_index
+from story_common.manuscript import append_chunk, create_manuscript, materialize
+from story_common.scene_store import content_key, get_scene, new_run_directory, put_scene, remove_run_directory
+from story_common import background
+from story_common.background import PendingSummary, SpeculativeDraft
+from story_common.runtime import chat_model, node
 
 
-llm = init_chat_model(model_provider="deepseek", model="deepseek-chat", temperature=1.1)
+llm = chat_model(model_provider="deepseek", model="deepseek-chat", temperature=1.1)
+
+# 推测式写作的统计
+SPECULATION_STATS = {'hits': 0, 'misses': 0, 'saved_seconds': 0.0}
 
 # 概念发展者节点：
-def concept_developer(state: NovelState):
+async def concept_developer(state: NovelState):
     print("---🧠 执行: 概念开发者 ---")
     prompt = CONCEPT_DEVELOPER_PROMPT.format(user_prompt=state['messages'][-1].content, 
                                              human_feedback = state.get('human_feedback', ''))
     structured_llm = llm.with_structured_output(ConceptOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     print(f"   - 类型: {result.genre}")
     print(f"   - 核心价值: {result.core_value}")
     print(f"   - 故事梗概: {result.logline}")
@@ -23,29 +35,29 @@ def concept_developer(state: NovelState):
            'core_value': result.core_value, 'logline': result.logline}
 
 # 世界观设定节点：
-def world_builder(state: NovelState):
+async def world_builder(state: NovelState):
     print("---🌍 执行: 世界观构建师 ---")
     prompt = WORLD_BUILDER_PROMPT.format(logline=state['logline'], genre=state['genre'],
                                          target_audience = state['target_audience'], 
                                          core_value = state['core_value'])
     structured_llm = llm.with_structured_output(WorldSetting)
-    response = structured_llm.invoke(prompt)
+    response = await structured_llm.ainvoke(prompt)
     print("   - 世界观设定已生成。")
     return {'world_setting': response}
 
 # 角色设计节点
-def character_designer(state: NovelState):
+async def character_designer(state: NovelState):
     print("---👥 执行: 角色设计师 ---")
     prompt = CHARACTER_DESIGNER_PROMPT.format(logline=state['logline'], 
                                               core_value = state['core_value'],
                                               world_setting=state['world_setting'])
     structured_llm = llm.with_structured_output(CharacterListOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     print(f"   - 已设计 {len(result.characters)} 个角色")
     return {'characters': result.characters}
 
 # 情节架构设计节点
-def plot_structurer(state: NovelState):
+async def plot_structurer(state: NovelState):
     print("---📈 执行: 情节架构师 ---")
     character_list = [f"- {name}: {char}" for name, char in ((c.name, c) for c in state['characters'])]
     character_summaries = "\n".join(character_list)
@@ -53,13 +65,13 @@ def plot_structurer(state: NovelState):
                                            core_value = state['core_value'],
                                            character_summaries=character_summaries)
     structured_llm = llm.with_structured_output(PlotStructureOutput) 
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     print(f"   - 已规划好情节架构。")
     
     return {'plot_structure': result.plots}
 
 # 构建一个专门的 human feedback node / dummy node，然后在这个节点打断点，等待用户指示
-def human_feedback(state: NovelState):
+async def human_feedback(state: NovelState):
     """ No-op node that should be interrupted on """
     pass
     
@@ -76,7 +88,7 @@ def should_continue(state: NovelState):
     return "world_builder"
 
 # 编写章节大纲节点
-def chapter_outliner(state: NovelState):
+async def chapter_outliner(state: NovelState):
     print("---📖 执行: 章节大纲师 ---")
     plot_structure_summary = "\n".join([f"- {p.name}: {p.description}" for p in state['plot_structure']])
     character_list = [f"- {name}: {char}" for name, char in ((c.name, c) for c in state['characters'])]
@@ -85,7 +97,7 @@ def chapter_outliner(state: NovelState):
                                             character_summaries = character_summaries,
                                             plot_structure_summary=plot_structure_summary)
     structured_llm = llm.with_structured_output(ChapterOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     print(f"   - 已创建 {len(result.chapters)} 个章节大纲。")
 
     return {'chapter_outline': result.chapters}
@@ -109,39 +121,103 @@ def to_readable_str(data: List) -> str:
     else:
         return ''
 
-def scene_outliner(state: NovelState):
-    print("---🎬 执行: 场景大纲师 ---")
+def chapter_digest(chapters: List[Chapter], index: int) -> str:
+    """
+    单独为某一章编写场景大纲时使用的精简前后文：
+    全书所有章节的标题，加上前一章和后一章的完整章节摘要
+    """
+    lines = ["章节列表："]
+    lines += [f"- 第{ch.chapter_id}章：{ch.title}" for ch in chapters]
+    if index > 0:
+        prev = chapters[index - 1]
+        lines.append(f"上一章（第{prev.chapter_id}章）：{prev.outline}")
+    if index + 1 < len(chapters):
+        nxt = chapters[index + 1]
+        lines.append(f"下一章（第{nxt.chapter_id}章）：{nxt.outline}")
+    return "\n".join(lines)
+
+def scene_outline_prompt(state: NovelState, chapter: Chapter, written_scene_outline: str) -> str:
     character_list = [f"- {name}: {char}" for name, char in ((c.name, c) for c in state['characters'])]
     character_summaries = "\n".join(character_list)
-    world_setting_summary = state['world_setting']
-    
-    res = []
-    structured_llm = llm.with_structured_output(SceneOutput)
-    for chapter in state['chapter_outline']:
-        print(f"   - 正在为章节 '{chapter.chapter_id}' 创建场景...")
-        prompt = SCENE_OUTLINER_PROMPT.format(
-            chapter_id=chapter.chapter_id,
-            chapter_title=chapter.title,
-            chapter_summary=chapter.outline,
-            logline = state['logline'], 
-            character_summaries=character_summaries,
-            world_setting_summary=world_setting_summary,
-            written_scene_outline=to_readable_str(res)
+    return SCENE_OUTLINER_PROMPT.format(
+        chapter_id=chapter.chapter_id,
+        chapter_title=chapter.title,
+        chapter_summary=chapter.outline,
+        logline = state['logline'], 
+        character_summaries=character_summaries,
+        world_setting_summary=state['world_setting'],
+        written_scene_outline=written_scene_outline
+    )
+
+def number_scenes(result: SceneOutput, chapter: Chapter) -> SceneOutput:
+    """更新章节的场景列表，并确保chapter_id和scene_id正确"""
+    result.chapter_id = chapter.chapter_id
+    result.title = chapter.title
+    for i, scene in enumerate(result.scenes):
+        scene.scene_id = i + 1
+        scene.status = "pending"
+    return result
+
+async def reconcile_boundaries(state: NovelState, res: List[SceneOutput]) -> List[SceneOutput]:
+    """
+    对所有章节交界处（上一章最后一个场景 + 下一章第一个场景）做一次 LLM 校对，
+    修正各章独立编写场景大纲带来的衔接问题
+    """
+    boundaries = []
+    for prev, nxt in zip(res, res[1:]):
+        if not prev.scenes or not nxt.scenes:
+            continue
+        last, first = prev.scenes[-1], nxt.scenes[0]
+        boundaries.append(
+            f"第{prev.chapter_id}章结尾（场景{last.scene_id}；{','.join(last.characters)}）：{last.outline}\n"
+            f"第{nxt.chapter_id}章开头（场景{first.scene_id}；{','.join(first.characters)}）：{first.outline}"
         )
-        result = structured_llm.invoke(prompt)
-        # 更新章节的场景列表，并确保chapter_id和scene_id正确
-        result.chapter_id = chapter.chapter_id
-        result.title = chapter.title
-        for i, scene in enumerate(result.scenes):
-            scene.scene_id = i + 1
-            scene.status = "pending"
-        
-        res.append(result)
+    if not boundaries:
+        return res
+
+    prompt = OUTLINE_RECONCILER_PROMPT.format(logline=state['logline'], boundaries="\n\n".join(boundaries))
+    result = await llm.with_structured_output(OutlineFixOutput).ainvoke(prompt)
+    scenes = {(ch.chapter_id, sc.scene_id): sc for ch in res for sc in ch.scenes}
+    fixed = 0
+    for fix in result.fixes:
+        scene = scenes.get((fix.chapter_id, fix.scene_id))
+        if scene is not None and fix.outline:
+            scene.outline = fix.outline
+            fixed += 1
+    print(f"   - 已修正章节交界处的 {fixed} 个场景大纲。")
+    return res
+
+async def scene_outliner(state: NovelState):
+    print("---🎬 执行: 场景大纲师 ---")
+    chapters = state['chapter_outline']
+    structured_llm = llm.with_structured_output(SceneOutput)
+
+    if state.get('outline_mode', 'sequential') == 'parallel':
+        # 每章只依赖章节速览，所有章节可以同时编写
+        concurrency = state.get('outline_concurrency', 8)
+        print(f"   - 正在并行为 {len(chapters)} 个章节创建场景（并发数: {concurrency}）...")
+        prompts = [scene_outline_prompt(state, chapter, chapter_digest(chapters, i)) for i, chapter in enumerate(chapters)]
+        results = await structured_llm.abatch(prompts, config={"max_concurrency": concurrency})
+        res = [number_scenes(result, chapter) for result, chapter in zip(results, chapters)]
+        if state.get('outline_reconcile', False):
+            res = await reconcile_boundaries(state, res)
+    else:
+        # 最近几章提供完整的场景大纲，更早的章节只提供章节摘要，总长度受 token 预算限制
+        context = OutlineContext(state.get('outline_token_budget', 3000), state.get('outline_window', 3))
+        res = []
+        for chapter in chapters:
+            print(f"   - 正在为章节 '{chapter.chapter_id}' 创建场景...")
+            result = await structured_llm.ainvoke(scene_outline_prompt(state, chapter, context.render()))
+            result = number_scenes(result, chapter)
+            res.append(result)
+            context.append(to_readable_str([result]), f"【第{chapter.chapter_id}章】{chapter.title}：{chapter.outline}")
     print("---✅ 所有章节的场景大纲创建完成 ---")
-    return {'scene_outline': res}
+    # 场景正文写入 manuscript_dir；未设置时写入本次运行专属的目录，由最终命名师在结束时删除
+    store_dir = state.get('store_dir') or state.get('manuscript_dir') or new_run_directory()
+    return {'scene_outline': res, 'store_dir': store_dir}
 
 # 场景选择器节点
-def scene_selector(state: WritingState):
+async def scene_selector(state: WritingState):
     """
     逻辑节点：确定下一个要写的场景。
     """
@@ -157,15 +233,35 @@ def scene_selector(state: WritingState):
 
     # 如果所有场景都已写完
     print("---✅ 所有场景已写完，退出写作循环 ---")
-    return {'is_finished': True}
+    stats = state.get('speculation_stats')
+    if stats:
+        print(f"   - 推测式写作：命中 {stats['hits']} 次，未命中 {stats['misses']} 次，节省 {stats['saved_seconds']:.1f} 秒。")
+    return {'is_finished': True, **(await merge_pending_summary(state))}
 
 # 书写节点
-def writer(state: WritingState):
+KIND_LABELS = {"summary": "概要", "content": "原文"}
+
+def search_passages(state: WritingState, scene: Scene) -> str:
     """
-    LLM节点：执笔者，根据场景大纲写作。
+    按场景的角色和大纲检索已定稿场景的 BM25 索引，返回不超过 retrieval_token_budget 的最相关前文片段
+    """
+    budget = state.get('retrieval_token_budget', 1500)
+    index = load_index(state.get('scene_index')) if budget > 0 else None
+    if index is None:
+        return ""
+    query = " ".join(scene.characters) + "\n" + scene.outline
+    load = lambda key: get_scene(key, state['store_dir'])
+    return index.render(query, budget, lambda passage, text: (
+        f"【第{passage.chapter_id}章第{passage.scene_id}个场景·{KIND_LABELS[passage.kind]}】{text}"), load)
+
+async def retrieve_passages(state: WritingState, scene: Scene) -> str:
+    """在工作线程中执行 search_passages：读取索引文件和场景正文是阻塞的磁盘 I/O，不占用共享事件循环"""
+    return await asyncio.to_thread(search_passages, state, scene)
+
+async def draft_scene(state: WritingState) -> str:
+    """
+    为当前场景写草稿；修订时根据编辑意见改写上一版草稿
     """
-    print(f"---✍️  执行: 执笔者 (修订次数: {state.get('revision_count','')}) ---")
-    
     # 获取当前场景信息
     current_chapter = next(ch for ch in state['scene_outline'] if ch.chapter_id == state['current_chapter_id'])
     current_scene = next(sc for sc in current_chapter.scenes if sc.scene_id == state['current_scene_id'])
@@ -177,6 +273,7 @@ def writer(state: WritingState):
     # 获取小说总结和上一场景内容
     novel_summary = state.get('novel_summary', '')
     last_scene_content = state.get('last_scene_content', '')
+    retrieved_passages = await retrieve_passages(state, current_scene)
 
     # 编辑提示词
     prompt = WRITER_PROMPT.format(
@@ -189,7 +286,8 @@ def writer(state: WritingState):
             characters=character_summaries,
             world_setting=state['world_setting'],
             novel_summary = novel_summary,
-            last_scene_content = last_scene_content
+            last_scene_content = last_scene_content,
+            retrieved_passages = retrieved_passages
         )
     # 如果是修订，加入编辑意见
     if state.get('revision_count', 0) > 0:
@@ -197,26 +295,106 @@ def writer(state: WritingState):
         draft = state.get('draft_content', '')
         prompt += f"\n\n这是你之前写的草稿: {draft}\n\n**编辑修改意见**:\n{review_feedback}\n\n请根据以上意见，对草稿进行修改。"
     
-    response = llm.invoke(prompt)
-    draft_content = response.content.strip()
-    # draft_content = "Good"
+    response = await llm.ainvoke(prompt)
+    return response.content.strip()
+
+async def timed_draft(state: WritingState) -> Tuple[str, float]:
+    start = time.perf_counter()
+    return await draft_scene(state), time.perf_counter() - start
+
+def next_pending_scene(state: WritingState) -> Optional[Tuple[int, int]]:
+    """当前场景定稿后，场景调度器将选中的下一个场景"""
+    for chapter in state['scene_outline']:
+        for scene in chapter.scenes:
+            if scene.status == "pending" and (chapter.chapter_id, scene.scene_id) != (
+                    state['current_chapter_id'], state['current_scene_id']):
+                return chapter.chapter_id, scene.scene_id
+    return None
+
+def start_speculation(state: WritingState) -> Optional[SpeculativeDraft]:
+    """
+    在后台提前写下一个场景的草稿（接续当前草稿），并为当前草稿生成概要——押注编辑会原样通过当前草稿
+    """
+    next_scene = next_pending_scene(state)
+    if next_scene is None:
+        return None
+    speculative_state = {**state, 'current_chapter_id': next_scene[0], 'current_scene_id': next_scene[1],
+                         'revision_count': 0, 'last_scene_content': state['draft_content'][-500:]}
+    job_id = background.submit(timed_draft(speculative_state))
+    based_on = content_key(state['draft_content'])
+    summary_job_id = background.submit(summarize_scene(state, state['current_chapter_id'], state['current_scene_id'],
+                                                      state['draft_content'], based_on))
+    print(f"   - 审核期间推测式写作第{next_scene[0]}章第{next_scene[1]}个场景。")
+    return SpeculativeDraft(job_id=job_id, chapter_id=next_scene[0], scene_id=next_scene[1],
+                            after_chapter_id=state['current_chapter_id'], after_scene_id=state['current_scene_id'],
+                            based_on=based_on, summary_job_id=summary_job_id)
+
+async def take_speculation(state: WritingState, speculation: SpeculativeDraft) -> Tuple[Optional[str], dict]:
+    """
+    推测草稿基于的正是定稿的那一版时直接采用；返回草稿（未命中时为 None）和更新后的推测统计
+    """
+    stats = {**SPECULATION_STATS, **state.get('speculation_stats', {})}
+    previous = next((sc for ch in state['scene_outline'] if ch.chapter_id == speculation.after_chapter_id
+                     for sc in ch.scenes if sc.scene_id == speculation.after_scene_id), None)
+    valid = ((speculation.chapter_id, speculation.scene_id) == (state['current_chapter_id'], state['current_scene_id'])
+             and state.get('revision_count', 0) == 0
+             and previous is not None and previous.content_ref == speculation.based_on)
+    async def no_draft():
+        # 后台任务不在当前进程中（从 checkpoint 恢复），改为重新写作
+        return None, 0.0
+
+    draft_content = None
+    if valid:
+        start = time.perf_counter()
+        try:
+            draft_content, seconds = await background.collect(speculation.job_id, no_draft)
+        except Exception as e:
+            print(f"   - 推测草稿生成失败: {e}")
+        waited = time.perf_counter() - start
+    else:
+        background.discard(speculation.job_id)
+    if draft_content:
+        stats['hits'] += 1
+        stats['saved_seconds'] = round(stats['saved_seconds'] + max(seconds - waited, 0.0), 3)
+        print(f"   - 推测草稿命中，节省 {max(seconds - waited, 0.0):.2f} 秒。")
+    else:
+        draft_content = None
+        stats['misses'] += 1
+        print("   - 推测草稿已丢弃。")
+    return draft_content, {'speculative_draft': None, 'speculation_stats': stats}
+
+async def writer(state: WritingState):
+    """
+    LLM节点：执笔者，根据场景大纲写作。
+    """
+    print(f"---✍️  执行: 执笔者 (修订次数: {state.get('revision_count','')}) ---")
+
+    draft_content, update = None, {}
+    if state.get('speculative_draft') is not None:
+        draft_content, update = await take_speculation(state, state['speculative_draft'])
+    if draft_content is None:
+        draft_content = await draft_scene(state)
     
     print(f"   - 草稿已生成 (长度: {len(draft_content)})")
-    return {'draft_content': draft_content}
+    return {'draft_content': draft_content, **update}
 
 # 编辑审核节点
-def editor(state: WritingState):
+async def editor(state: WritingState):
     """
     LLM节点：编辑，审核草稿质量。
     """
     print("---👀 执行: 编辑 ---")
 
+    # 上一个场景的概要在本场景写作期间生成，审核前先合并
+    merged = await merge_pending_summary(state)
+    state = {**state, **merged}
+
     # 检查修订次数
     if state['revision_count'] >= 3:
         print(f"   - 警告：修订次数已达上限 ({state['revision_count']})，强制通过。")
         next_action = "approve"
         review_feedback = f"（自动通过）修订次数已达 {state['revision_count']} 次。为避免无限循环，此稿被强制接受。可能仍存在细微瑕疵，但整体可以接受。"
-        return {'next_action': next_action, 'review_feedback': review_feedback}
+        return {'next_action': next_action, 'review_feedback': review_feedback, **merged}
     
     # 获取当前场景信息
     current_chapter = next(ch for ch in state['scene_outline'] if ch.chapter_id == state['current_chapter_id'])
@@ -229,6 +407,7 @@ def editor(state: WritingState):
     # 获取小说总结和上一场景内容
     novel_summary = state.get('novel_summary', '')
     last_scene_content = state.get('last_scene_content', '')
+    retrieved_passages = await retrieve_passages(state, current_scene)
     
     # 编辑提示词
     prompt = EDITOR_PROMPT.format(
@@ -239,16 +418,28 @@ def editor(state: WritingState):
             characters=character_summaries,
             world_setting=state['world_setting'],
             novel_summary = novel_summary,
-            last_scene_content = last_scene_content
+            last_scene_content = last_scene_content,
+            retrieved_passages = retrieved_passages
         )
+    # 推测模式：审核当前场景的同时提前写下一个场景
+    speculation = start_speculation(state) if state.get('speculative_drafting') else None
     structured_llm = llm.with_structured_output(EditorOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
+    update = {'speculative_draft': speculation}
+    if speculation is not None and result.decision != "approve":
+        # 当前草稿需要修订，下一个场景应接续修订后的版本
+        background.discard(speculation.job_id)
+        background.discard(speculation.summary_job_id)
+        stats = {**SPECULATION_STATS, **state.get('speculation_stats', {})}
+        stats['misses'] += 1
+        update = {'speculative_draft': None, 'speculation_stats': stats}
+        print("   - 推测草稿已丢弃。")
     print(f"   - 编辑决定: {result.decision}")
     print(f"   - 反馈: {result.feedback[:100]}...")
-    return {'next_action': result.decision, 'review_feedback': result.feedback}
+    return {'next_action': result.decision, 'review_feedback': result.feedback, **merged, **update}
 
 # 记录修订次数节点
-def reviser(state: WritingState):
+async def reviser(state: WritingState):
     """
     逻辑节点：增加修订计数，并导向 writer 节点。
     """
@@ -259,7 +450,57 @@ def reviser(state: WritingState):
     return {'revision_count': count}
 
 # 定稿节点
-def content_approver(state: WritingState):
+async def roll_up_summaries(state: WritingState, memory: SummaryMemory, chapter_id: int):
+    """
+    将已完成章节的场景概要汇总为章节总结，超出最近 summary_keep_chapters 章的章节总结并入前情总结
+    """
+    while (finished := memory.finished_chapter(chapter_id)) is not None:
+        finished_id, scene_summaries = finished
+        prompt = CHAPTER_SUMMARY_PROMPT.format(chapter_id=finished_id, scene_summaries="\n\n".join(scene_summaries))
+        response = await llm.ainvoke(prompt)
+        memory.close_chapter(finished_id, f"第{finished_id}章总结：{response.content.strip()}")
+        print(f"   - 第{finished_id}章的场景概要已汇总为章节总结。")
+    for entry in memory.chapters_to_fold(state.get('summary_keep_chapters', 5)):
+        prompt = ARC_SUMMARY_PROMPT.format(arc_summary=memory.arc, chapter_summary=entry.text)
+        memory.arc = (await llm.ainvoke(prompt)).content.strip()
+        print(f"   - 第{entry.chapter_id}章已并入前情总结。")
+
+async def summarize_scene(state: WritingState, ch_id: int, sc_id: int, content: str, content_ref: str) -> dict:
+    """
+    为定稿场景生成概要，并入分层滚动总结并加入检索索引，返回 state 更新（开启 pipeline_summaries 时在后台运行）
+    """
+    prompt = SUMMARY_PROMPT.format(scene_content = content)
+    response = await llm.ainvoke(prompt)
+    scene_summary = f"第{ch_id}章第{sc_id}个场景概要：{response.content.strip()}"
+    # 分层滚动总结：无论小说多长，novel_summary 都不超过固定的 token 预算
+    memory = (state.get('summary_memory') or SummaryMemory()).model_copy(deep=True)
+    await roll_up_summaries(state, memory, ch_id)
+    memory.add_scene(ch_id, sc_id, scene_summary)
+    novel_summary = memory.render(state.get('summary_token_budget', 2000))
+    # 将定稿场景加入检索索引，供后续场景检索前文
+    index = state.get('scene_index')
+    if state.get('retrieval_token_budget', 1500) > 0:
+        index = index_scene(index, state['store_dir'], ch_id, sc_id, response.content.strip(), content, ref=content_ref)
+    print(f"   - 小说总结已更新（第{ch_id}章第{sc_id}个场景）。")
+    return {'summary_memory': memory, 'novel_summary': novel_summary, 'scene_index': index, 'pending_summary': None}
+
+async def merge_pending_summary(state: WritingState) -> dict:
+    """
+    等待上一个定稿场景的后台概要（如果有）并返回其 state 更新；
+    后台任务不在当前进程中时（如从检查点恢复）重新同步生成
+    """
+    pending = state.get('pending_summary')
+    if pending is None:
+        return {}
+    return await background.collect(pending.job_id, lambda: summarize_scene(
+        state, pending.chapter_id, pending.scene_id,
+        get_scene(pending.content_ref, state['store_dir']), pending.content_ref))
+
+def scene_chunk(chapter: SceneOutput, scene: Scene, content: str) -> str:
+    """一个定稿场景在正文中的文本块"""
+    return f"## [章节 {chapter.chapter_id}] {chapter.title}\n\n### 场景 {scene.scene_id}: \n\n{content}\n"
+
+async def content_approver(state: WritingState):
     """
     逻辑节点：定稿，将草稿内容写入最终文本。
     """
@@ -273,26 +514,130 @@ def content_approver(state: WritingState):
         if chapter.chapter_id == ch_id:
             for scene in chapter.scenes:
                 if scene.scene_id == sc_id:
-                    scene.content = state['draft_content']
+                    # 正文写入按内容寻址的场景存储，大纲中只保存它的键
+                    content = state['draft_content']
+                    scene.content_ref = put_scene(content, state['store_dir'])
                     scene.status = "written"
                     
                     # 将定稿内容追加到最终小说文本
-                    final_scene_text = f"## [章节 {chapter.chapter_id}] {chapter.title}\n\n### 场景 {scene.scene_id}: \n\n{scene.content}\n"
+                    final_scene_text = scene_chunk(chapter, scene, content)
                     
                     print(f"   - 章节 {chapter.chapter_id} 场景 {scene.scene_id}' 已定稿并加入全书。")
-                    novel_summary = state.get('novel_summary', '')
-                    prompt = SUMMARY_PROMPT.format(scene_content = scene.content)
-                    response = llm.invoke(prompt)
-                    scene_summary = f"第{ch_id}章第{sc_id}个场景概要：{response.content.strip()}"
-                    # scene_summary = f"第{ch_id}章第{sc_id}个场景概要：Go"
-                    print("   - 小说总结已更新。")
-                    return {'scene_outline': scene_outline, 'final_novel_text': final_scene_text,
-                            'last_scene_content': state['draft_content'][-500:], 
-                            'novel_summary': novel_summary+"\n\n"+scene_summary}
+                    # 场景追加写入正文存储，state 中只更新引用
+                    manuscript = state.get('manuscript') or create_manuscript(state['store_dir'])
+                    manuscript = append_chunk(manuscript, final_scene_text)
+                    update = {'scene_outline': scene_outline, 'manuscript': manuscript,
+                              'last_scene_content': state['draft_content'][-500:]}
+                    job_id = None
+                    speculation = state.get('speculative_draft')
+                    if speculation is not None and speculation.summary_job_id:
+                        # 推测模式下，该草稿的概要已在审核期间开始生成
+                        if speculation.based_on == scene.content_ref:
+                            job_id = speculation.summary_job_id
+                        else:
+                            background.discard(speculation.summary_job_id)
+                    if job_id is None and state.get('pipeline_summaries', True):
+                        # 在后台生成场景概要，与下一个场景的写作同时进行，由编辑节点合并
+                        job_id = background.submit(summarize_scene(state, ch_id, sc_id, content, scene.content_ref))
+                    if job_id is None:
+                        update.update(await summarize_scene(state, ch_id, sc_id, content, scene.content_ref))
+                    else:
+                        update['pending_summary'] = PendingSummary(job_id=job_id, chapter_id=ch_id, scene_id=sc_id,
+                                                                   content_ref=scene.content_ref)
+                    return update
     
     raise ValueError("无法找到当前场景以定稿！")
 
-def final_namer(state: NovelState):
+# 并行写作节点
+def chapter_state(state: NovelState, chapter: SceneOutput) -> dict:
+    """
+    单独写作一个章节时写作子图的输入：故事设定和本章的场景大纲，
+    之前章节尚未写成，用它们的章节大纲代替章节总结
+    """
+    keep = state.get('summary_keep_chapters', 5)
+    earlier = [ch for ch in state['chapter_outline'] if ch.chapter_id < chapter.chapter_id]
+    memory = SummaryMemory(chapters=[
+        SummaryEntry(chapter_id=ch.chapter_id, text=f"第{ch.chapter_id}章《{ch.title}》大纲：{ch.outline}")
+        for ch in earlier[max(len(earlier) - keep, 0):]])
+    inputs = {key: state[key] for key in ('messages', 'genre', 'core_value', 'logline', 'characters', 'world_setting',
+                                          'chapter_outline', 'summary_token_budget', 'summary_keep_chapters',
+                                          'retrieval_token_budget', 'manuscript_dir', 'store_dir') if key in state}
+    # 每个章节同一时间只有一个 LLM 调用，进行中的调用数由 writing_concurrency 限制
+    return {**inputs, 'scene_outline': [chapter.model_copy(deep=True)], 'summary_memory': memory,
+            'novel_summary': memory.render(state.get('summary_token_budget', 2000)),
+            'pipeline_summaries': False, 'speculative_drafting': False}
+
+async def parallel_writer(state: NovelState):
+    """
+    并行模式：用写作子图写作每个章节，最多同时写作 writing_concurrency 个章节
+    """
+    print("---✍️  执行: 并行执笔者 ---")
+    chapters = state['scene_outline']
+    concurrency = state.get('writing_concurrency', 4)
+    print(f"   - 正在并行写作 {len(chapters)} 个章节（并发数: {concurrency}）...")
+    results = await chapter_writer.abatch([chapter_state(state, chapter) for chapter in chapters],
+                                          config={"max_concurrency": concurrency, "recursion_limit": 1000})
+    # 按故事顺序收集所有章节的场景概要，由章节缝合师汇总
+    memory = SummaryMemory(scenes=[entry for result in results
+                                   for entry in (result.get('summary_memory') or SummaryMemory()).scenes])
+    print("---✅ 所有章节写作完成 ---")
+    return {'scene_outline': [result['scene_outline'][0] for result in results], 'summary_memory': memory}
+
+async def regenerate_summaries(state: NovelState, scene_summaries: List[SummaryEntry]) -> SummaryMemory:
+    """
+    按故事顺序重建分层滚动总结，结果与顺序写作结束时一致：已完成的章节都汇总为章节总结
+    （章节总结同时生成，前情总结逐章合并），最后一章保留场景概要
+    """
+    chapter_ids = list(dict.fromkeys(entry.chapter_id for entry in scene_summaries))
+    if not chapter_ids:
+        return SummaryMemory()
+    memory = SummaryMemory(scenes=[entry for entry in scene_summaries if entry.chapter_id == chapter_ids[-1]])
+    prompts = [CHAPTER_SUMMARY_PROMPT.format(chapter_id=ch_id, scene_summaries="\n\n".join(
+        entry.text for entry in scene_summaries if entry.chapter_id == ch_id)) for ch_id in chapter_ids[:-1]]
+    responses = await llm.abatch(prompts, config={"max_concurrency": state.get('writing_concurrency', 4)})
+    memory.chapters = [SummaryEntry(chapter_id=ch_id, text=f"第{ch_id}章总结：{response.content.strip()}")
+                       for ch_id, response in zip(chapter_ids, responses)]
+    print(f"   - {len(memory.chapters)} 个章节的场景概要已汇总为章节总结。")
+    await roll_up_summaries(state, memory, chapter_ids[-1])
+    return memory
+
+# 章节缝合节点
+async def chapter_stitcher(state: NovelState):
+    """
+    并行模式：改写每章的开头，使其承接上一章的结尾；再按章节顺序拼装正文、重建滚动总结
+    """
+    print("---🧵 执行: 章节缝合师 ---")
+    directory = state['store_dir']
+    chapters = [chapter for chapter in state['scene_outline'] if chapter.scenes]
+
+    # 每处衔接只依赖两侧的原文，所以所有章节开头可以同时改写
+    transitions = []
+    for previous, chapter in zip(chapters, chapters[1:]):
+        first = chapter.scenes[0]
+        opening, rest = split_opening(get_scene(first.content_ref, directory))
+        prompt = CHAPTER_STITCHER_PROMPT.format(
+            genre=state['genre'], logline=state['logline'],
+            chapter_id=chapter.chapter_id, previous_chapter_id=previous.chapter_id,
+            scene_outline=first.outline, opening=opening,
+            previous_ending=get_scene(previous.scenes[-1].content_ref, directory)[-500:])
+        transitions.append((first, prompt, rest))
+    responses = await llm.abatch([prompt for _, prompt, _ in transitions],
+                                 config={"max_concurrency": state.get('writing_concurrency', 4)})
+    for (scene, _, rest), response in zip(transitions, responses):
+        scene.content_ref = put_scene(response.content.strip() + rest, directory)
+    print(f"   - 已缝合 {len(transitions)} 处章节衔接。")
+
+    manuscript = create_manuscript(directory)
+    for chapter in chapters:
+        for scene in chapter.scenes:
+            manuscript = append_chunk(manuscript, scene_chunk(chapter, scene, get_scene(scene.content_ref, directory)))
+
+    memory = await regenerate_summaries(state, (state.get('summary_memory') or SummaryMemory()).scenes)
+    print("---✅ 所有章节已缝合为全书 ---")
+    return {'scene_outline': state['scene_outline'], 'manuscript': manuscript, 'summary_memory': memory,
+            'novel_summary': memory.render(state.get('summary_token_budget', 2000))}
+
+async def final_namer(state: NovelState):
     """
     LLM节点：为完成的小说取一个有吸引力的名字。
     """
@@ -300,27 +645,31 @@ def final_namer(state: NovelState):
     
     # 为了避免将整本小说都放进 prompt（太长且昂贵），我们主要依赖核心信息和总结
     # 但可以截取最终文本的开头和结尾部分，给 LLM 一些“文风”上的感知
-    novel_preview = state['final_novel_text'][:1000] + "..." + state['final_novel_text'][-1000:]
+    final_novel_text = materialize(state.get('manuscript'))
+    novel_preview = final_novel_text[:1000] + "..." + final_novel_text[-1000:]
     
     structured_llm = llm.with_structured_output(NovelTitleOutput)
     prompt = NAMER_PROMPT.format(user_prompt = state['messages'][-1].content, genre = state['genre'],
                                 core_value = state['core_value'], logline = state['logline'],
                                 novel_summary = state['novel_summary'], novel_preview = novel_preview)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     # result = NovelTitleOutput(title = 'title', rationale = '...')
     
     print(f"   - 最终书名: 《{result.title}》")
     print(f"   - 命名理由: {result.rationale}")
-    return {'novel_title': result.title}
+    # 正文已经取出，本次运行专属的存储目录不再需要
+    if not state.get('manuscript_dir'):
+        remove_run_directory(state.get('store_dir'))
+    return {'novel_title': result.title, 'final_novel_text': final_novel_text}
 
 # 创建子图
 subgraph_builder = StateGraph(WritingState)
 
-subgraph_builder.add_node("scene_selector", scene_selector)
-subgraph_builder.add_node("writer", writer)
-subgraph_builder.add_node("editor", editor)
-subgraph_builder.add_node("reviser", reviser)
-subgraph_builder.add_node("content_approver", content_approver)
+subgraph_builder.add_node("scene_selector", node(scene_selector))
+subgraph_builder.add_node("writer", node(writer))
+subgraph_builder.add_node("editor", node(editor))
+subgraph_builder.add_node("reviser", node(reviser))
+subgraph_builder.add_node("content_approver", node(content_approver))
     
 subgraph_builder.set_entry_point("scene_selector")
     
@@ -350,18 +699,23 @@ subgraph_builder.add_edge("writer", "editor")
 subgraph_builder.add_edge("reviser", "writer")
 subgraph_builder.add_edge("content_approver", "scene_selector")
 
+# 并行模式在一个节点内为每个章节各运行一次写作子图；各章节的运行不单独保存 checkpoint（parallel_writer 中断后会从头开始）
+chapter_writer = subgraph_builder.compile(checkpointer=False)
+
 # 创建主图
 builder = StateGraph(NovelState)
 
-builder.add_node("concept_developer",concept_developer)
-builder.add_node("human_feedback", human_feedback)
-builder.add_node("world_builder", world_builder)
-builder.add_node("character_designer", character_designer)
-builder.add_node("plot_structurer", plot_structurer)
-builder.add_node("chapter_outliner", chapter_outliner)
-builder.add_node("scene_outliner", scene_outliner)
+builder.add_node("concept_developer",node(concept_developer))
+builder.add_node("human_feedback", node(human_feedback))
+builder.add_node("world_builder", node(world_builder))
+builder.add_node("character_designer", node(character_designer))
+builder.add_node("plot_structurer", node(plot_structurer))
+builder.add_node("chapter_outliner", node(chapter_outliner))
+builder.add_node("scene_outliner", node(scene_outliner))
 builder.add_node("writing_subgraph", subgraph_builder.compile().with_config({"recursion_limit": 1000}))
-builder.add_node("final_namer", final_namer)
+builder.add_node("parallel_writer", node(parallel_writer))
+builder.add_node("chapter_stitcher", node(chapter_stitcher))
+builder.add_node("final_namer", node(final_namer))
 
 builder.add_edge(START, "concept_developer")
 builder.add_edge("concept_developer", "human_feedback")
@@ -370,8 +724,15 @@ builder.add_edge("world_builder", "character_designer")
 builder.add_edge("character_designer", "plot_structurer")
 builder.add_edge("plot_structurer", "chapter_outliner")
 builder.add_edge("chapter_outliner", "scene_outliner")
-builder.add_edge("scene_outliner", "writing_subgraph")
+builder.add_conditional_edges(
+    "scene_outliner",
+    # 决定函数：并行模式下按章节并行写作
+    lambda state: "parallel_writer" if state.get('writing_mode', 'sequential') == 'parallel' else "writing_subgraph",
+    ["writing_subgraph", "parallel_writer"]
+)
 builder.add_edge("writing_subgraph", "final_namer")
+builder.add_edge("parallel_writer", "chapter_stitcher")
+builder.add_edge("chapter_stitcher", "final_namer")
 builder.add_edge("final_namer", END)
 
 graph = builder.compile(interrupt_before=['human_feedback']).with_config({"recursion_limit": 1300})
\ No newline at end of file
@@ -98,7 +98,7 @@ SCENE_OUTLINER_PROMPT = """
 - **故事梗概**: {logline}
 - **核心角色**: {character_summaries}
 - **世界观**: {world_setting_summary}
-- **已写好场景大纲的章节(可能为空)**：{written_scene_outline}
+- **前后文参考：已写好场景大纲的章节，或全书章节速览(可能为空)**：{written_scene_outline}
 
 **场景规划要求:**
 1.  **忠于背景**: 严格参考提供的背景知识进行创作，确保情节发展符合要求。
@@ -114,6 +114,20 @@ SCENE_OUTLINER_PROMPT = """
 
 请以JSON列表格式输出。
 """
+OUTLINE_RECONCILER_PROMPT = """
+你是一位负责前后连贯性的责任编辑。这部小说的场景大纲是按章节分别编写的，章节之间的衔接可能存在问题。
+
+- **故事梗概**: {logline}
+
+下面列出了每个章节交界处：上一章的最后一个场景和下一章的第一个场景：
+{boundaries}
+
+请逐一检查每个交界处是否存在不一致：角色无故出现或消失、地点或时间线矛盾、同一事件在两侧重复发生、缺少必要的过渡。
+对每个需要修改的场景，给出它的章节ID、场景ID，以及保留场景原有目的的修正后情节摘要。
+只返回确实需要修改的场景；如果所有交界处都连贯，返回空列表。
+
+请以JSON格式输出。
+"""
 WRITER_PROMPT = """
 你是一位才华横溢的作家，使用中文进行写作，正在创作一部{genre}小说。
 
@@ -130,6 +144,7 @@ WRITER_PROMPT = """
 - **世界观**: {world_setting}
 - **角色设定**:{characters}
 - **小说前面内容的总结（可能为空）**：{novel_summary}
+- **相关的前文片段（可能为空）**：{retrieved_passages}
 - **上一场景的最后 500 字（可能为空）**：{last_scene_content}
 
 **写作要求:**
@@ -164,6 +179,7 @@ EDITOR_PROMPT = """
 - **世界观**: {world_setting}
 - **角色设定**:{characters}
 - **小说前面内容的总结（可能为空）**：{novel_summary}
+- **相关的前文片段（可能为空）**：{retrieved_passages}
 - **上一场景的结尾（可能为空）**：{last_scene_content}
 
 
@@ -192,6 +208,59 @@ SUMMARY_PROMPT = """
 
 请用中文，以简洁、流畅的散文形式写出总结，字数在 200-300 字之间。
 """
+CHAPTER_SUMMARY_PROMPT = """
+你是一位文学分析师。以下是一部小说第{chapter_id}章中每个场景的概要，按顺序排列：
+---
+{scene_summaries}
+---
+
+**请将它们浓缩为一份章节总结**。
+总结应保留：
+1.  本章的主要情节发展
+2.  主要角色的状态和关系的关键变化
+3.  后续章节依赖的未解决线索和伏笔
+
+请用中文，以简洁、流畅的散文形式写出总结，字数在 150-250 字之间。
+"""
+ARC_SUMMARY_PROMPT = """
+你是一位文学分析师，负责维护一部长篇小说的前情总结。
+
+**前情总结（可能为空）**:
+---
+{arc_summary}
+---
+
+**下一章的总结**:
+---
+{chapter_summary}
+---
+
+**请将下一章并入前情总结，返回截至目前整个故事的最新总结**。
+保留主要的情节转折、每个主要角色当前的状态和目标，以及仍然重要的伏笔；省略次要细节。
+
+请用中文，以简洁、流畅的散文形式写出总结，不超过 400 字。
+"""
+CHAPTER_STITCHER_PROMPT = """
+你是一位负责前后连贯性的责任编辑。这部{genre}小说的各个章节是根据大纲并行写成的，某一章的开头未必能和上一章的结尾严丝合缝地衔接。
+
+- **故事梗概**: {logline}
+- **第{chapter_id}章第一个场景的大纲**: {scene_outline}
+
+**第{previous_chapter_id}章的结尾**:
+---
+{previous_ending}
+---
+
+**第{chapter_id}章的开头**:
+---
+{opening}
+---
+
+**请只改写第{chapter_id}章的开头，使它自然地承接第{previous_chapter_id}章的结尾**。
+修正时间、地点、角色所在位置和情绪上的矛盾，必要时补上一两句过渡。保留开头原有的情节、文风和大致篇幅。
+
+请直接输出改写后的开头，不要包含任何标题或说明。
+"""
 NAMER_PROMPT = """
 你是一位资深的文学编辑和市场推广专家，擅长为小说取一鸣惊人的书名。
 
@@ -203,7 +272,7 @@ NAMER_PROMPT = """
 - **核心价值**: {core_value}
 - **一句话梗概**: {logline}
 
-**故事各个场景的梗概**:
+**全书故事梗概**:
 {novel_summary}
 
 **小说文风预览 (开头和结尾)**:
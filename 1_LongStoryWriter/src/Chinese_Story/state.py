@@ -1,4 +1,7 @@
-from typing import List, Literal, NotRequired, Annotated
+from typing import List, Literal, NotRequired, Optional
+from story_common.memory import SummaryMemory
+from story_common.manuscript import ManuscriptRef
+from story_common.background import PendingSummary, SpeculativeDraft
 from pydantic import BaseModel, Field
 from langchain.agents import AgentState
 
@@ -41,7 +44,7 @@ class Scene(BaseModel):
     characters: List[str] = Field(..., description="出现在此场景中的角色名称列表。")
     outline: str = Field(..., description="总结场景的主要情节和作用。")
     status: Literal["pending", "written"] = Field(..., description="场景是否已书写完成")
-    content: str = Field(None, description="场景的具体内容")
+    content_ref: str = Field(None, description="场景正文在场景存储中的键，定稿后填写")
 
 class SceneOutput(BaseModel):
     chapter_id: int = Field(..., description="写作小说的章节ID。")
@@ -56,23 +59,16 @@ class Chapter(BaseModel):
 
 class ChapterOutput(BaseModel):
     chapters: List[Chapter] = Field(description="章节大纲列表")
-    
-def text_reducer(left: str | None, right: str | None) -> str: 
-    """合并两个字符串，右侧优先。
-    用作 agent state 中的 final_novel_text 的 reducer function。
-    参数：
-        left: 左侧字符串（现章节的文本）
-        right: 右侧字符串（新章节的文本）
-    返回：
-        两个换行符分隔的合并字符串
-    """
-    if left is None:
-        return right
-    elif right is None:
-        return left
-    else:
-        return left + '\n\n' + right
 
+class OutlineFix(BaseModel):
+    """章节交界处修正后的场景大纲。"""
+    chapter_id: int = Field(..., description="需要修正的场景所在的章节ID")
+    scene_id: int = Field(..., description="需要修正的场景在本章内的场景ID")
+    outline: str = Field(..., description="修正后的场景情节摘要")
+
+class OutlineFixOutput(BaseModel):
+    fixes: List[OutlineFix] = Field(description="需要修改大纲的场景列表，无需修改时为空")
+    
 class NovelState(AgentState):
     """
     继承自 LangGraph 的 AgentState，并添加了与小说写作相关的元素
@@ -92,11 +88,56 @@ class NovelState(AgentState):
     # === Novel Outline ===
     chapter_outline: NotRequired[list[Chapter]]
     scene_outline: NotRequired[list[SceneOutput]]
+
+    # === Outline Options ===
+    # "parallel"：根据章节速览并行编写所有章节的场景大纲（默认 "sequential" 逐章编写）
+    outline_mode: NotRequired[Literal["sequential", "parallel"]]
+    outline_concurrency: NotRequired[int]
+    # 并行模式下额外做一次章节交界处的连贯性校对
+    outline_reconcile: NotRequired[bool]
+    # 逐章模式：最近 outline_window 章提供完整场景大纲，更早的章节只提供摘要，
+    # 总长度不超过 outline_token_budget 个 token（默认 3 章、3000 token）
+    outline_window: NotRequired[int]
+    outline_token_budget: NotRequired[int]
+
+    # === Summary Options ===
+    # novel_summary 由分层滚动总结（场景 -> 章节 -> 前情）拼装，总长度不超过 summary_token_budget 个 token；
+    # 最近 summary_keep_chapters 个已完成章节保留各自的章节总结，更早的章节并入前情总结（默认 2000 token、5 章）
+    summary_token_budget: NotRequired[int]
+    summary_keep_chapters: NotRequired[int]
+
+    # === Retrieval Options ===
+    # 作者和编辑会拿到与当前场景的角色和大纲最相关的前文片段（场景概要和正文片段），
+    # 总长度不超过 retrieval_token_budget 个 token（默认 1500，0 表示关闭）
+    retrieval_token_budget: NotRequired[int]
+    
+    # === Manuscript Options ===
+    # 定稿场景追加写入正文存储，state 中只保存引用；
+    # 正文片段写入 manuscript_dir 下的 JSONL 文件；未设置时写入本次运行专属的目录，运行结束后删除
+    manuscript_dir: NotRequired[str]
+
+    # === Pipeline Options ===
+    # 在后台为定稿场景生成概要，与下一个场景的写作同时进行（默认 True）
+    pipeline_summaries: NotRequired[bool]
+    # 编辑审核当前场景的同时提前写下一个场景：当前草稿原样通过时采用，需要修订时丢弃（默认 False）
+    speculative_drafting: NotRequired[bool]
+
+    # === Writing Options ===
+    # "parallel" 根据大纲最多同时写作 writing_concurrency 个章节，再缝合章节衔接、按顺序重建滚动总结
+    # （默认 "sequential"，并发数默认 4）
+    writing_mode: NotRequired[Literal["sequential", "parallel"]]
+    writing_concurrency: NotRequired[int]
     
     # === Final Product ===
-    final_novel_text: Annotated[NotRequired[str], text_reducer]
+    # 追加写入的正文存储的引用；final_novel_text 由最终命名节点一次性拼装
+    manuscript: NotRequired[ManuscriptRef]
+    # 场景正文所在的目录：manuscript_dir，或由场景大纲节点创建的本次运行专属目录
+    store_dir: NotRequired[str]
+    final_novel_text: NotRequired[str]
     novel_summary: NotRequired[str]
+    summary_memory: NotRequired[SummaryMemory]
     novel_title: NotRequired[str]
+    speculation_stats: NotRequired[dict]
     
     # === Flow Control ===
     is_finished: NotRequired[bool]
@@ -119,6 +160,20 @@ class WritingState(AgentState):
     # ===the last content of the last chapter===
     last_scene_content: NotRequired[str]
     novel_summary: NotRequired[str]
+    # 分层滚动总结，novel_summary 由它拼装而成
+    summary_memory: NotRequired[SummaryMemory]
+    summary_token_budget: NotRequired[int]
+    summary_keep_chapters: NotRequired[int]
+    # 已定稿场景的 BM25 索引的引用，供作者和编辑检索前文；索引片段逐场景追加写入 store_dir 下的文件，不进入检查点
+    scene_index: NotRequired[ManuscriptRef]
+    retrieval_token_budget: NotRequired[int]
+    # 仍在后台生成的上一个定稿场景的概要，由编辑节点合并
+    pending_summary: NotRequired[Optional[PendingSummary]]
+    pipeline_summaries: NotRequired[bool]
+    # 下一个场景的推测草稿，以及命中 / 未命中 / 节省时间的统计
+    speculative_draft: NotRequired[Optional[SpeculativeDraft]]
+    speculative_drafting: NotRequired[bool]
+    speculation_stats: NotRequired[dict]
 
     # === Content Generation ===
     current_chapter_id: NotRequired[int]
@@ -131,7 +186,9 @@ class WritingState(AgentState):
     revision_count: NotRequired[int]
 
     # ===chapter content===
-    final_novel_text: Annotated[NotRequired[str], text_reducer]
+    manuscript: NotRequired[ManuscriptRef]
+    manuscript_dir: NotRequired[str]
+    store_dir: NotRequired[str]
     is_finished: NotRequired[bool]
 
 class EditorOutput(BaseModel):
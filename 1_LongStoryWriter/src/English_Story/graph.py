@@ -1,19 +1,31 @@
-from langchain.chat_models import init_chat_model
-from typing import List
+import asyncio
+import time
+from typing import List, Optional, Tuple
 from langgraph.graph import StateGraph, START, END
 
 from English_Story.state import *
 from English_Story.prompts import *
+from story_common.context import OutlineContext, split_opening
+from story_common.memory import SummaryEntry, SummaryMemory
+from story_common.retrieval import index_scene, load_index
+from story_common.manuscript import append_chunk, create_manuscript, materialize
+from story_common.scene_store import content_key, get_scene, new_run_directory, put_scene, remove_run_directory
+from story_common import background
+from story_common.background import PendingSummary, SpeculativeDraft
+from story_common.runtime import chat_model, node
 
 
-llm = init_chat_model(model_provider="deepseek", model="deepseek-chat", temperature=1.1)
+llm = chat_model(model_provider="deepseek", model="deepseek-chat", temperature=1.1)
 
-def concept_developer(state: NovelState):
+# counters reported for speculative drafting
+SPECULATION_STATS = {'hits': 0, 'misses': 0, 'saved_seconds': 0.0}
+
+async def concept_developer(state: NovelState):
     print("---🧠 Executing: Concept Developer ---")
     prompt = CONCEPT_DEVELOPER_PROMPT.format(user_prompt=state['messages'][-1].content, 
                                              human_feedback = state.get('human_feedback', ''))
     structured_llm = llm.with_structured_output(ConceptOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     print(f"   - Genre: {result.genre}")
     print(f"   - Core value: {result.core_value}")
     print(f"   - Logline: {result.logline}")
@@ -21,27 +33,27 @@ def concept_developer(state: NovelState):
     return {'genre': result.genre, 'target_audience': result.target_audience,
            'core_value': result.core_value, 'logline': result.logline}
 
-def world_builder(state: NovelState):
+async def world_builder(state: NovelState):
     print("---🌍 Executing: World Builder ---")
     prompt = WORLD_BUILDER_PROMPT.format(logline=state['logline'], genre=state['genre'],
                                          target_audience = state['target_audience'], 
                                          core_value = state['core_value'])
     structured_llm = llm.with_structured_output(WorldSetting)
-    response = structured_llm.invoke(prompt)
+    response = await structured_llm.ainvoke(prompt)
     print("   - Generated world setting.")
     return {'world_setting': response}
 
-def character_designer(state: NovelState):
+async def character_designer(state: NovelState):
     print("---👥 Executing: Character Designer ---")
     prompt = CHARACTER_DESIGNER_PROMPT.format(logline=state['logline'], 
                                               core_value = state['core_value'],
                                               world_setting=state['world_setting'])
     structured_llm = llm.with_structured_output(CharacterListOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     print(f"   - Designed {len(result.characters)} chracters!")
     return {'characters': result.characters}
 
-def plot_structurer(state: NovelState):
+async def plot_structurer(state: NovelState):
     print("---📈 Executing: Plot Structurer ---")
     character_list = [f"- {name}: {char}" for name, char in ((c.name, c) for c in state['characters'])]
     character_summaries = "\n".join(character_list)
@@ -49,12 +61,12 @@ def plot_structurer(state: NovelState):
                                            core_value = state['core_value'],
                                            character_summaries=character_summaries)
     structured_llm = llm.with_structured_output(PlotStructureOutput) 
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     print(f"   - Planed plot structure.")
     
     return {'plot_structure': result.plots}
 
-def human_feedback(state: NovelState):
+async def human_feedback(state: NovelState):
     """ No-op node that should be interrupted on """
     pass
     
@@ -69,7 +81,7 @@ def should_continue(state: NovelState):
     # Otherwise end
     return "world_builder"
 
-def chapter_outliner(state: NovelState):
+async def chapter_outliner(state: NovelState):
     print("---📖 Executing: Chapter Outliner ---")
     plot_structure_summary = "\n".join([f"- {p.name}: {p.description}" for p in state['plot_structure']])
     character_list = [f"- {name}: {char}" for name, char in ((c.name, c) for c in state['characters'])]
@@ -78,7 +90,7 @@ def chapter_outliner(state: NovelState):
                                             character_summaries = character_summaries,
                                             plot_structure_summary=plot_structure_summary)
     structured_llm = llm.with_structured_output(ChapterOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     print(f"   - Created {len(result.chapters)} Chapters!")
 
     return {'chapter_outline': result.chapters}
@@ -101,37 +113,102 @@ def to_readable_str(data: List) -> str:
     else:
         return ''
 
-def scene_outliner(state: NovelState):
-    print("---🎬 Executing: Scene Outliner ---")
+def chapter_digest(chapters: List[Chapter], index: int) -> str:
+    """
+    compact continuity context for outlining one chapter on its own:
+    the titles of all chapters plus the full outlines of the previous and the next chapter
+    """
+    lines = ["Chapter list:"]
+    lines += [f"- Chapter {ch.chapter_id}: {ch.title}" for ch in chapters]
+    if index > 0:
+        prev = chapters[index - 1]
+        lines.append(f"Previous chapter (Chapter {prev.chapter_id}): {prev.outline}")
+    if index + 1 < len(chapters):
+        nxt = chapters[index + 1]
+        lines.append(f"Next chapter (Chapter {nxt.chapter_id}): {nxt.outline}")
+    return "\n".join(lines)
+
+def scene_outline_prompt(state: NovelState, chapter: Chapter, written_scene_outline: str) -> str:
     character_list = [f"- {name}: {char}" for name, char in ((c.name, c) for c in state['characters'])]
     character_summaries = "\n".join(character_list)
-    world_setting_summary = state['world_setting']
-    
-    res = []
-    structured_llm = llm.with_structured_output(SceneOutput)
-    for chapter in state['chapter_outline']:
-        print(f"   - Creating scenes for '{chapter.chapter_id}' ...")
-        prompt = SCENE_OUTLINER_PROMPT.format(
-            chapter_id=chapter.chapter_id,
-            chapter_title=chapter.title,
-            chapter_summary=chapter.outline,
-            logline = state['logline'], 
-            character_summaries=character_summaries,
-            world_setting_summary=world_setting_summary,
-            written_scene_outline=to_readable_str(res)
+    return SCENE_OUTLINER_PROMPT.format(
+        chapter_id=chapter.chapter_id,
+        chapter_title=chapter.title,
+        chapter_summary=chapter.outline,
+        logline = state['logline'], 
+        character_summaries=character_summaries,
+        world_setting_summary=state['world_setting'],
+        written_scene_outline=written_scene_outline
+    )
+
+def number_scenes(result: SceneOutput, chapter: Chapter) -> SceneOutput:
+    """make sure chapter_id / scene_id are correct and every scene starts as pending"""
+    result.chapter_id = chapter.chapter_id
+    result.title = chapter.title
+    for i, scene in enumerate(result.scenes):
+        scene.scene_id = i + 1
+        scene.status = "pending"
+    return result
+
+async def reconcile_boundaries(state: NovelState, res: List[SceneOutput]) -> List[SceneOutput]:
+    """
+    one LLM pass over all chapter boundaries (last scene of a chapter + first scene of the next)
+    to fix inconsistencies left by outlining the chapters independently
+    """
+    boundaries = []
+    for prev, nxt in zip(res, res[1:]):
+        if not prev.scenes or not nxt.scenes:
+            continue
+        last, first = prev.scenes[-1], nxt.scenes[0]
+        boundaries.append(
+            f"End of Chapter {prev.chapter_id} (Scene {last.scene_id}; {', '.join(last.characters)}): {last.outline}\n"
+            f"Start of Chapter {nxt.chapter_id} (Scene {first.scene_id}; {', '.join(first.characters)}): {first.outline}"
         )
-        result = structured_llm.invoke(prompt)
-        result.chapter_id = chapter.chapter_id
-        result.title = chapter.title
-        for i, scene in enumerate(result.scenes):
-            scene.scene_id = i + 1
-            scene.status = "pending"
-        
-        res.append(result)
+    if not boundaries:
+        return res
+
+    prompt = OUTLINE_RECONCILER_PROMPT.format(logline=state['logline'], boundaries="\n\n".join(boundaries))
+    result = await llm.with_structured_output(OutlineFixOutput).ainvoke(prompt)
+    scenes = {(ch.chapter_id, sc.scene_id): sc for ch in res for sc in ch.scenes}
+    fixed = 0
+    for fix in result.fixes:
+        scene = scenes.get((fix.chapter_id, fix.scene_id))
+        if scene is not None and fix.outline:
+            scene.outline = fix.outline
+            fixed += 1
+    print(f"   - Reconciled {fixed} scene(s) at chapter boundaries.")
+    return res
+
+async def scene_outliner(state: NovelState):
+    print("---🎬 Executing: Scene Outliner ---")
+    chapters = state['chapter_outline']
+    structured_llm = llm.with_structured_output(SceneOutput)
+
+    if state.get('outline_mode', 'sequential') == 'parallel':
+        # every chapter only needs the chapter digest, so all chapters can be outlined at once
+        concurrency = state.get('outline_concurrency', 8)
+        print(f"   - Creating scenes for {len(chapters)} chapters in parallel (concurrency: {concurrency}) ...")
+        prompts = [scene_outline_prompt(state, chapter, chapter_digest(chapters, i)) for i, chapter in enumerate(chapters)]
+        results = await structured_llm.abatch(prompts, config={"max_concurrency": concurrency})
+        res = [number_scenes(result, chapter) for result, chapter in zip(results, chapters)]
+        if state.get('outline_reconcile', False):
+            res = await reconcile_boundaries(state, res)
+    else:
+        # recent chapters in full, older chapters as their one-paragraph summary, under a token budget
+        context = OutlineContext(state.get('outline_token_budget', 3000), state.get('outline_window', 3))
+        res = []
+        for chapter in chapters:
+            print(f"   - Creating scenes for '{chapter.chapter_id}' ...")
+            result = await structured_llm.ainvoke(scene_outline_prompt(state, chapter, context.render()))
+            result = number_scenes(result, chapter)
+            res.append(result)
+            context.append(to_readable_str([result]), f"Chapter {chapter.chapter_id}: {chapter.title} - {chapter.outline}")
     print("---✅ All chapters were created scenes. ---")
-    return {'scene_outline': res}
+    # scene bodies go to manuscript_dir, or to a directory of the run's own that the final namer removes
+    store_dir = state.get('store_dir') or state.get('manuscript_dir') or new_run_directory()
+    return {'scene_outline': res, 'store_dir': store_dir}
 
-def scene_selector(state: WritingState):
+async def scene_selector(state: WritingState):
     """
     logical node：select the next scene to write
     """
@@ -144,14 +221,33 @@ def scene_selector(state: WritingState):
                 return {'current_chapter_id': chapter.chapter_id, 'current_scene_id': scene.scene_id, 'revision_count': 0}
 
     print("---✅ All scenes done, and exit writing loop. ---")
-    return {'is_finished': True}
+    stats = state.get('speculation_stats')
+    if stats:
+        print(f"   - Speculative drafting: {stats['hits']} hits, {stats['misses']} misses, saved {stats['saved_seconds']:.1f}s.")
+    return {'is_finished': True, **(await merge_pending_summary(state))}
 
-def writer(state: WritingState):
+def search_passages(state: WritingState, scene: Scene) -> str:
     """
-    LLM node：write scenes
+    query the BM25 index of approved scenes by the scene's characters and outline,
+    and return the most relevant earlier passages within `retrieval_token_budget`
+    """
+    budget = state.get('retrieval_token_budget', 1500)
+    index = load_index(state.get('scene_index')) if budget > 0 else None
+    if index is None:
+        return ""
+    query = " ".join(scene.characters) + "\n" + scene.outline
+    load = lambda key: get_scene(key, state['store_dir'])
+    return index.render(query, budget, lambda passage, text: (
+        f"[Chapter {passage.chapter_id} Scene {passage.scene_id}, {passage.kind}] {text}"), load)
+
+async def retrieve_passages(state: WritingState, scene: Scene) -> str:
+    """search_passages on a worker thread: it reads the index file and scene bodies from disk"""
+    return await asyncio.to_thread(search_passages, state, scene)
+
+async def draft_scene(state: WritingState) -> str:
+    """
+    draft the current scene; on a revision, rewrite the previous draft with the editor's feedback
     """
-    print(f"---✍️  Executing: Writer (Revise Count: {state.get('revision_count','')}) ---")
-    
     current_chapter = next(ch for ch in state['scene_outline'] if ch.chapter_id == state['current_chapter_id'])
     current_scene = next(sc for sc in current_chapter.scenes if sc.scene_id == state['current_scene_id'])
     
@@ -160,6 +256,7 @@ def writer(state: WritingState):
 
     novel_summary = state.get('novel_summary', '')
     last_scene_content = state.get('last_scene_content', '')
+    retrieved_passages = await retrieve_passages(state, current_scene)
 
     prompt = WRITER_PROMPT.format(
             genre=state['genre'],
@@ -171,7 +268,8 @@ def writer(state: WritingState):
             characters=character_summaries,
             world_setting=state['world_setting'],
             novel_summary = novel_summary,
-            last_scene_content = last_scene_content
+            last_scene_content = last_scene_content,
+            retrieved_passages = retrieved_passages
         )
 
     if state.get('revision_count', 0) > 0:
@@ -179,24 +277,107 @@ def writer(state: WritingState):
         draft = state.get('draft_content', '')
         prompt += f"\n\nThis is the draft you wrote previously: {draft}\n\n**Editor's feedback**:\n{review_feedback}\n\nPlease revise the draft in accordance with the feedback above."
     
-    response = llm.invoke(prompt)
-    draft_content = response.content.strip()
+    response = await llm.ainvoke(prompt)
+    return response.content.strip()
+
+async def timed_draft(state: WritingState) -> Tuple[str, float]:
+    start = time.perf_counter()
+    return await draft_scene(state), time.perf_counter() - start
+
+def next_pending_scene(state: WritingState) -> Optional[Tuple[int, int]]:
+    """the scene the scene selector will pick once the current one is approved"""
+    for chapter in state['scene_outline']:
+        for scene in chapter.scenes:
+            if scene.status == "pending" and (chapter.chapter_id, scene.scene_id) != (
+                    state['current_chapter_id'], state['current_scene_id']):
+                return chapter.chapter_id, scene.scene_id
+    return None
+
+def start_speculation(state: WritingState) -> Optional[SpeculativeDraft]:
+    """
+    start drafting the next scene in the background, continuing from the current draft, and
+    summarizing the current draft, on the bet that the editor approves it unchanged
+    """
+    next_scene = next_pending_scene(state)
+    if next_scene is None:
+        return None
+    speculative_state = {**state, 'current_chapter_id': next_scene[0], 'current_scene_id': next_scene[1],
+                         'revision_count': 0, 'last_scene_content': state['draft_content'][-500:]}
+    job_id = background.submit(timed_draft(speculative_state))
+    based_on = content_key(state['draft_content'])
+    summary_job_id = background.submit(summarize_scene(state, state['current_chapter_id'], state['current_scene_id'],
+                                                      state['draft_content'], based_on))
+    print(f"   - Speculatively drafting Chapter {next_scene[0]} Scene {next_scene[1]} during the review.")
+    return SpeculativeDraft(job_id=job_id, chapter_id=next_scene[0], scene_id=next_scene[1],
+                            after_chapter_id=state['current_chapter_id'], after_scene_id=state['current_scene_id'],
+                            based_on=based_on, summary_job_id=summary_job_id)
+
+async def take_speculation(state: WritingState, speculation: SpeculativeDraft) -> Tuple[Optional[str], dict]:
+    """
+    use the speculative draft for the current scene if it was based on the draft that was approved;
+    returns the draft (None on a miss) and the updated speculation statistics
+    """
+    stats = {**SPECULATION_STATS, **state.get('speculation_stats', {})}
+    previous = next((sc for ch in state['scene_outline'] if ch.chapter_id == speculation.after_chapter_id
+                     for sc in ch.scenes if sc.scene_id == speculation.after_scene_id), None)
+    valid = ((speculation.chapter_id, speculation.scene_id) == (state['current_chapter_id'], state['current_scene_id'])
+             and state.get('revision_count', 0) == 0
+             and previous is not None and previous.content_ref == speculation.based_on)
+    async def no_draft():
+        # the background job is not in this process (resumed from a checkpoint): draft again instead
+        return None, 0.0
+
+    draft_content = None
+    if valid:
+        start = time.perf_counter()
+        try:
+            draft_content, seconds = await background.collect(speculation.job_id, no_draft)
+        except Exception as e:
+            print(f"   - Speculative draft failed: {e}")
+        waited = time.perf_counter() - start
+    else:
+        background.discard(speculation.job_id)
+    if draft_content:
+        stats['hits'] += 1
+        stats['saved_seconds'] = round(stats['saved_seconds'] + max(seconds - waited, 0.0), 3)
+        print(f"   - Speculative draft hit, saved {max(seconds - waited, 0.0):.2f}s.")
+    else:
+        draft_content = None
+        stats['misses'] += 1
+        print("   - Speculative draft discarded.")
+    return draft_content, {'speculative_draft': None, 'speculation_stats': stats}
+
+async def writer(state: WritingState):
+    """
+    LLM node：write scenes
+    """
+    print(f"---✍️  Executing: Writer (Revise Count: {state.get('revision_count','')}) ---")
+
+    draft_content, update = None, {}
+    if state.get('speculative_draft') is not None:
+        draft_content, update = await take_speculation(state, state['speculative_draft'])
+    if draft_content is None:
+        draft_content = await draft_scene(state)
     
     print(f"   - Generated draft (length: {len(draft_content)}).")
-    return {'draft_content': draft_content}
+    return {'draft_content': draft_content, **update}
 
 
-def editor(state: WritingState):
+async def editor(state: WritingState):
     """
     LLM node：evaluate scene drafts
     """
     print("---👀 Executing: Editor ---")
 
+    # the previous scene's summary was generated while this draft was written; merge it before reviewing
+    merged = await merge_pending_summary(state)
+    state = {**state, **merged}
+
     if state['revision_count'] >= 3:
         print(f"   - Warning: The maximum number of revisions has been reached ({state['revision_count']}), and the draft is approved automatically.")
         next_action = "approve"
         review_feedback = f"(Auto-approved) The number of revisions has reached {state['revision_count']}. To avoid an infinite loop, this draft has been forcibly accepted. Minor flaws may still exist, but the overall quality is acceptable."
-        return {'next_action': next_action, 'review_feedback': review_feedback}
+        return {'next_action': next_action, 'review_feedback': review_feedback, **merged}
     
     current_chapter = next(ch for ch in state['scene_outline'] if ch.chapter_id == state['current_chapter_id'])
     current_scene = next(sc for sc in current_chapter.scenes if sc.scene_id == state['current_scene_id'])
@@ -206,6 +387,7 @@ def editor(state: WritingState):
 
     novel_summary = state.get('novel_summary', '')
     last_scene_content = state.get('last_scene_content', '')
+    retrieved_passages = await retrieve_passages(state, current_scene)
     
     prompt = EDITOR_PROMPT.format(
             genre=state['genre'],
@@ -215,15 +397,27 @@ def editor(state: WritingState):
             characters=character_summaries,
             world_setting=state['world_setting'],
             novel_summary = novel_summary,
-            last_scene_content = last_scene_content
+            last_scene_content = last_scene_content,
+            retrieved_passages = retrieved_passages
         )
+    # speculative mode: draft the next scene while this one is being reviewed
+    speculation = start_speculation(state) if state.get('speculative_drafting') else None
     structured_llm = llm.with_structured_output(EditorOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
+    update = {'speculative_draft': speculation}
+    if speculation is not None and result.decision != "approve":
+        # the draft will be revised, so the next scene must continue from the revision instead
+        background.discard(speculation.job_id)
+        background.discard(speculation.summary_job_id)
+        stats = {**SPECULATION_STATS, **state.get('speculation_stats', {})}
+        stats['misses'] += 1
+        update = {'speculative_draft': None, 'speculation_stats': stats}
+        print("   - Speculative draft discarded.")
     print(f"   - Editor decided: {result.decision}")
     print(f"   - Editor feedback: {result.feedback[:100]}...")
-    return {'next_action': result.decision, 'review_feedback': result.feedback}
+    return {'next_action': result.decision, 'review_feedback': result.feedback, **merged, **update}
 
-def reviser(state: WritingState):
+async def reviser(state: WritingState):
     """
     logical node：count revision times
     """
@@ -233,7 +427,59 @@ def reviser(state: WritingState):
     print(f"   - Revision count updated to: {count}")
     return {'revision_count': count}
 
-def content_approver(state: WritingState):
+async def roll_up_summaries(state: WritingState, memory: SummaryMemory, chapter_id: int):
+    """
+    fold finished chapters' scene summaries into chapter summaries, and chapter summaries
+    beyond the last `summary_keep_chapters` into the arc summary
+    """
+    while (finished := memory.finished_chapter(chapter_id)) is not None:
+        finished_id, scene_summaries = finished
+        prompt = CHAPTER_SUMMARY_PROMPT.format(chapter_id=finished_id, scene_summaries="\n\n".join(scene_summaries))
+        response = await llm.ainvoke(prompt)
+        memory.close_chapter(finished_id, f"Summary of Chapter {finished_id}: {response.content.strip()}")
+        print(f"   - Rolled Chapter {finished_id} up into a chapter summary.")
+    for entry in memory.chapters_to_fold(state.get('summary_keep_chapters', 5)):
+        prompt = ARC_SUMMARY_PROMPT.format(arc_summary=memory.arc, chapter_summary=entry.text)
+        memory.arc = (await llm.ainvoke(prompt)).content.strip()
+        print(f"   - Merged Chapter {entry.chapter_id} into the story-so-far summary.")
+
+async def summarize_scene(state: WritingState, ch_id: int, sc_id: int, content: str, content_ref: str) -> dict:
+    """
+    summarize an approved scene, fold it into the rolling summaries and add it to the retrieval index;
+    returns the state update (runs in the background when `pipeline_summaries` is on)
+    """
+    prompt = SUMMARY_PROMPT.format(scene_content = content)
+    response = await llm.ainvoke(prompt)
+    scene_summary = f"Summary of Chapter {ch_id} Secne {sc_id}: {response.content.strip()}"
+    # rolling summaries keep novel_summary within a fixed budget however long the novel gets
+    memory = (state.get('summary_memory') or SummaryMemory()).model_copy(deep=True)
+    await roll_up_summaries(state, memory, ch_id)
+    memory.add_scene(ch_id, sc_id, scene_summary)
+    novel_summary = memory.render(state.get('summary_token_budget', 2000))
+    # index the approved scene for retrieval by later scenes
+    index = state.get('scene_index')
+    if state.get('retrieval_token_budget', 1500) > 0:
+        index = index_scene(index, state['store_dir'], ch_id, sc_id, response.content.strip(), content, ref=content_ref)
+    print(f"   - Upated novel summary with Chapter {ch_id} Scene {sc_id}!")
+    return {'summary_memory': memory, 'novel_summary': novel_summary, 'scene_index': index, 'pending_summary': None}
+
+async def merge_pending_summary(state: WritingState) -> dict:
+    """
+    wait for the background summary of the last approved scene, if there is one, and return its state update;
+    recomputes it when the background job is not in this process (e.g. resumed from a checkpoint)
+    """
+    pending = state.get('pending_summary')
+    if pending is None:
+        return {}
+    return await background.collect(pending.job_id, lambda: summarize_scene(
+        state, pending.chapter_id, pending.scene_id,
+        get_scene(pending.content_ref, state['store_dir']), pending.content_ref))
+
+def scene_chunk(chapter: SceneOutput, scene: Scene, content: str) -> str:
+    """the manuscript chunk of one approved scene"""
+    return f"## [Chapter {chapter.chapter_id}] {chapter.title}\n\n### Scene {scene.scene_id}: \n\n{content}\n"
+
+async def content_approver(state: WritingState):
     """
     logical node：write the draft into the final text
     """
@@ -246,49 +492,158 @@ def content_approver(state: WritingState):
         if chapter.chapter_id == ch_id:
             for scene in chapter.scenes:
                 if scene.scene_id == sc_id:
-                    scene.content = state['draft_content']
+                    # the body goes to the content-addressed scene store, the outline only keeps its key
+                    content = state['draft_content']
+                    scene.content_ref = put_scene(content, state['store_dir'])
                     scene.status = "written"
                     
-                    final_scene_text = f"## [Chapter {chapter.chapter_id}] {chapter.title}\n\n### Scene {scene.scene_id}: \n\n{scene.content}\n"
+                    final_scene_text = scene_chunk(chapter, scene, content)
                     
                     print(f"   - Chapter {chapter.chapter_id} Scene {scene.scene_id}' was added to the full text.")
-                    novel_summary = state.get('novel_summary', '')
-                    prompt = SUMMARY_PROMPT.format(scene_content = scene.content)
-                    response = llm.invoke(prompt)
-                    scene_summary = f"Summary of Chapter {ch_id} Secne {sc_id}: {response.content.strip()}"
-                    print("   - Upated novel summary!")
-                    return {'scene_outline': scene_outline, 'final_novel_text': final_scene_text,
-                            'last_scene_content': state['draft_content'][-500:], 
-                            'novel_summary': novel_summary+"\n\n"+scene_summary}
+                    # append the scene to the manuscript store; only the reference goes into the state
+                    manuscript = state.get('manuscript') or create_manuscript(state['store_dir'])
+                    manuscript = append_chunk(manuscript, final_scene_text)
+                    update = {'scene_outline': scene_outline, 'manuscript': manuscript,
+                              'last_scene_content': state['draft_content'][-500:]}
+                    job_id = None
+                    speculation = state.get('speculative_draft')
+                    if speculation is not None and speculation.summary_job_id:
+                        # speculative mode already started this draft's summary during the review
+                        if speculation.based_on == scene.content_ref:
+                            job_id = speculation.summary_job_id
+                        else:
+                            background.discard(speculation.summary_job_id)
+                    if job_id is None and state.get('pipeline_summaries', True):
+                        # summarize in the background while the next scene is drafted; the editor merges it
+                        job_id = background.submit(summarize_scene(state, ch_id, sc_id, content, scene.content_ref))
+                    if job_id is None:
+                        update.update(await summarize_scene(state, ch_id, sc_id, content, scene.content_ref))
+                    else:
+                        update['pending_summary'] = PendingSummary(job_id=job_id, chapter_id=ch_id, scene_id=sc_id,
+                                                                   content_ref=scene.content_ref)
+                    return update
     
     raise ValueError("Could not find the current scene to finalize the draft!")
 
-def final_namer(state: NovelState):
+def chapter_state(state: NovelState, chapter: SceneOutput) -> dict:
+    """
+    the writing-subgraph input for writing one chapter on its own: the story bible and the chapter's
+    scenes, with the outlines of the preceding chapters standing in for their (not yet written) summaries
+    """
+    keep = state.get('summary_keep_chapters', 5)
+    earlier = [ch for ch in state['chapter_outline'] if ch.chapter_id < chapter.chapter_id]
+    memory = SummaryMemory(chapters=[
+        SummaryEntry(chapter_id=ch.chapter_id, text=f"Outline of Chapter {ch.chapter_id} ({ch.title}): {ch.outline}")
+        for ch in earlier[max(len(earlier) - keep, 0):]])
+    inputs = {key: state[key] for key in ('messages', 'genre', 'core_value', 'logline', 'characters', 'world_setting',
+                                          'chapter_outline', 'summary_token_budget', 'summary_keep_chapters',
+                                          'retrieval_token_budget', 'manuscript_dir', 'store_dir') if key in state}
+    # one LLM call at a time per chapter, so writing_concurrency bounds the calls in flight
+    return {**inputs, 'scene_outline': [chapter.model_copy(deep=True)], 'summary_memory': memory,
+            'novel_summary': memory.render(state.get('summary_token_budget', 2000)),
+            'pipeline_summaries': False, 'speculative_drafting': False}
+
+async def parallel_writer(state: NovelState):
+    """
+    parallel mode: write every chapter with the writing subgraph, up to `writing_concurrency` chapters at a time
+    """
+    print("---✍️  Executing: Parallel Writer ---")
+    chapters = state['scene_outline']
+    concurrency = state.get('writing_concurrency', 4)
+    print(f"   - Writing {len(chapters)} chapters in parallel (concurrency: {concurrency}) ...")
+    results = await chapter_writer.abatch([chapter_state(state, chapter) for chapter in chapters],
+                                          config={"max_concurrency": concurrency, "recursion_limit": 1000})
+    # the scene summaries of all chapters, in story order; the chapter stitcher rolls them up
+    memory = SummaryMemory(scenes=[entry for result in results
+                                   for entry in (result.get('summary_memory') or SummaryMemory()).scenes])
+    print("---✅ All chapters written. ---")
+    return {'scene_outline': [result['scene_outline'][0] for result in results], 'summary_memory': memory}
+
+async def regenerate_summaries(state: NovelState, scene_summaries: List[SummaryEntry]) -> SummaryMemory:
+    """
+    rebuild the rolling summaries in story order, ending where sequential writing would: every finished
+    chapter rolled up (the chapter summaries at once, the arc folded chapter by chapter), the last chapter as scenes
+    """
+    chapter_ids = list(dict.fromkeys(entry.chapter_id for entry in scene_summaries))
+    if not chapter_ids:
+        return SummaryMemory()
+    memory = SummaryMemory(scenes=[entry for entry in scene_summaries if entry.chapter_id == chapter_ids[-1]])
+    prompts = [CHAPTER_SUMMARY_PROMPT.format(chapter_id=ch_id, scene_summaries="\n\n".join(
+        entry.text for entry in scene_summaries if entry.chapter_id == ch_id)) for ch_id in chapter_ids[:-1]]
+    responses = await llm.abatch(prompts, config={"max_concurrency": state.get('writing_concurrency', 4)})
+    memory.chapters = [SummaryEntry(chapter_id=ch_id, text=f"Summary of Chapter {ch_id}: {response.content.strip()}")
+                       for ch_id, response in zip(chapter_ids, responses)]
+    print(f"   - Rolled {len(memory.chapters)} chapters up into chapter summaries.")
+    await roll_up_summaries(state, memory, chapter_ids[-1])
+    return memory
+
+async def chapter_stitcher(state: NovelState):
+    """
+    parallel mode: rewrite each chapter's opening to follow on from the previous chapter's ending,
+    then assemble the manuscript and regenerate the rolling summaries in chapter order
+    """
+    print("---🧵 Executing: Chapter Stitcher ---")
+    directory = state['store_dir']
+    chapters = [chapter for chapter in state['scene_outline'] if chapter.scenes]
+
+    # every transition only needs the original text on both sides, so all openings are rewritten at once
+    transitions = []
+    for previous, chapter in zip(chapters, chapters[1:]):
+        first = chapter.scenes[0]
+        opening, rest = split_opening(get_scene(first.content_ref, directory))
+        prompt = CHAPTER_STITCHER_PROMPT.format(
+            genre=state['genre'], logline=state['logline'],
+            chapter_id=chapter.chapter_id, previous_chapter_id=previous.chapter_id,
+            scene_outline=first.outline, opening=opening,
+            previous_ending=get_scene(previous.scenes[-1].content_ref, directory)[-500:])
+        transitions.append((first, prompt, rest))
+    responses = await llm.abatch([prompt for _, prompt, _ in transitions],
+                                 config={"max_concurrency": state.get('writing_concurrency', 4)})
+    for (scene, _, rest), response in zip(transitions, responses):
+        scene.content_ref = put_scene(response.content.strip() + rest, directory)
+    print(f"   - Stitched {len(transitions)} chapter transitions.")
+
+    manuscript = create_manuscript(directory)
+    for chapter in chapters:
+        for scene in chapter.scenes:
+            manuscript = append_chunk(manuscript, scene_chunk(chapter, scene, get_scene(scene.content_ref, directory)))
+
+    memory = await regenerate_summaries(state, (state.get('summary_memory') or SummaryMemory()).scenes)
+    print("---✅ Chapters stitched into the manuscript. ---")
+    return {'scene_outline': state['scene_outline'], 'manuscript': manuscript, 'summary_memory': memory,
+            'novel_summary': memory.render(state.get('summary_token_budget', 2000))}
+
+async def final_namer(state: NovelState):
     """
     LLM node：brainstorm an enticing title for the finished novel
     """
     print("---🏷️  Executing: Final Namer ---")
     
-    novel_preview = state['final_novel_text'][:1000] + "..." + state['final_novel_text'][-1000:]
+    # materialize the manuscript once, from the store
+    final_novel_text = materialize(state.get('manuscript'))
+    novel_preview = final_novel_text[:1000] + "..." + final_novel_text[-1000:]
     
     structured_llm = llm.with_structured_output(NovelTitleOutput)
     prompt = NAMER_PROMPT.format(user_prompt = state['messages'][-1].content, genre = state['genre'],
                                 core_value = state['core_value'], logline = state['logline'],
                                 novel_summary = state['novel_summary'], novel_preview = novel_preview)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     
     print(f"   - Novel title: 《{result.title}》")
     print(f"   - Rationale: {result.rationale}")
-    return {'novel_title': result.title}
+    # the manuscript is materialized, so a run directory of our own is no longer needed
+    if not state.get('manuscript_dir'):
+        remove_run_directory(state.get('store_dir'))
+    return {'novel_title': result.title, 'final_novel_text': final_novel_text}
 
 # create sub graph
 subgraph_builder = StateGraph(WritingState)
 
-subgraph_builder.add_node("scene_selector", scene_selector)
-subgraph_builder.add_node("writer", writer)
-subgraph_builder.add_node("editor", editor)
-subgraph_builder.add_node("reviser", reviser)
-subgraph_builder.add_node("content_approver", content_approver)
+subgraph_builder.add_node("scene_selector", node(scene_selector))
+subgraph_builder.add_node("writer", node(writer))
+subgraph_builder.add_node("editor", node(editor))
+subgraph_builder.add_node("reviser", node(reviser))
+subgraph_builder.add_node("content_approver", node(content_approver))
     
 subgraph_builder.set_entry_point("scene_selector")
     
@@ -316,18 +671,24 @@ subgraph_builder.add_edge("writer", "editor")
 subgraph_builder.add_edge("reviser", "writer")
 subgraph_builder.add_edge("content_approver", "scene_selector")
 
+# parallel mode runs the writing subgraph once per chapter inside a single node; the chapter runs
+# are not checkpointed on their own (an interrupted parallel_writer starts over)
+chapter_writer = subgraph_builder.compile(checkpointer=False)
+
 # create graph
 builder = StateGraph(NovelState)
 
-builder.add_node("concept_developer",concept_developer)
-builder.add_node("human_feedback", human_feedback)
-builder.add_node("world_builder", world_builder)
-builder.add_node("character_designer", character_designer)
-builder.add_node("plot_structurer", plot_structurer)
-builder.add_node("chapter_outliner", chapter_outliner)
-builder.add_node("scene_outliner", scene_outliner)
+builder.add_node("concept_developer",node(concept_developer))
+builder.add_node("human_feedback", node(human_feedback))
+builder.add_node("world_builder", node(world_builder))
+builder.add_node("character_designer", node(character_designer))
+builder.add_node("plot_structurer", node(plot_structurer))
+builder.add_node("chapter_outliner", node(chapter_outliner))
+builder.add_node("scene_outliner", node(scene_outliner))
 builder.add_node("writing_subgraph", subgraph_builder.compile().with_config({"recursion_limit": 1000}))
-builder.add_node("final_namer", final_namer)
+builder.add_node("parallel_writer", node(parallel_writer))
+builder.add_node("chapter_stitcher", node(chapter_stitcher))
+builder.add_node("final_namer", node(final_namer))
 
 builder.add_edge(START, "concept_developer")
 builder.add_edge("concept_developer", "human_feedback")
@@ -336,8 +697,14 @@ builder.add_edge("world_builder", "character_designer")
 builder.add_edge("character_designer", "plot_structurer")
 builder.add_edge("plot_structurer", "chapter_outliner")
 builder.add_edge("chapter_outliner", "scene_outliner")
-builder.add_edge("scene_outliner", "writing_subgraph")
+builder.add_conditional_edges(
+    "scene_outliner",
+    lambda state: "parallel_writer" if state.get('writing_mode', 'sequential') == 'parallel' else "writing_subgraph",
+    ["writing_subgraph", "parallel_writer"]
+)
 builder.add_edge("writing_subgraph", "final_namer")
+builder.add_edge("parallel_writer", "chapter_stitcher")
+builder.add_edge("chapter_stitcher", "final_namer")
 builder.add_edge("final_namer", END)
 
 graph = builder.compile(interrupt_before=['human_feedback']).with_config({"recursion_limit": 1300})
\ No newline at end of file
@@ -100,7 +100,7 @@ Now, please create a scene outline for the following chapter:
 - **Logline**: {logline}
 - **Core Characters**: {character_summaries}
 - **World Setting**: {world_setting_summary}
-- **Previously Written Scene Outlines (may be empty)**: {written_scene_outline}
+- **Continuity Context: Previously Written Scene Outlines or a Chapter Digest (may be empty)**: {written_scene_outline}
 
 **Scene Planning Requirements:**
 1.  **Faithful to Background**: Strictly reference the provided background information for creation, ensuring plot development is consistent with requirements.
@@ -116,6 +116,20 @@ Your task is to break this chapter into 3～5 scenes. For each scene, please pro
 
 Please output in a JSON list format.
 """
+OUTLINE_RECONCILER_PROMPT = """
+You are a continuity editor. The scene outlines of this novel were drafted for each chapter independently, so the transitions between chapters may not line up.
+
+- **Logline**: {logline}
+
+Each chapter boundary below shows the last scene of one chapter and the first scene of the next:
+{boundaries}
+
+Check every boundary for inconsistencies: characters who appear or vanish without explanation, contradictory locations or timelines, events repeated on both sides, or missing hand-offs.
+For each scene that needs a fix, return its chapter ID, its scene ID and a corrected plot summary that keeps the scene's purpose.
+Only return scenes that actually need to change; return an empty list if every boundary is consistent.
+
+Please output in JSON format.
+"""
 WRITER_PROMPT = """
 You are a talented writer writing in English, currently working on a {genre} novel.
 
@@ -132,6 +146,7 @@ Your task is to write the full content of this scene based on the following scen
 - **World Setting**: {world_setting}
 - **Character Profiles**: {characters}
 - **Summary of Previous Novel Content (may be empty)**: {novel_summary}
+- **Relevant Earlier Passages (may be empty)**: {retrieved_passages}
 - **Last 500 Characters of the Previous Scene (may be empty)**: {last_scene_content}
 
 **Writing Requirements:**
@@ -164,6 +179,7 @@ Please carefully read the following scene draft and evaluate it from the followi
 - **World Setting**: {world_setting}
 - **Character Profiles**: {characters}
 - **Summary of Previous Novel Content (may be empty)**: {novel_summary}
+- **Relevant Earlier Passages (may be empty)**: {retrieved_passages}
 - **End of Previous Scene (may be empty)**: {last_scene_content}
 
 Please first provide your assessment (Pass/Fail). If it fails, please provide specific revision suggestions.
@@ -190,6 +206,58 @@ This summary will serve as the foundation for subsequent writing.
 
 Please write the summary in English, in a concise, flowing prose style, between 200-300 words.
 """
+CHAPTER_SUMMARY_PROMPT = """
+You are a literary analyst. Below are the summaries of every scene in Chapter {chapter_id} of a novel, in order:
+---
+{scene_summaries}
+---
+
+**Please condense them into one chapter summary.** The summary should keep:
+1.  The main plot developments of the chapter.
+2.  Key changes in the main characters' states and relationships.
+3.  Unresolved threads and foreshadowing that later chapters depend on.
+
+Please write the summary in English, in a concise, flowing prose style, between 150-250 words.
+"""
+ARC_SUMMARY_PROMPT = """
+You are a literary analyst maintaining the running summary of a long novel.
+
+**The Story So Far (may be empty)**:
+---
+{arc_summary}
+---
+
+**Summary of the Next Chapter**:
+---
+{chapter_summary}
+---
+
+**Please merge the next chapter into the story so far and return the updated summary of the whole story up to this point.**
+Keep the major plot turns, each main character's current state and goals, and the open threads that still matter; drop minor details.
+
+Please write the summary in English, in a concise, flowing prose style, no more than 400 words.
+"""
+CHAPTER_STITCHER_PROMPT = """
+You are a continuity editor. The chapters of this {genre} novel were written in parallel from their outlines, so a chapter may not pick up exactly where the previous one left off.
+
+- **Logline**: {logline}
+- **Outline of the First Scene of Chapter {chapter_id}**: {scene_outline}
+
+**End of Chapter {previous_chapter_id}**:
+---
+{previous_ending}
+---
+
+**Opening of Chapter {chapter_id}**:
+---
+{opening}
+---
+
+**Please rewrite only the opening of Chapter {chapter_id} so that it follows naturally from the end of Chapter {previous_chapter_id}.**
+Fix contradictions in time, place, the characters' whereabouts and mood, and add a brief bridge if one is missing. Keep the opening's events, style and approximate length.
+
+Please directly output the rewritten opening, without any titles or explanations.
+"""
 NAMER_PROMPT = """
 You are a senior literary editor and marketing expert, skilled at giving novels striking titles.
 
@@ -201,7 +269,7 @@ Now that a English novel has been completed, please give it the perfect name.
 - **Core Value**: {core_value}
 - **Logline**: {logline}
 
-**Summaries of All Story Scenes**:
+**Summary of the Whole Story**:
 {novel_summary}
 
 **Novel Style Preview (Beginning and End)**:
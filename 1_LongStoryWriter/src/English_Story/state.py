@@ -1,4 +1,7 @@
-from typing import List, Literal, NotRequired, Annotated
+from typing import List, Literal, NotRequired, Optional
+from story_common.memory import SummaryMemory
+from story_common.manuscript import ManuscriptRef
+from story_common.background import PendingSummary, SpeculativeDraft
 from pydantic import BaseModel, Field
 from langchain.agents import AgentState
 
@@ -41,7 +44,7 @@ class Scene(BaseModel):
     characters: List[str] = Field(..., description="A list of character names appearing in this scene.")
     outline: str = Field(..., description="A summary of the scene's main plot and purpose.")
     status: Literal["pending", "written"] = Field(..., description="Whether the scene has been written.")
-    content: str = Field(None, description="The specific content of the scene.")
+    content_ref: str = Field(None, description="The key of the scene's content in the scene store, set once the scene is written.")
 
 class SceneOutput(BaseModel):
     chapter_id: int = Field(..., description="The chapter ID of the novel being written.")
@@ -56,23 +59,16 @@ class Chapter(BaseModel):
 
 class ChapterOutput(BaseModel):
     chapters: List[Chapter] = Field(description="A list of chapter outlines.")
-    
-def text_reducer(left: str | None, right: str | None) -> str: 
-    """Merges two strings, with the right one taking precedence.
-    Used as the reducer function for final_novel_text in the agent state.
-    Args:
-        left: The left string (text from the current chapter).
-        right: The right string (text from the new chapter).
-    Returns:
-        The merged string, separated by two newlines.
-    """
-    if left is None:
-        return right
-    elif right is None:
-        return left
-    else:
-        return left + '\n\n' + right
 
+class OutlineFix(BaseModel):
+    """A corrected scene outline at a chapter boundary."""
+    chapter_id: int = Field(..., description="The chapter ID of the scene to fix.")
+    scene_id: int = Field(..., description="The scene ID of the scene to fix, within its chapter.")
+    outline: str = Field(..., description="The corrected summary of the scene's plot and purpose.")
+
+class OutlineFixOutput(BaseModel):
+    fixes: List[OutlineFix] = Field(description="The scenes whose outlines need to change; empty if none.")
+    
 class NovelState(AgentState):
     """
     Inherits from LangGraph's AgentState and adds elements related to novel writing.
@@ -92,11 +88,58 @@ class NovelState(AgentState):
     # === Novel Outline ===
     chapter_outline: NotRequired[list[Chapter]]
     scene_outline: NotRequired[list[SceneOutput]]
+
+    # === Outline Options ===
+    # "parallel" outlines all chapters concurrently from a chapter digest (default "sequential")
+    outline_mode: NotRequired[Literal["sequential", "parallel"]]
+    outline_concurrency: NotRequired[int]
+    # run one extra pass to fix inconsistencies at chapter boundaries (parallel mode only)
+    outline_reconcile: NotRequired[bool]
+    # sequential mode: the last `outline_window` chapters are given in full, older ones as summaries,
+    # all within `outline_token_budget` tokens (defaults 3 and 3000)
+    outline_window: NotRequired[int]
+    outline_token_budget: NotRequired[int]
+
+    # === Summary Options ===
+    # novel_summary is assembled from rolling summaries (scene -> chapter -> arc) within
+    # summary_token_budget tokens; the last summary_keep_chapters finished chapters keep their
+    # own chapter summary, older ones are merged into the arc summary (defaults 2000 and 5)
+    summary_token_budget: NotRequired[int]
+    summary_keep_chapters: NotRequired[int]
+
+    # === Retrieval Options ===
+    # the writer and editor get the earlier passages (scene summaries and content chunks) most relevant
+    # to the current scene's characters and outline, within retrieval_token_budget tokens (default 1500, 0 disables)
+    retrieval_token_budget: NotRequired[int]
+    
+    # === Manuscript Options ===
+    # approved scenes are appended to a manuscript store and the state only keeps a reference to it;
+    # the chunks go to a JSONL file in manuscript_dir, or, unset, in a directory of the run's own removed at the end
+    manuscript_dir: NotRequired[str]
+
+    # === Pipeline Options ===
+    # summarize each approved scene in the background while the next scene is drafted (default True)
+    pipeline_summaries: NotRequired[bool]
+    # draft the next scene while the editor reviews the current one; kept if the current draft is
+    # approved unchanged, discarded if it is revised (default False)
+    speculative_drafting: NotRequired[bool]
+
+    # === Writing Options ===
+    # "parallel" writes up to writing_concurrency chapters at once from the outlines, then stitches the
+    # chapter transitions and regenerates the summaries in order (default "sequential", concurrency 4)
+    writing_mode: NotRequired[Literal["sequential", "parallel"]]
+    writing_concurrency: NotRequired[int]
     
     # === Final Product ===
-    final_novel_text: Annotated[NotRequired[str], text_reducer]
+    # reference to the append-only manuscript; final_novel_text is materialized once by the final namer
+    manuscript: NotRequired[ManuscriptRef]
+    # the directory the scene bodies are stored in: manuscript_dir, or a run directory set by the scene outliner
+    store_dir: NotRequired[str]
+    final_novel_text: NotRequired[str]
     novel_summary: NotRequired[str]
+    summary_memory: NotRequired[SummaryMemory]
     novel_title: NotRequired[str]
+    speculation_stats: NotRequired[dict]
     
     # === Flow Control ===
     is_finished: NotRequired[bool]
@@ -119,6 +162,21 @@ class WritingState(AgentState):
     # === the last content of the last chapter ===
     last_scene_content: NotRequired[str]
     novel_summary: NotRequired[str]
+    # hierarchical rolling summaries that novel_summary is assembled from
+    summary_memory: NotRequired[SummaryMemory]
+    summary_token_budget: NotRequired[int]
+    summary_keep_chapters: NotRequired[int]
+    # reference to the BM25 index over the approved scenes, queried by the writer and editor; the passages
+    # are appended to a file in store_dir scene by scene, so the index is never copied into a checkpoint
+    scene_index: NotRequired[ManuscriptRef]
+    retrieval_token_budget: NotRequired[int]
+    # summary of the last approved scene still being generated in the background; merged by the editor
+    pending_summary: NotRequired[Optional[PendingSummary]]
+    pipeline_summaries: NotRequired[bool]
+    # speculative draft of the next scene, and hit / miss / time-saved counters
+    speculative_draft: NotRequired[Optional[SpeculativeDraft]]
+    speculative_drafting: NotRequired[bool]
+    speculation_stats: NotRequired[dict]
 
     # === Content Generation ===
     current_chapter_id: NotRequired[int]
@@ -131,7 +189,9 @@ class WritingState(AgentState):
     revision_count: NotRequired[int]
 
     # === chapter content ===
-    final_novel_text: Annotated[NotRequired[str], text_reducer]
+    manuscript: NotRequired[ManuscriptRef]
+    manuscript_dir: NotRequired[str]
+    store_dir: NotRequired[str]
     is_finished: NotRequired[bool]
 
 class EditorOutput(BaseModel):
@@ -0,0 +1,2 @@
+"""Language-independent helpers shared by the English and Chinese story graphs.
+"""
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+from story_common.runtime import schedule
+
+# Background work that overlaps with the next node on the critical path (e.g. summarizing an
+# approved scene while the next one is drafted), run as a task on the resident event loop.
+# Futures cannot live in the checkpointed state, so the state carries a small job record and the
+# future is kept here, keyed by job id. When the future is gone (the process restarted and the
+# thread was resumed from a checkpoint) the caller recomputes the result.
+
+_lock = threading.Lock()
+_jobs: Dict[str, Future] = {}
+
+
+class PendingSummary(BaseModel):
+    """The summary of an approved scene that is still being generated in the background."""
+    job_id: str
+    chapter_id: int
+    scene_id: int
+    content_ref: str
+
+
+class SpeculativeDraft(BaseModel):
+    """A draft of the next scene started while the editor reviews the current one."""
+    job_id: str
+    chapter_id: int
+    scene_id: int
+    # the scene the draft continues from, and the key of the draft it was based on
+    after_chapter_id: int
+    after_scene_id: int
+    based_on: str
+    # summary of the reviewed draft, started under the same bet; adopted by the content approver
+    summary_job_id: Optional[str] = None
+
+
+def submit(coro: Awaitable) -> str:
+    """start a coroutine in the background and return a job id for collect()"""
+    job_id = uuid.uuid4().hex
+    future = schedule(coro)
+    with _lock:
+        _jobs[job_id] = future
+    return job_id
+
+
+async def collect(job_id: str, fallback: Callable[[], Awaitable[Any]]) -> Any:
+    """wait for a background job and return its result; awaits fallback() when the job is unknown here"""
+    with _lock:
+        future = _jobs.pop(job_id, None)
+    if future is None:
+        return await fallback()
+    return await asyncio.wrap_future(future)
+
+
+def discard(job_id: str) -> None:
+    """drop a background job whose result is no longer wanted (its task is cancelled)"""
+    with _lock:
+        future = _jobs.pop(job_id, None)
+    if future is not None:
+        future.cancel()
@@ -0,0 +1,79 @@
+import re
+from typing import List, Tuple
+
+# CJK characters are roughly one token each, other text roughly four characters per token
+CJK_PATTERN = re.compile(r'[一-鿿぀-ヿ가-힯]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    cheap token estimate used for prompt budgets (no tokenizer dependency)
+    """
+    if not text:
+        return 0
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """keep the beginning of text within roughly `budget` tokens"""
+    if estimate_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + "…"
+
+
+def split_opening(text: str, max_chars: int = 800) -> Tuple[str, str]:
+    """
+    split text into an opening of whole paragraphs (at most max_chars, but at least the first
+    paragraph) and the rest, so the opening can be rewritten and joined back with opening + rest
+    """
+    if len(text) <= max_chars:
+        return text, ""
+    cut = text.rfind("\n", 0, max_chars)
+    if cut <= 0:
+        cut = text.find("\n", max_chars)
+    if cut <= 0:
+        return text, ""
+    return text[:cut], text[cut:]
+
+
+class OutlineContext:
+    """
+    incremental continuity context for sequential scene outlining
+
+    every chapter is rendered once when it is appended, as a full text (all scene outlines)
+    and a short summary. render() assembles, newest first, the full text of the last `window`
+    chapters and the summaries of older chapters until `token_budget` is reached, so the prompt
+    stays flat however many chapters have been outlined
+    """
+
+    def __init__(self, token_budget: int = 3000, window: int = 3):
+        self.token_budget = token_budget
+        self.window = window
+        # (full text, full tokens, summary, summary tokens) per chapter, append-only
+        self.chunks: List[Tuple[str, int, str, int]] = []
+
+    def append(self, full_text: str, summary: str) -> None:
+        self.chunks.append((full_text, estimate_tokens(full_text), summary, estimate_tokens(summary)))
+
+    def render(self) -> str:
+        parts = []
+        remaining = self.token_budget
+        for age, (full_text, full_tokens, summary, summary_tokens) in enumerate(reversed(self.chunks)):
+            if age < self.window and full_tokens <= remaining:
+                parts.append(full_text)
+                remaining -= full_tokens
+            elif summary_tokens <= remaining:
+                parts.append(summary)
+                remaining -= summary_tokens
+            else:
+                # older chapters would not fit either
+                break
+        return "\n".join(reversed(parts))
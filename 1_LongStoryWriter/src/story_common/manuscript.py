@@ -0,0 +1,87 @@
+import json
+import os
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+class ManuscriptRef(BaseModel):
+    """
+    a constant-size reference to an append-only manuscript: where its chunks live and how many
+    of them belong to this point of the run
+
+    chunks beyond `chunks` (left over from a retried node or an older checkpoint) are ignored,
+    so resuming or replaying a thread never duplicates a scene
+    """
+    uri: str
+    chunks: int = 0
+    chars: int = 0
+
+
+class FileManuscriptStore:
+    """
+    append-only storage of manuscript chunks, addressed by chunk index: one JSON line per chunk
+    in a local file; a rewritten index (after a retry) takes the last line
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, index: int, text: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"index": index, "text": text}, ensure_ascii=False) + "\n")
+
+    def read(self, count: int) -> List[str]:
+        """the first `count` chunks, in order"""
+        chunks: Dict[int, str] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["index"] < count:
+                    chunks[record["index"]] = record["text"]
+        return [chunks[i] for i in range(count)]
+
+    def scan(self, offset: int = 0) -> Tuple[List[Tuple[int, str]], int]:
+        """
+        the (index, text) records of the complete lines after byte `offset`, in file order,
+        and the offset to continue from; lets a reader pick up only what was appended since
+        """
+        records = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # a line still being written
+                    break
+                record = json.loads(line)
+                records.append((record["index"], record["text"]))
+                offset += len(line)
+        return records, offset
+
+
+def create_manuscript(directory: str, prefix: str = "") -> ManuscriptRef:
+    """a new empty manuscript, a JSONL file in `directory` (the run's store directory)"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.abspath(os.path.join(directory, f"{prefix}{uuid.uuid4().hex}.jsonl"))
+    open(path, "a", encoding="utf-8").close()
+    return ManuscriptRef(uri=f"file://{path}")
+
+
+def open_store(ref: ManuscriptRef) -> FileManuscriptStore:
+    if not ref.uri.startswith("file://"):
+        raise ValueError(f"unsupported manuscript uri: {ref.uri}")
+    return FileManuscriptStore(ref.uri[len("file://"):])
+
+
+def append_chunk(ref: ManuscriptRef, text: str) -> ManuscriptRef:
+    """write a chunk after the last one `ref` knows of and return the advanced reference"""
+    open_store(ref).write(ref.chunks, text)
+    return ref.model_copy(update={"chunks": ref.chunks + 1, "chars": ref.chars + len(text)})
+
+
+def materialize(ref: Optional[ManuscriptRef], separator: str = "\n\n") -> str:
+    """the full manuscript text, read once from the store"""
+    if ref is None or ref.chunks == 0:
+        return ""
+    return separator.join(open_store(ref).read(ref.chunks))
@@ -0,0 +1,66 @@
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from story_common.context import estimate_tokens, truncate_to_tokens
+
+
+class SummaryEntry(BaseModel):
+    """A scene or chapter summary, already labelled (e.g. "Summary of Chapter 3 Scene 2: ...")."""
+    chapter_id: int
+    scene_id: int = 0
+    text: str
+
+
+class SummaryMemory(BaseModel):
+    """
+    hierarchical rolling summaries of the novel written so far: scene -> chapter -> arc
+
+    - scenes: scene summaries of the chapters that have not been rolled up yet
+    - chapters: chapter summaries of the most recent finished chapters
+    - arc: one running summary of everything older
+
+    the graph decides when to roll up (finished_chapter / chapters_to_fold) and produces
+    the summaries with the LLM; render() assembles the prompt text under a token budget
+    """
+    arc: str = ""
+    chapters: List[SummaryEntry] = Field(default_factory=list)
+    scenes: List[SummaryEntry] = Field(default_factory=list)
+
+    def finished_chapter(self, current_chapter_id: int) -> Optional[Tuple[int, List[str]]]:
+        """the earliest chapter whose scenes are all before current_chapter_id, with its scene summaries"""
+        earlier = [entry for entry in self.scenes if entry.chapter_id != current_chapter_id]
+        if not earlier:
+            return None
+        chapter_id = earlier[0].chapter_id
+        return chapter_id, [entry.text for entry in earlier if entry.chapter_id == chapter_id]
+
+    def close_chapter(self, chapter_id: int, summary: str) -> None:
+        """replace a finished chapter's scene summaries with its chapter summary"""
+        self.scenes = [entry for entry in self.scenes if entry.chapter_id != chapter_id]
+        self.chapters.append(SummaryEntry(chapter_id=chapter_id, text=summary))
+
+    def chapters_to_fold(self, keep_chapters: int) -> List[SummaryEntry]:
+        """remove and return the oldest chapter summaries beyond keep_chapters, to be merged into the arc"""
+        overflow = max(len(self.chapters) - keep_chapters, 0)
+        folded, self.chapters = self.chapters[:overflow], self.chapters[overflow:]
+        return folded
+
+    def add_scene(self, chapter_id: int, scene_id: int, summary: str) -> None:
+        self.scenes.append(SummaryEntry(chapter_id=chapter_id, scene_id=scene_id, text=summary))
+
+    def render(self, token_budget: int) -> str:
+        """
+        assemble the summary text under token_budget: the arc (capped at a quarter of the budget),
+        then the newest scene summaries and chapter summaries that still fit, in story order
+        """
+        arc = truncate_to_tokens(self.arc, token_budget // 4) if self.arc else ""
+        remaining = token_budget - estimate_tokens(arc)
+        recent = []
+        for entry in reversed(self.chapters + self.scenes):
+            tokens = estimate_tokens(entry.text)
+            if tokens > remaining:
+                break
+            recent.append(entry.text)
+            remaining -= tokens
+        return "\n\n".join([arc] * bool(arc) + list(reversed(recent)))
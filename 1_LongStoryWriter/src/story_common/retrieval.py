@@ -0,0 +1,231 @@
+import json
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from story_common.context import CJK_PATTERN, estimate_tokens
+from story_common.manuscript import ManuscriptRef, append_chunk, create_manuscript, open_store
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+CJK_RUN_PATTERN = re.compile(CJK_PATTERN.pattern + '+')
+PARAGRAPH_PATTERN = re.compile(r'[^\n]*\S[^\n]*')
+SENTENCE_PATTERN = re.compile(r'[^.!?。！？…]+[.!?。！？…]*')
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "had", "has", "have", "he",
+    "her", "his", "in", "into", "is", "it", "its", "of", "on", "or", "she", "that", "the", "their",
+    "them", "they", "this", "to", "was", "were", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """lowercased Latin words (minus stopwords) plus CJK character bigrams, so no word segmenter is needed"""
+    lowered = text.lower()
+    terms = [word for word in WORD_PATTERN.findall(lowered) if len(word) > 1 and word not in STOPWORDS]
+    for run in CJK_RUN_PATTERN.findall(lowered):
+        terms.extend(run if len(run) == 1 else (run[i:i + 2] for i in range(len(run) - 1)))
+    return terms
+
+
+def chunk_spans(text: str, max_tokens: int = 200) -> List[Tuple[int, int]]:
+    """
+    split a scene into passages of whole paragraphs (or sentences, for long paragraphs)
+    of about max_tokens, returned as (start, end) offsets into text
+    """
+    pieces = []
+    for paragraph in PARAGRAPH_PATTERN.finditer(text):
+        start = paragraph.start()
+        if estimate_tokens(paragraph.group()) <= max_tokens:
+            pieces.append(paragraph.span())
+        else:
+            pieces.extend((start + sentence.start(), start + sentence.end())
+                          for sentence in SENTENCE_PATTERN.finditer(paragraph.group()))
+
+    spans, current, current_tokens = [], None, 0
+    for start, end in pieces:
+        tokens = estimate_tokens(text[start:end])
+        if current and current_tokens + tokens > max_tokens:
+            spans.append(current)
+            current, current_tokens = None, 0
+        current = (current[0] if current else start, end)
+        current_tokens += tokens
+    if current:
+        spans.append(current)
+    return spans
+
+
+class Passage(BaseModel):
+    """
+    An indexed scene summary or content chunk with its term frequencies.
+    Content chunks of a stored scene keep only the scene's store key and offsets instead of the text.
+    """
+    chapter_id: int
+    scene_id: int
+    kind: Literal["summary", "content"]
+    text: str = ""
+    ref: Optional[str] = None
+    start: int = 0
+    end: int = 0
+    terms: Dict[str, int] = Field(default_factory=dict)
+    length: int = 0
+
+
+class SceneIndex(BaseModel):
+    """
+    local BM25 index over the scenes written so far, updated incrementally as scenes are approved
+
+    document frequencies and the total length are maintained on every add, so nothing is rebuilt
+    when a scene is appended; no external service or dependency is involved. The graphs do not keep
+    the index in their state: each scene's passages are appended to a file in the run's store
+    directory (see index_scene / load_index) and the state only holds a reference to it
+    """
+    passages: List[Passage] = Field(default_factory=list)
+    doc_freq: Dict[str, int] = Field(default_factory=dict)
+    total_length: int = 0
+    k1: float = 1.5
+    b: float = 0.75
+
+    def add(self, chapter_id: int, scene_id: int, kind: Literal["summary", "content"], text: str,
+            ref: Optional[str] = None, start: int = 0, end: int = 0) -> None:
+        """index a passage; with `ref`, only the reference and offsets are kept, not the text"""
+        terms: Dict[str, int] = {}
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + 1
+        self.add_passage(Passage(chapter_id=chapter_id, scene_id=scene_id, kind=kind,
+                                 text="" if ref else text, ref=ref, start=start, end=end,
+                                 terms=terms, length=sum(terms.values())))
+
+    def add_passage(self, passage: Passage) -> None:
+        """append an already tokenized passage and update the collection statistics"""
+        for term in passage.terms:
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+        self.total_length += passage.length
+        self.passages.append(passage)
+
+    def add_scene(self, chapter_id: int, scene_id: int, summary: str, content: str,
+                  ref: Optional[str] = None, chunk_tokens: int = 200) -> None:
+        """index a finished scene: its summary and its content split into chunks (`ref`: the content's store key)"""
+        self.add(chapter_id, scene_id, "summary", summary)
+        for start, end in chunk_spans(content, chunk_tokens):
+            self.add(chapter_id, scene_id, "content", content[start:end], ref=ref, start=start, end=end)
+
+    def search(self, query: str) -> List[Tuple[float, Passage]]:
+        """(score, passage) pairs with a positive BM25 score, best first"""
+        if not self.passages:
+            return []
+        query_terms = set(tokenize(query))
+        count = len(self.passages)
+        avg_length = self.total_length / count or 1
+        idf = {
+            term: math.log(1 + (count - self.doc_freq[term] + 0.5) / (self.doc_freq[term] + 0.5))
+            for term in query_terms if term in self.doc_freq
+        }
+        results = []
+        for passage in self.passages:
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * passage.length / avg_length)
+            for term, weight in idf.items():
+                freq = passage.terms.get(term)
+                if freq:
+                    score += weight * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                results.append((score, passage))
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results
+
+    def render(self, query: str, token_budget: int, label: Callable[[Passage, str], str],
+               load: Optional[Callable[[str], str]] = None) -> str:
+        """
+        the best-scoring passages that fit in token_budget, labelled and in story order
+        load: reads a stored scene body by key, for passages that only keep a reference
+        """
+        contents: Dict[str, str] = {}
+        selected, remaining = [], token_budget
+        for _, passage in self.search(query):
+            if passage.ref is None:
+                body = passage.text
+            else:
+                if passage.ref not in contents:
+                    contents[passage.ref] = load(passage.ref)
+                body = contents[passage.ref][passage.start:passage.end]
+            text = label(passage, body)
+            tokens = estimate_tokens(text)
+            if tokens > remaining:
+                continue
+            selected.append((passage, text))
+            remaining -= tokens
+        # passages are appended as scenes are approved, so their position is the story order
+        position = {id(passage): i for i, passage in enumerate(self.passages)}
+        selected.sort(key=lambda item: position[id(item[0])])
+        return "\n\n".join(text for _, text in selected)
+
+
+def index_scene(index_ref: Optional[ManuscriptRef], directory: str, chapter_id: int, scene_id: int,
+                summary: str, content: str, ref: Optional[str] = None) -> ManuscriptRef:
+    """
+    append a finished scene's passages to the index file in `directory` (created on the first scene)
+    and return the advanced reference; like the manuscript, a retried write replaces its own chunk
+    """
+    scene = SceneIndex()
+    scene.add_scene(chapter_id, scene_id, summary, content, ref=ref)
+    chunk = json.dumps([passage.model_dump() for passage in scene.passages], ensure_ascii=False)
+    return append_chunk(index_ref or create_manuscript(directory, prefix="index-"), chunk)
+
+
+@dataclass
+class _LoadedIndex:
+    """an index built from the first `chunks` chunks of an index file, read up to byte `offset`"""
+    index: SceneIndex
+    chunks: int = 0
+    offset: int = 0
+    # chunks already read past `chunks` (written by a run that is ahead of the reference)
+    pending: Dict[int, str] = field(default_factory=dict)
+
+
+INDEX_CACHE_SIZE = 64
+_cache_lock = threading.Lock()
+_index_cache: "OrderedDict[str, _LoadedIndex]" = OrderedDict()
+
+
+def load_index(index_ref: Optional[ManuscriptRef]) -> Optional[SceneIndex]:
+    """
+    the index over the scenes `index_ref` knows of
+
+    loaded indexes are cached per index file, so a call only reads the lines appended since the
+    last one and adds their passages; the file is read in full again only when an indexed chunk was
+    rewritten (a retried node) or the reference is older than the cached index. A cached index is
+    never modified, a newer one is a shallow copy with the new passages, so callers can keep using it
+    """
+    if index_ref is None or index_ref.chunks == 0:
+        return None
+    with _cache_lock:
+        loaded = _index_cache.get(index_ref.uri)
+    if loaded is None or loaded.chunks > index_ref.chunks:
+        loaded = _LoadedIndex(SceneIndex())
+
+    store = open_store(index_ref)
+    records, offset = store.scan(loaded.offset)
+    if any(i < loaded.chunks for i, _ in records):
+        loaded = _LoadedIndex(SceneIndex())
+        records, offset = store.scan()
+    elif not records and loaded.chunks == index_ref.chunks:
+        return loaded.index
+    pending = {**loaded.pending, **dict(records)}
+
+    base = loaded.index
+    index = SceneIndex.model_construct(passages=list(base.passages), doc_freq=dict(base.doc_freq),
+                                       total_length=base.total_length, k1=base.k1, b=base.b)
+    for i in range(loaded.chunks, index_ref.chunks):
+        for passage in json.loads(pending.pop(i)):
+            index.add_passage(Passage(**passage))
+
+    with _cache_lock:
+        _index_cache[index_ref.uri] = _LoadedIndex(index, index_ref.chunks, offset, pending)
+        _index_cache.move_to_end(index_ref.uri)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
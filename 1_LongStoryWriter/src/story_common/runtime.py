@@ -0,0 +1,89 @@
+import asyncio
+import contextvars
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+from langchain.chat_models import init_chat_model
+from langchain_core.runnables import RunnableLambda
+
+# The graph nodes are async (LLM calls use ainvoke) and all of them run on one resident event loop
+# in a background thread, whoever calls the graph: sync entry points (graph.invoke / stream, e.g. in a
+# notebook) block on the result, async ones (ainvoke / astream, `langgraph dev`, the platform server)
+# await it. Keeping every coroutine on that one loop lets all concurrent runs share one
+# httpx.AsyncClient connection pool, whose connections are bound to the loop that opened them.
+
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 60.0
+# a scene of a few thousand words can take minutes to generate
+HTTP_TIMEOUT = 600.0
+HTTP_CONNECT_TIMEOUT = 10.0
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_http_clients: Optional[tuple] = None
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """the event loop every node runs on, started in a daemon thread on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="story-event-loop", daemon=True).start()
+        return _loop
+
+
+async def _run_in_context(coro: Awaitable, context: contextvars.Context) -> Any:
+    return await asyncio.get_running_loop().create_task(coro, context=context)
+
+
+def schedule(coro: Awaitable):
+    """
+    start a coroutine on the resident loop in the caller's contextvars context (so LangChain callbacks
+    and the run config carry over) and return its concurrent.futures.Future
+    """
+    return asyncio.run_coroutine_threadsafe(_run_in_context(coro, contextvars.copy_context()), get_event_loop())
+
+
+def run_coroutine(coro: Awaitable) -> Any:
+    """run a coroutine on the resident loop and block until it finishes (sync entry points)"""
+    return schedule(coro).result()
+
+
+async def await_coroutine(coro: Awaitable) -> Any:
+    """run a coroutine on the resident loop and await it from whichever loop the caller is on"""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is get_event_loop():
+        return await coro
+    return await asyncio.wrap_future(schedule(coro))
+
+
+def node(afunc: Callable[..., Awaitable[dict]]) -> RunnableLambda:
+    """wrap an async node so that the graph can be run with both invoke and ainvoke"""
+    return RunnableLambda(lambda state: run_coroutine(afunc(state)),
+                          afunc=lambda state: await_coroutine(afunc(state)), name=afunc.__name__)
+
+
+def http_clients() -> tuple:
+    """the process-wide (sync, async) httpx clients, so that all runs share keep-alive connections"""
+    global _http_clients
+    with _lock:
+        if _http_clients is None:
+            limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                  max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                                  keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+            timeout = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+            _http_clients = (httpx.Client(limits=limits, timeout=timeout),
+                             httpx.AsyncClient(limits=limits, timeout=timeout))
+        return _http_clients
+
+
+def chat_model(**kwargs: Any):
+    """init_chat_model on the shared HTTP connection pools"""
+    http_client, http_async_client = http_clients()
+    return init_chat_model(http_client=http_client, http_async_client=http_async_client, **kwargs)
@@ -0,0 +1,55 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from typing import Optional
+
+# Content-addressed store for scene bodies: each body is stored once under the SHA-256 of its
+# text and the state only carries that key, so checkpoints stay small however many scenes have
+# been written. Identical text maps to the same key, so a retried or replayed write is a no-op.
+# The bodies are files `<dir>/scenes/<key[:2]>/<key>.txt` in the run's store directory: its
+# manuscript_dir, or a directory of its own under STORY_DATA_DIR that the run removes when it is done,
+# so a run resumed from a checkpoint in a new process still finds them.
+
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser("~"), ".cache", "long_story_writer")
+
+
+def new_run_directory() -> str:
+    """a fresh store directory for a run without a manuscript_dir"""
+    root = os.getenv("STORY_DATA_DIR") or DEFAULT_DATA_DIR
+    return os.path.abspath(os.path.join(root, "runs", uuid.uuid4().hex))
+
+
+def remove_run_directory(directory: Optional[str]) -> None:
+    """delete a run directory created by new_run_directory, with everything the run stored in it"""
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def content_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _path(directory: str, key: str) -> str:
+    return os.path.join(directory, "scenes", key[:2], f"{key}.txt")
+
+
+def put_scene(text: str, directory: str) -> str:
+    """store a scene body and return its key"""
+    key = content_key(text)
+    path = _path(directory, key)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write then rename, so a reader never sees a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    return key
+
+
+def get_scene(key: str, directory: str) -> str:
+    """the scene body stored under key"""
+    with open(_path(directory, key), "r", encoding="utf-8") as f:
+        return f.read()
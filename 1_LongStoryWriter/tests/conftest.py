@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the packages live in src/ (story_common, English_Story, Chinese_Story)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,69 @@
+from story_common.context import OutlineContext, estimate_tokens, split_opening, truncate_to_tokens
+
+
+def chapter(i: int, tokens: int = 100) -> tuple:
+    """full text of about `tokens` tokens and a one-line summary for chapter i"""
+    return f"FULL{i} " + "x" * (tokens * 4 - 6), f"SUM{i}"
+
+
+def labels(text: str) -> list:
+    return [line.split()[0] for line in text.split("\n")]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    # CJK characters count as one token each
+    assert estimate_tokens("季度报告") == 4
+    assert estimate_tokens("季度 report") == 2 + 2
+
+
+def test_truncate_to_tokens():
+    assert truncate_to_tokens("short", 10) == "short"
+    truncated = truncate_to_tokens("word " * 100, 10)
+    assert truncated.endswith("…")
+    assert estimate_tokens(truncated[:-1]) <= 10
+
+
+def test_split_opening():
+    text = "first paragraph\n" + "a" * 900 + "\nlast"
+    opening, rest = split_opening(text, max_chars=800)
+    assert opening == "first paragraph" and opening + rest == text
+    assert split_opening("short", max_chars=800) == ("short", "")
+
+
+def test_outline_context_window_and_summaries():
+    context = OutlineContext(token_budget=10_000, window=2)
+    assert context.render() == ""
+    for i in range(1, 6):
+        context.append(*chapter(i))
+    # the last `window` chapters in full, older ones as summaries, in story order
+    assert labels(context.render()) == ["SUM1", "SUM2", "SUM3", "FULL4", "FULL5"]
+
+
+def test_outline_context_respects_budget():
+    context = OutlineContext(token_budget=250, window=3)
+    for i in range(1, 6):
+        context.append(*chapter(i))
+    rendered = context.render()
+    # two full chapters fit; the third falls back to its summary, and so do the older ones
+    assert labels(rendered) == ["SUM1", "SUM2", "SUM3", "FULL4", "FULL5"]
+    assert estimate_tokens(rendered) <= 250
+
+
+def test_outline_context_stops_when_nothing_fits():
+    context = OutlineContext(token_budget=100, window=1)
+    context.append("FULL1 " + "summary that is far too long " * 20, "SUM1 " + "y" * 400)
+    context.append(*chapter(2, tokens=99))
+    assert labels(context.render()) == ["FULL2"]
+
+
+def test_outline_context_stays_flat():
+    context = OutlineContext(token_budget=600, window=3)
+    for i in range(1, 300):
+        context.append(*chapter(i))
+        assert estimate_tokens(context.render()) <= 600
+    # the oldest summaries are dropped once the budget is used up
+    rendered = labels(context.render())
+    assert rendered[-3:] == ["FULL297", "FULL298", "FULL299"]
+    assert "SUM1" not in rendered
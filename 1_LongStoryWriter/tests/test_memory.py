@@ -0,0 +1,61 @@
+from story_common.context import estimate_tokens
+from story_common.memory import SummaryMemory
+
+
+def summary(label: str, tokens: int = 50) -> str:
+    return f"{label} " + "x" * (tokens * 4 - len(label) - 1)
+
+
+def test_finished_chapter_and_close_chapter():
+    memory = SummaryMemory()
+    memory.add_scene(1, 1, "c1s1")
+    memory.add_scene(1, 2, "c1s2")
+    assert memory.finished_chapter(1) is None
+
+    memory.add_scene(2, 1, "c2s1")
+    assert memory.finished_chapter(2) == (1, ["c1s1", "c1s2"])
+    memory.close_chapter(1, "chapter 1")
+    assert [entry.text for entry in memory.chapters] == ["chapter 1"]
+    assert [entry.text for entry in memory.scenes] == ["c2s1"]
+    assert memory.finished_chapter(2) is None
+
+
+def test_chapters_to_fold_keeps_the_newest():
+    memory = SummaryMemory()
+    for chapter_id in range(1, 8):
+        memory.close_chapter(chapter_id, f"chapter {chapter_id}")
+    folded = memory.chapters_to_fold(5)
+    assert [entry.chapter_id for entry in folded] == [1, 2]
+    assert [entry.chapter_id for entry in memory.chapters] == [3, 4, 5, 6, 7]
+    assert memory.chapters_to_fold(5) == []
+
+
+def test_render_in_story_order():
+    memory = SummaryMemory(arc="ARC")
+    memory.close_chapter(1, "CH1")
+    memory.add_scene(2, 1, "S2.1")
+    memory.add_scene(2, 2, "S2.2")
+    assert memory.render(1000) == "ARC\n\nCH1\n\nS2.1\n\nS2.2"
+    assert SummaryMemory().render(1000) == ""
+
+
+def test_render_keeps_the_newest_entries_within_budget():
+    memory = SummaryMemory()
+    for chapter_id in range(1, 4):
+        memory.close_chapter(chapter_id, summary(f"CH{chapter_id}"))
+    for scene_id in range(1, 4):
+        memory.add_scene(4, scene_id, summary(f"S4.{scene_id}"))
+    rendered = memory.render(220)
+    assert estimate_tokens(rendered) <= 220
+    # four 50-token entries fit; the oldest chapter summaries are left out
+    assert [part.split()[0] for part in rendered.split("\n\n")] == ["CH3", "S4.1", "S4.2", "S4.3"]
+
+
+def test_render_caps_the_arc_at_a_quarter_of_the_budget():
+    memory = SummaryMemory(arc=summary("ARC", tokens=1000))
+    memory.add_scene(1, 1, summary("S1.1"))
+    rendered = memory.render(400)
+    arc, scene = rendered.split("\n\n")
+    assert arc.endswith("…") and estimate_tokens(arc[:-1]) <= 100
+    assert scene.startswith("S1.1")
+    assert estimate_tokens(rendered) <= 400
@@ -0,0 +1,127 @@
+import json
+import re
+
+from story_common import manuscript
+from story_common.retrieval import SceneIndex, chunk_spans, index_scene, load_index, tokenize
+
+SCENES = [
+    (1, 1, "Mara repairs the lighthouse lamp.",
+     "Mara climbed the lighthouse stairs.\n\nThe lamp had gone dark and the harbour waited."),
+    (1, 2, "Tomas sells fish at the market.",
+     "The market was loud. Tomas sold fish to anyone who would listen."),
+    (2, 1, "Mara notices the tide is missing.",
+     "At dawn the tide did not come back. Mara stared at the bare sand below the lighthouse."),
+]
+
+
+def build_index() -> SceneIndex:
+    index = SceneIndex()
+    for chapter_id, scene_id, summary, content in SCENES:
+        index.add_scene(chapter_id, scene_id, summary, content)
+    return index
+
+
+def test_tokenize():
+    assert tokenize("The Lighthouse and a lamp") == ["lighthouse", "lamp"]
+    # CJK runs become character bigrams, so no word segmenter is needed
+    assert tokenize("灯塔看守") == ["灯塔", "塔看", "看守"]
+
+
+def test_chunk_spans_cover_whole_paragraphs():
+    text = "\n\n".join(f"Paragraph {i} " + "word " * 30 for i in range(6))
+    spans = chunk_spans(text, max_tokens=60)
+    assert len(spans) > 1
+    for start, end in spans:
+        assert text[start:end].startswith("Paragraph")
+
+
+def test_search_ranks_by_bm25():
+    results = build_index().search("tide lighthouse")
+    top = results[0][1]
+    # the passages mentioning both terms outrank those mentioning one
+    assert (top.chapter_id, top.scene_id) == (2, 1)
+    assert all(score > 0 for score, _ in results)
+    assert [score for score, _ in results] == sorted((score for score, _ in results), reverse=True)
+    assert all((p.chapter_id, p.scene_id) != (1, 2) for _, p in results)
+
+
+def test_rare_terms_weigh_more():
+    index = build_index()
+    [(_, passage)] = [(s, p) for s, p in index.search("fish") if p.kind == "content"]
+    assert passage.scene_id == 2
+    assert index.search("") == []
+    assert SceneIndex().search("lighthouse") == []
+
+
+def test_render_respects_budget_and_story_order():
+    index = build_index()
+    label = lambda passage, text: f"[{passage.chapter_id}.{passage.scene_id} {passage.kind}] {text}"
+    rendered = index.render("Mara lighthouse tide", 1000, label)
+    order = re.findall(r"\[(\d)\.(\d) (summary|content)\]", rendered)
+    assert order == sorted(order, key=lambda item: (item[0], item[1], item[2] == "content"))
+    assert ("2", "1", "summary") in order
+    assert index.render("Mara lighthouse tide", 5, label) == ""
+
+
+def test_referenced_passages_load_from_the_store():
+    index = SceneIndex()
+    content = "The lamp had gone dark.\n\nThe harbour waited."
+    index.add_scene(1, 1, "the lamp goes dark", content, ref="key1")
+    stored = [p for p in index.passages if p.kind == "content"]
+    assert stored and all(p.text == "" and p.ref == "key1" for p in stored)
+
+    loads = []
+    load = lambda key: loads.append(key) or content
+    rendered = index.render("lamp harbour", 1000, lambda passage, text: text, load)
+    assert "The lamp had gone dark." in rendered
+    # each stored scene body is read once per render
+    assert loads == ["key1"]
+
+
+def test_index_file_round_trip(tmp_path):
+    ref = None
+    for chapter_id, scene_id, summary, content in SCENES:
+        ref = index_scene(ref, str(tmp_path), chapter_id, scene_id, summary, content)
+    assert ref.chunks == len(SCENES)
+    loaded, built = load_index(ref), build_index()
+    assert loaded.doc_freq == built.doc_freq and loaded.total_length == built.total_length
+    assert [(s, p.scene_id) for s, p in loaded.search("tide")] == [(s, p.scene_id) for s, p in built.search("tide")]
+    # an older reference only sees the scenes indexed up to that point
+    assert {p.scene_id for p in load_index(ref.model_copy(update={"chunks": 1})).passages} == {1}
+    assert load_index(None) is None
+
+
+def test_retried_scene_replaces_its_chunk(tmp_path):
+    first = index_scene(None, str(tmp_path), *SCENES[0])
+    index_scene(first, str(tmp_path), 1, 2, "a draft that was retried", "Draft text.")
+    second = index_scene(first, str(tmp_path), *SCENES[1])
+    loaded = load_index(second)
+    assert [p.scene_id for p in loaded.passages if p.kind == "summary"] == [1, 2]
+    assert "retried" not in json.dumps([p.terms for p in loaded.passages])
+
+
+def test_load_index_reads_only_new_lines(tmp_path, monkeypatch):
+    ref = index_scene(None, str(tmp_path), *SCENES[0])
+    first = load_index(ref)
+    assert load_index(ref) is first
+
+    scans = []
+    scan = manuscript.FileManuscriptStore.scan
+    monkeypatch.setattr(manuscript.FileManuscriptStore, "scan",
+                        lambda self, offset=0: scans.append(offset) or scan(self, offset))
+    ref = index_scene(ref, str(tmp_path), *SCENES[1])
+    second = load_index(ref)
+    assert scans and scans[0] > 0
+    assert [p.scene_id for p in second.passages if p.kind == "summary"] == [1, 2]
+    # the earlier index is left as it was
+    assert [p.scene_id for p in first.passages if p.kind == "summary"] == [1]
+
+
+def test_load_index_rebuilds_after_a_rewritten_chunk(tmp_path):
+    first = index_scene(None, str(tmp_path), *SCENES[0])
+    stale = index_scene(first, str(tmp_path), 1, 2, "a draft that was retried", "Draft text.")
+    assert "retried" in load_index(stale).doc_freq
+    current = index_scene(first, str(tmp_path), *SCENES[1])
+    loaded = load_index(current)
+    assert "retried" not in loaded.doc_freq
+    assert loaded.doc_freq == load_index(current).doc_freq
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from story_common import scene_store
+from story_common.scene_store import content_key, get_scene, new_run_directory, put_scene, remove_run_directory
+
+
+def test_put_get_round_trip(tmp_path):
+    text = "灯塔看守人发现海洋正在遗忘潮汐。\n\nThe lamp had gone dark."
+    key = put_scene(text, str(tmp_path))
+    assert key == content_key(text)
+    assert get_scene(key, str(tmp_path)) == text
+    assert os.path.exists(tmp_path / "scenes" / key[:2] / f"{key}.txt")
+
+
+def test_identical_text_is_stored_once(tmp_path):
+    first = put_scene("same scene", str(tmp_path))
+    second = put_scene("same scene", str(tmp_path))
+    assert first == second
+    assert os.listdir(tmp_path / "scenes" / first[:2]) == [f"{first}.txt"]
+    assert put_scene("another scene", str(tmp_path)) != first
+
+
+def test_scene_bodies_are_plain_files(tmp_path):
+    # nothing is cached in memory: a reader only needs the directory and the key
+    key = put_scene("written before the restart", str(tmp_path))
+    assert (tmp_path / "scenes" / key[:2] / f"{key}.txt").read_text(encoding="utf-8") == "written before the restart"
+
+
+def test_missing_key_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        get_scene(content_key("never stored"), str(tmp_path))
+
+
+def test_run_directory_lifecycle(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORY_DATA_DIR", str(tmp_path))
+    first, second = new_run_directory(), new_run_directory()
+    assert first != second
+    assert os.path.dirname(first) == str(tmp_path / "runs")
+
+    key = put_scene("a scene", first)
+    put_scene("a scene", second)
+    remove_run_directory(first)
+    assert not os.path.exists(first)
+    # other runs keep their scenes
+    assert get_scene(key, second) == "a scene"
+    remove_run_directory(first)
+    remove_run_directory(None)
+
+
+def test_default_data_dir(monkeypatch):
+    monkeypatch.delenv("STORY_DATA_DIR", raising=False)
+    assert new_run_directory().startswith(os.path.abspath(scene_store.DEFAULT_DATA_DIR))
@@ -1,10 +1,11 @@
 import os
-import sys
 import logging
 import streamlit as st
-from models import init_llm_model
-from graph import create_graph
-import tempfile
+from models import init_llm_model, init_llm_router, init_llm_cascade, init_phrase_backend
+from resources import get_chat_backend
+from jobs import JobManager
+from metrics import start_metrics_server
+from log_setup import setup_logging
 
 # 定义语言名称和代码的映射字典
 LANGUAGE_OPTIONS = {
@@ -14,39 +15,43 @@ LANGUAGE_OPTIONS = {
     "韩文": "Korean",
 }
 
-# 配置日志系统
-def setup_logging():
-    # 创建日志目录（如果不存在）
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
-    log_file = os.path.join(log_dir, "ppt_translator.log")
-    
-    # 设置日志格式
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
-    
-    # 配置日志
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            # 1. 输出到文件
-            logging.FileHandler(log_file, encoding='utf-8'),
-            # 2. 输出到控制台
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+# PPT 重构方式
+RECONSTRUCT_MODES = {
+    "自动（页数多时使用多进程）": "auto",
+    "单进程": "serial",
+    "多进程": "process",
+}
+
+# 模型调用方式
+MODEL_MODES = {
+    "单个模型": init_llm_model,
+    "多供应商路由与故障切换": init_llm_router,
+    "大小模型级联": init_llm_cascade,
+    "离线短语表（无需网络）": init_phrase_backend,
+}
+
+# 后台任务队列：整个进程共享一个，页面刷新或多个会话都不会重复创建
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    return JobManager(max_workers=2)
+
+# 可选的 Prometheus 指标端点：设置环境变量 METRICS_PORT 后启动，进程内只启动一次
+@st.cache_resource
+def get_metrics_server():
+    port = os.getenv("METRICS_PORT")
+    return start_metrics_server(int(port)) if port else None
 
 def main():
-    # 初始化日志配置
+    # 初始化日志配置（队列 + 后台线程写 JSON 日志，进程内只配置一次）
     setup_logging()
+    get_metrics_server()
     
     # 获取 logger
     logger = logging.getLogger(__name__)
 
+    job_manager = get_job_manager()
+    st.session_state.setdefault("job_ids", [])
+
     # 绘制前端
     st.set_page_config(page_title="PPT 翻译 Agent", layout="wide")
     st.title("🚀 PPT 翻译 Agent")
@@ -58,88 +63,107 @@ def main():
                                         options=list(LANGUAGE_OPTIONS.keys()),
                                         index=0)
         target_lang = LANGUAGE_OPTIONS[target_lang_name]
-        uploaded_file = st.file_uploader("上传 PPT 文件", type=['pptx'])
+        uploaded_files = st.file_uploader("上传 PPT 文件", type=['pptx'], accept_multiple_files=True)
         
         # 并发设置
         st.subheader("性能设置")
         max_concurrent = st.slider("最大并发请求数", min_value=1, max_value=20, value=10)
-        batch_size = st.slider("批次大小", min_value=1, max_value=20, value=10)
+        progress_interval = st.slider("进度刷新间隔（文本块数）", min_value=1, max_value=20, value=10,
+                                      help="每完成多少个文本块刷新一次进度；每次请求翻译多少段由模型后端决定")
+        deadline_seconds = st.number_input("翻译截止时间（秒，0 表示不限制）", min_value=0, value=0, step=30,
+                                           help="超时后未完成的文本保留原文，PPT 仍会生成")
+        reconstruct_mode_name = st.selectbox("PPT 重构方式", options=list(RECONSTRUCT_MODES.keys()), index=0,
+                                             help="多进程模式按页分发到多个 CPU 核，适合上百页的大型 PPT")
         
         # 配置模型
         st.title("大模型供应商配置与初始化")
-    
-        llm = init_llm_model(temperature=0.3)
+        model_mode = st.radio("模型调用方式", options=list(MODEL_MODES.keys()), index=0,
+                              help="路由：按实时延迟和错误率在多个供应商间分流；"
+                                   "级联：短文本交给小模型，长段落和表格交给大模型")
+        llm = MODEL_MODES[model_mode](temperature=0.3)
+        # 测试调用使用原始模型，翻译任务使用（可能带离线兜底的）后端
+        chat_llm = llm if hasattr(llm, "invoke") else None
+        if chat_llm is not None and st.checkbox("模型调用失败时改用离线短语表", value=False,
+                                                help="供应商故障或断网时，用本地短语表翻译收录的词条"):
+            llm = get_chat_backend(chat_llm)
     
         # 测试调用
-        if llm:
+        if chat_llm:
             if prompt := st.text_input("输入测试prompt"):
                 with st.spinner("模型思考中..."):
-                    response = llm.invoke(prompt)
+                    response = chat_llm.invoke(prompt)
                     st.write("模型回复：", response.content)
 
-    if uploaded_file is not None:
-        st.info(f"📄 已上传文件: `{uploaded_file.name}`")
+    if uploaded_files:
+        st.info("📄 已上传文件: " + "、".join(f"`{f.name}`" for f in uploaded_files))
 
-        logger.info(f"用户上传文件: {uploaded_file.name}")
-        
-        if st.button("开始翻译", type="primary"):
-
-            # 记录开始事件
-            logger.info(f"收到翻译请求: 文件名={uploaded_file.name}, 目标语言={target_lang}")
-
-            with tempfile.TemporaryDirectory() as tmpdir:
-                input_path = os.path.join(tmpdir, uploaded_file.name)
-                output_filename = f"{target_lang}_{uploaded_file.name}"
-                output_path = os.path.join(tmpdir, output_filename)
-                
-                with open(input_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                initial_state = {
-                    "input_ppt_path": input_path,
-                    "output_ppt_path": output_path,
-                    "target_language": target_lang,
-                    "extracted_data": [],
-                    "translation_map": {},
-                    "status_msg": "初始化中...",
-                    "max_concurrent": max_concurrent,
-                    "batch_size": batch_size,
-                }
-                
-                app = create_graph(llm)
-                
-                # 创建进度条和状态容器
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                try:
-                    # 使用自定义的运行器来更新进度
-                    def run_with_progress():
-                        # 模拟进度更新
-                        status_text.text("🔄 正在解析 PPT...")
-                        progress_bar.progress(10)
-                        
-                        result = app.invoke(initial_state)
-                        
-                        status_text.text(result["status_msg"])
-                        progress_bar.progress(100)
-                        
-                        return result
-                    
-                    final_state = run_with_progress()
-                    
-                    st.success(final_state["status_msg"])
-                    
-                    with open(output_path, "rb") as fp:
-                        st.download_button(
-                            label="📥 下载翻译后的 PPT",
-                            data=fp,
-                            file_name=output_filename,
-                            mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-                        )
-                        
-                except Exception as e:
-                    st.error(f"处理出错: {str(e)}")
+        if st.button("加入翻译队列", type="primary", disabled=llm is None):
+            options = {"max_concurrent": max_concurrent, "progress_interval": progress_interval,
+                       "reconstruct_mode": RECONSTRUCT_MODES[reconstruct_mode_name]}
+            if deadline_seconds:
+                options["deadline_seconds"] = float(deadline_seconds)
+
+            for uploaded_file in uploaded_files:
+                # 记录开始事件
+                logger.info("收到翻译请求: 文件名=%s, 目标语言=%s", uploaded_file.name, target_lang)
+                job = job_manager.submit(llm, uploaded_file.name, uploaded_file.getvalue(), target_lang, options)
+                st.session_state["job_ids"].append(job.job_id)
+
+    render_jobs(job_manager, chat_llm)
+
+# 任务列表：每秒自动刷新，只重跑这个片段，不阻塞也不重跑整个页面
+@st.fragment(run_every=1)
+def render_jobs(job_manager: JobManager, llm):
+    jobs = [job_manager.get(job_id) for job_id in st.session_state["job_ids"]]
+    jobs = [job for job in jobs if job is not None]
+    # 已被 JobManager 过期清理的任务不再显示
+    st.session_state["job_ids"] = [job.job_id for job in jobs]
+    if not jobs:
+        return
+
+    st.subheader("📋 翻译任务")
+    for job in reversed(jobs):
+        with st.container(border=True):
+            st.markdown(f"**{job.file_name}** → {job.target_language} · `{job.job_id}` · {job.stage}")
+            if job.is_active:
+                st.progress(job.progress, text=(
+                    f"幻灯片 {job.slides_done}/{job.slides_total} · 文本块 {job.blocks_done}/{job.blocks_total}"
+                ))
+                if st.button("中止", key=f"cancel_{job.job_id}"):
+                    job_manager.cancel(job.job_id)
+            elif job.status == "done":
+                st.success(job.status_msg)
+                if job.untranslated:
+                    with st.expander(f"⚠️ {len(job.untranslated)} 处文本未翻译，已保留原文"):
+                        st.write(job.untranslated)
+                st.download_button(
+                    label="📥 下载翻译后的 PPT",
+                    data=job.output_bytes,
+                    file_name=job.output_file_name,
+                    mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                    key=f"download_{job.job_id}"
+                )
+                if job.metrics is not None:
+                    st.download_button(
+                        label="📈 下载指标报告 (JSON)",
+                        data=job.metrics.to_json(),
+                        file_name=f"{job.job_id}_metrics.json",
+                        mime="application/json",
+                        key=f"metrics_{job.job_id}"
+                    )
+            elif job.status == "cancelled":
+                st.warning(job.status_msg or "任务已中止")
+            else:
+                st.error(f"处理出错: {job.error}")
+
+            if not job.is_active and st.button("移除", key=f"remove_{job.job_id}"):
+                job_manager.remove(job.job_id)
+                st.session_state["job_ids"].remove(job.job_id)
+                st.rerun()
+
+    # 多供应商路由时展示各供应商的健康状况，级联时展示各层级的调用与升级统计
+    if hasattr(llm, "snapshot"):
+        st.dataframe(llm.snapshot())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
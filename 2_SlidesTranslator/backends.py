@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from resources import get_translation_prompt
+
+
+# ==========================================
+# 可插拔的翻译后端
+# 翻译节点只依赖 TranslationBackend 接口：按批提交文本，拿回同样顺序的译文。
+# 每个后端声明自己的 batch_size（一次请求处理多少段文本）和 max_concurrency
+# （同时在途的批次数上限，None 表示不限），调度器据此切分队列、决定 worker 数量。
+# - ChatModelBackend：LangChain chat model（单个模型、多供应商路由、大小模型级联均可）
+# - PhraseTableBackend：本地词典 / 短语表，纯 CPU、不联网，用于内网环境、
+#   离线基准测试，以及作为模型故障时的兜底
+# kind 区分普通文本（"text"）和表格批量请求（"table"，JSON 二维数组进、同形状 JSON 出）
+# ==========================================
+
+# 按模块所在目录定位，不依赖启动时的工作目录
+DEFAULT_PHRASE_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrase_tables", "default.json")
+CJK_TARGET_LANGUAGES = {"Chinese", "Japanese", "Korean"}
+# 两个 CJK 字符之间的空白（译文为中日韩文字时去掉）
+CJK_GAP_PATTERN = re.compile(r'(?<=[\u4e00-\u9fff\u3040-\u30ff\uac00-\ud7af])\s+(?=[\u4e00-\u9fff\u3040-\u30ff\uac00-\ud7af])')
+
+
+@dataclass
+class BatchResult:
+    """一批文本的译文（与输入顺序一致，None 表示该段未能翻译）和本批的 token 用量"""
+    translations: List[Optional[str]]
+    usage: Dict[str, Any] = field(default_factory=dict)
+
+
+def merge_usage(total: Dict[str, Any], usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """累加 usage_metadata 中的 token 数（含 input_token_details.cache_read）"""
+    if not usage:
+        return total
+    for key in ("input_tokens", "output_tokens", "total_tokens"):
+        total[key] = total.get(key, 0) + (usage.get(key, 0) or 0)
+    cache_read = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    if cache_read:
+        details = total.setdefault("input_token_details", {})
+        details["cache_read"] = details.get("cache_read", 0) + cache_read
+    return total
+
+
+class TranslationBackend:
+    """翻译后端接口"""
+
+    name = "backend"
+    # 一次 translate_batch 最多提交的文本段数
+    batch_size: int = 1
+    # 同时在途的 translate_batch 调用数上限；None 表示后端不设上限，只按界面设置的并发数
+    max_concurrency: Optional[int] = None
+    # 调用方重试用尽后改用的后端（如离线短语表）；None 表示没有兜底
+    fallback: Optional["TranslationBackend"] = None
+
+    async def translate_batch(self, texts: List[str], target_language: str, kind: str = "text") -> BatchResult:
+        """翻译一批文本；整批失败（如网络错误）时抛出异常，由调用方重试"""
+        raise NotImplementedError
+
+
+class ChatModelBackend(TranslationBackend):
+    """
+    基于 LangChain chat model 的后端，每段文本一次请求
+    调用失败时抛出异常，由调用方重试；fallback（如 PhraseTableBackend）只在重试用尽后才使用
+    """
+
+    name = "chat_model"
+
+    def __init__(self, llm: Any, batch_size: int = 1, max_concurrency: Optional[int] = None,
+                 fallback: Optional[TranslationBackend] = None):
+        self.llm = llm
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.fallback = fallback
+        # 提示词模板在进程内只加载一次，见 resources.get_translation_prompt
+        self.chains = {kind: get_translation_prompt(kind) | llm for kind in ("text", "table")}
+
+    async def translate_batch(self, texts: List[str], target_language: str, kind: str = "text") -> BatchResult:
+        from langchain_core.runnables import RunnableConfig
+
+        # 目标语言同时放进 configurable，供大小模型级联校验译文的文字类型
+        call_config = RunnableConfig(tags=["translation"], configurable={"target_language": target_language})
+        chain = self.chains[kind]
+        responses = await asyncio.gather(*(
+            chain.ainvoke({"target_language": target_language, "text": text}, config=call_config)
+            for text in texts
+        ))
+        usage: Dict[str, Any] = {}
+        for response in responses:
+            merge_usage(usage, getattr(response, "usage_metadata", None))
+        return BatchResult([response.content for response in responses], usage)
+
+
+class PhraseTableBackend(TranslationBackend):
+    """
+    本地短语表后端：按目标语言查表，对每段文本做最长匹配替换，未命中的部分保留原文
+    短语表为 JSON：{"English": {"季度报告": "Quarterly Report", ...}, "Chinese": {...}}，
+    拉丁文字的词条忽略大小写并按整词匹配；一段文本没有任何词条命中时视为未翻译（返回 None）
+    """
+
+    name = "phrase_table"
+
+    def __init__(self, tables: Dict[str, Dict[str, str]], batch_size: int = 256, max_concurrency: int = 1):
+        self.tables = {
+            language: {source.strip().lower(): target for source, target in entries.items() if source.strip()}
+            for language, entries in tables.items()
+        }
+        self.max_phrase_len = {
+            language: max((len(source) for source in entries), default=0)
+            for language, entries in self.tables.items()
+        }
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_PHRASE_TABLE, **kwargs: Any) -> "PhraseTableBackend":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isascii() and char.isalnum()
+
+    def translate_text(self, text: str, target_language: str) -> Optional[str]:
+        """翻译单段文本，没有任何词条命中时返回 None"""
+        table = self.tables.get(target_language)
+        if not table:
+            return None
+        lowered = text.lower()
+        tokens: List[str] = []
+        pending = []
+        matched = False
+        i = 0
+        while i < len(text):
+            for length in range(min(self.max_phrase_len[target_language], len(text) - i), 0, -1):
+                target = table.get(lowered[i:i + length])
+                if target is None:
+                    continue
+                # 拉丁文字词条必须整词匹配，避免把 "plan" 替换进 "planet"
+                end = i + length
+                if self._is_word_char(lowered[i]) and i > 0 and self._is_word_char(lowered[i - 1]):
+                    continue
+                if self._is_word_char(lowered[end - 1]) and end < len(text) and self._is_word_char(lowered[end]):
+                    continue
+                if pending:
+                    tokens.append("".join(pending))
+                    pending = []
+                tokens.append(target)
+                matched = True
+                i = end
+                break
+            else:
+                pending.append(text[i])
+                i += 1
+        if pending:
+            tokens.append("".join(pending))
+
+        if not matched:
+            return text if not any(char.isalpha() for char in text) else None
+        if target_language in CJK_TARGET_LANGUAGES:
+            result = CJK_GAP_PATTERN.sub("", "".join(tokens))
+        else:
+            # 拉丁文字目标语言：词与词之间补空格，标点前不留空格
+            result = re.sub(r"\s+", " ", " ".join(tokens))
+            result = re.sub(r"\s+([,.;:!?%)，。；：！？、])", r"\1", result)
+        return result.strip()
+
+    def _translate_sync(self, texts: List[str], target_language: str, kind: str) -> List[Optional[str]]:
+        if kind != "table":
+            return [self.translate_text(text, target_language) for text in texts]
+        results = []
+        for payload in texts:
+            rows = json.loads(payload)
+            # 未命中的单元格为 null（与文本模式的 None 一致），由翻译节点逐格兜底并计入未翻译报告
+            results.append(json.dumps(
+                [[self.translate_text(cell, target_language) if cell else cell for cell in row]
+                 for row in rows],
+                ensure_ascii=False,
+            ))
+        return results
+
+    async def translate_batch(self, texts: List[str], target_language: str, kind: str = "text") -> BatchResult:
+        # 纯 CPU 计算放到线程中，不阻塞事件循环上的截止时间 / 取消轮询
+        translations = await asyncio.to_thread(self._translate_sync, texts, target_language, kind)
+        return BatchResult(translations)
+
+
+def as_backend(llm: Any) -> TranslationBackend:
+    """翻译节点的入口：已是后端时直接使用，否则视为 chat model 包装为 ChatModelBackend"""
+    if isinstance(llm, TranslationBackend):
+        return llm
+    return ChatModelBackend(llm)
@@ -0,0 +1,93 @@
+"""
+用 `python -X importtime` 统计各入口模块的导入耗时，跟踪冷启动回归
+
+对每个模块启动一个全新的解释器进程，解析 importtime 输出，报告：
+- 模块自身的累计导入耗时
+- 累计耗时最高的若干顶层依赖
+- 是否意外加载了应当延迟导入的重量级依赖（pptx / langchain / langgraph）
+
+用法：
+    python benchmarks/bench_import.py --modules app models jobs graph --repeat 3
+    python benchmarks/bench_import.py --modules app --max-ms 1500   # 超过阈值时以非零状态退出
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在首屏渲染前不应被导入的重量级依赖
+LAZY_PACKAGES = ("pptx", "langchain", "langchain_core", "langgraph", "httpx")
+
+
+def profile_import(module: str) -> list:
+    """在独立进程中导入 module，返回 [(缩进层级, 模块名, 累计微秒), ...]"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cum, name = line.split("|")
+        cum = cum.strip()
+        if not cum.isdigit():
+            continue
+        # importtime 每嵌套一层多缩进两个空格
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cum)))
+    return entries
+
+
+def summarize(module: str, entries: list, top: int) -> dict:
+    total = next((cum for depth, name, cum in entries if depth == 0 and name == module), 0)
+    # importtime 先输出子模块再输出父模块，module 之前的第一层依赖就是它的直接依赖
+    index = next((i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == module), len(entries))
+    start = index
+    while start > 0 and entries[start - 1][0] > 0:
+        start -= 1
+    children = [(name, cum) for depth, name, cum in entries[start:index] if depth == 1]
+    heaviest = sorted(children, key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "import_us": total,
+        "top_dependencies_ms": {name: round(cum / 1000, 2) for name, cum in heaviest},
+        "eager_heavy_packages": sorted({name.split(".")[0] for _, name, _ in entries
+                                        if name.split(".")[0] in LAZY_PACKAGES}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SlidesTranslator 导入耗时基准")
+    parser.add_argument("--modules", nargs="+", default=["app", "models", "jobs", "graph"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--max-ms", type=float, default=None, help="任一模块的导入耗时中位数超过该值时返回非零状态")
+    args = parser.parse_args()
+
+    report = {}
+    for module in args.modules:
+        runs = [summarize(module, profile_import(module), args.top) for _ in range(args.repeat)]
+        report[module] = {
+            "import_ms": round(median(run["import_us"] for run in runs) / 1000, 2),
+            "top_dependencies_ms": runs[-1]["top_dependencies_ms"],
+            "eager_heavy_packages": runs[-1]["eager_heavy_packages"],
+        }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.max_ms is not None:
+        slow = [m for m, r in report.items() if r["import_ms"] > args.max_ms]
+        if slow:
+            print(f"导入耗时超过 {args.max_ms} ms: {', '.join(slow)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+离线端到端基准：合成 PPT + 假 LLM 驱动 create_graph，不产生任何 API 费用
+
+报告（JSON）：
+- parse / translate / reconstruct 各阶段耗时与总耗时
+- 进程峰值 RSS
+- 文本块数、去重后文本数、LLM 调用次数、每个文本块的平均调用次数、注入错误数
+- metrics：调用延迟 p50/p95/p99、重试次数、排队等待、token 数（见 metrics.JobMetrics）
+
+传入 --baseline 时与上一次的报告比较，任一阶段耗时超过 (1 + tolerance) 倍即以非零状态退出。
+
+用法：
+    python benchmarks/bench_pipeline.py --slides 50 --shapes-per-slide 6 --latency 0.05 --error-rate 0.05
+    python benchmarks/bench_pipeline.py --output bench.json
+    python benchmarks/bench_pipeline.py --baseline bench.json --tolerance 0.2
+    python benchmarks/bench_pipeline.py --slides 1000 --latency 0 --reconstruct-mode process --reconstruct-workers 8
+    python benchmarks/bench_pipeline.py --backend phrase-table --script Latin --target-language Chinese
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_llm import FakeChatModel  # noqa: E402
+from metrics import JobMetrics  # noqa: E402
+from synthetic_deck import add_deck_arguments, deck_kwargs, generate_deck  # noqa: E402
+
+STAGES = ("parse", "translate", "reconstruct")
+
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return usage / 1024 / 1024 if sys.platform == "darwin" else usage / 1024
+
+
+def run_pipeline(deck_bytes: bytes, llm, target_language: str, max_concurrent: int, progress_interval: int,
+                 reconstruct_mode: str = "serial", reconstruct_workers: int = 0) -> dict:
+    """运行一次完整流程，返回各阶段耗时和最终状态"""
+    from graph import create_graph
+
+    app = create_graph(llm)
+    initial_state = {
+        "input_ppt_bytes": deck_bytes,
+        "target_language": target_language,
+        "max_concurrent": max_concurrent,
+        "progress_interval": progress_interval,
+        "reconstruct_mode": reconstruct_mode,
+        "reconstruct_workers": reconstruct_workers,
+    }
+
+    timings = {}
+    metrics = JobMetrics("bench")
+    final_state = dict(initial_state)
+    start = last = time.perf_counter()
+    for update in app.stream(initial_state, config={"configurable": {"metrics": metrics}}, stream_mode="updates"):
+        now = time.perf_counter()
+        for node_name, node_state in update.items():
+            timings[node_name] = round(now - last, 4)
+            if node_state:
+                final_state.update(node_state)
+        last = now
+    timings["total"] = round(time.perf_counter() - start, 4)
+    metrics.finish()
+    return {"timings": timings, "state": final_state, "metrics": metrics.to_dict()}
+
+
+def compare_with_baseline(report: dict, baseline_path: str, tolerance: float) -> list:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for stage in STAGES + ("total",):
+        old = baseline.get("timings", {}).get(stage)
+        new = report["timings"].get(stage)
+        # 极短的阶段抖动较大，小于 50ms 的不参与比较
+        if old and new and old >= 0.05 and new > old * (1 + tolerance):
+            regressions.append(f"{stage}: {old:.3f}s -> {new:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SlidesTranslator 离线端到端基准")
+    add_deck_arguments(parser)
+    parser.add_argument("--latency", type=float, default=0.02, help="假 LLM 每次调用的平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--target-language", default="English")
+    parser.add_argument("--max-concurrent", type=int, default=10)
+    parser.add_argument("--progress-interval", type=int, default=10, help="每完成多少个文本块上报一次进度")
+    parser.add_argument("--backend", choices=["fake-llm", "phrase-table"], default="fake-llm",
+                        help="fake-llm：假 chat model；phrase-table：本地短语表后端（不经过 chat model）")
+    parser.add_argument("--phrase-table", help="短语表 JSON 路径，默认使用 phrase_tables/default.json")
+    parser.add_argument("--reconstruct-mode", choices=["serial", "process", "auto"], default="serial")
+    parser.add_argument("--reconstruct-workers", type=int, default=0, help="多进程重构的进程数，0 表示 CPU 核数")
+    parser.add_argument("--output", help="把报告写入 JSON 文件")
+    parser.add_argument("--baseline", help="与之前的报告比较各阶段耗时")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    output_path = args.output
+    baseline_path = args.baseline
+
+    deck_start = time.perf_counter()
+    deck_bytes = generate_deck(**deck_kwargs(args))
+    deck_seconds = time.perf_counter() - deck_start
+
+    phrase_table_path = args.phrase_table
+    if args.backend == "phrase-table":
+        from backends import DEFAULT_PHRASE_TABLE, PhraseTableBackend
+
+        llm = PhraseTableBackend.from_file(phrase_table_path or DEFAULT_PHRASE_TABLE)
+    else:
+        llm = FakeChatModel(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    result = run_pipeline(deck_bytes, llm, args.target_language, args.max_concurrent, args.progress_interval,
+                          args.reconstruct_mode, args.reconstruct_workers)
+    state = result["state"]
+    # 短语表后端按批调用，没有调用计数器，调用次数取自 metrics
+    calls = getattr(llm, "calls", result["metrics"]["llm_calls"]["total"])
+
+    blocks = len(state.get("extracted_data", []))
+    unique_blocks = len({item["original_text"] for item in state.get("extracted_data", [])})
+    report = {
+        "deck": {**deck_kwargs(args), "size_kb": round(len(deck_bytes) / 1024, 1),
+                 "generate_seconds": round(deck_seconds, 4)},
+        "llm": {"backend": args.backend, "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate},
+        "reconstruct": {"mode": args.reconstruct_mode, "workers": args.reconstruct_workers or os.cpu_count()},
+        "timings": result["timings"],
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "blocks": blocks,
+        "unique_blocks": unique_blocks,
+        "llm_calls": calls,
+        "calls_per_block": round(calls / blocks, 3) if blocks else 0.0,
+        "injected_errors": getattr(llm, "errors", 0),
+        "untranslated": len(state.get("untranslated", [])),
+        "output_size_kb": round(len(state.get("output_ppt_bytes", b"")) / 1024, 1),
+        "metrics": result["metrics"],
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if baseline_path:
+        regressions = compare_with_baseline(report, baseline_path, args.tolerance)
+        if regressions:
+            print("性能回退：\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
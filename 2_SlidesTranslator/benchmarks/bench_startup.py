@@ -0,0 +1,72 @@
+"""
+测量每次交互（Streamlit rerun / 点击翻译）的初始化开销：
+
+- before：每次都 find_dotenv + load_dotenv + init_chat_model + create_graph（旧流程）
+- after：通过 resources 进程级缓存获取 chat model 和编译后的 graph
+
+不会发起任何网络请求，API Key 使用占位值。
+
+用法：
+    python benchmarks/bench_startup.py --provider openai --model gpt-4o-mini --rounds 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from statistics import median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SlidesTranslator 启动与单次点击开销基准")
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    api_key = os.getenv("BENCH_API_KEY", "sk-bench-placeholder")
+
+    # 冷启动：导入依赖
+    _, import_seconds = timed(lambda: (__import__("graph"), __import__("resources")))
+    from dotenv import load_dotenv, find_dotenv
+    from langchain.chat_models import init_chat_model
+    from graph import create_graph
+    import resources
+
+    def click_before():
+        env_file = find_dotenv()
+        if env_file:
+            load_dotenv(env_file, override=False)
+        llm = init_chat_model(model_provider=args.provider, model=args.model, temperature=0.3, api_key=api_key)
+        return create_graph(llm)
+
+    def click_after():
+        resources.load_env_once()
+        llm = resources.get_chat_model(args.provider, args.model, api_key, 0.3)
+        return resources.get_compiled_graph(llm)
+
+    _, after_cold = timed(click_after)
+    before = [timed(click_before)[1] for _ in range(args.rounds)]
+    after = [timed(click_after)[1] for _ in range(args.rounds)]
+
+    report = {
+        "provider": args.provider,
+        "model": args.model,
+        "rounds": args.rounds,
+        "import_seconds": round(import_seconds, 4),
+        "before_per_click_ms": {"median": round(median(before) * 1000, 3), "max": round(max(before) * 1000, 3)},
+        "after_cold_ms": round(after_cold * 1000, 3),
+        "after_per_click_ms": {"median": round(median(after) * 1000, 3), "max": round(max(after) * 1000, 3)},
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+确定性的假 chat model，用于离线基准测试，不发起任何网络请求
+
+- 输出只由输入决定：CJK 字符替换为伪拉丁音节，拉丁单词转为大写，数字原样保留，
+  因此译文长度变化与真实的中译英相近，能覆盖重构阶段的字号/宽度调整逻辑；
+  表格请求（JSON 二维数组）逐格处理并保持形状
+- latency / jitter：每次调用的模拟延迟（秒）
+- error_rate：按 (文本, 第几次调用) 的哈希决定是否抛出异常，结果可复现
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+CJK_PATTERN = re.compile(r'[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ff\uac00-\ud7af]')
+SYLLABLES = ["ka", "shi", "ru", "ne", "to", "mo", "li", "an", "zhe", "po", "vi", "do"]
+
+
+class InjectedError(RuntimeError):
+    """error_rate 注入的模拟故障"""
+
+
+def pseudo_translate(text: str) -> str:
+    """把 CJK 字符逐个映射成伪音节，拉丁文本转大写，结果只由输入决定"""
+    out = []
+    for char in text:
+        if CJK_PATTERN.match(char):
+            out.append(SYLLABLES[ord(char) % len(SYLLABLES)] + " ")
+        else:
+            out.append(char.upper())
+    return re.sub(r"\s+", " ", "".join(out)).strip()
+
+
+def pseudo_translate_payload(text: str) -> str:
+    """表格请求的输入是 JSON 二维数组，逐个单元格伪翻译后按原形状返回；其他输入按普通文本处理"""
+    if text.startswith("[["):
+        try:
+            rows = json.loads(text)
+        except ValueError:
+            rows = None
+        if isinstance(rows, list):
+            return json.dumps([[pseudo_translate(cell) for cell in row] for row in rows], ensure_ascii=False)
+    return pseudo_translate(text)
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    _errors: int = PrivateAttr(default=0)
+    _attempts: dict = PrivateAttr(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-translator"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def errors(self) -> int:
+        return self._errors
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self._calls = 0
+            self._errors = 0
+            self._attempts.clear()
+
+    def _prepare(self, messages: List[BaseMessage]) -> tuple:
+        """记录调用并决定本次是否注入错误，返回 (延迟秒数, 输入文本, 是否失败)"""
+        text = messages[-1].content if messages else ""
+        with self._lock:
+            self._calls += 1
+            attempt = self._attempts.get(text, 0)
+            self._attempts[text] = attempt + 1
+        digest = hashlib.sha256(f"{self.seed}:{attempt}:{text}".encode("utf-8")).digest()
+        rng = random.Random(digest)
+        delay = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+        failed = rng.random() < self.error_rate
+        if failed:
+            with self._lock:
+                self._errors += 1
+        return delay, text, failed
+
+    def _result(self, messages: List[BaseMessage], text: str) -> ChatResult:
+        content = pseudo_translate_payload(text)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_chars // 4 + 1,
+                "output_tokens": len(content) // 4 + 1,
+                "total_tokens": prompt_chars // 4 + len(content) // 4 + 2,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        delay, text, failed = self._prepare(messages)
+        time.sleep(delay)
+        if failed:
+            raise InjectedError("injected failure")
+        return self._result(messages, text)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        delay, text, failed = self._prepare(messages)
+        await asyncio.sleep(delay)
+        if failed:
+            raise InjectedError("injected failure")
+        return self._result(messages, text)
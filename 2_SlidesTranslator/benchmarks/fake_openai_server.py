@@ -0,0 +1,418 @@
+"""
+本地 OpenAI 兼容的替身服务，用于压测和混沌测试（不依赖第三方库）
+
+实现 POST /v1/chat/completions（含 stream），可以模拟：
+- 延迟分布：fixed:0.2 / uniform:0.1,0.5 / exp:0.3 / lognormal:-1.5,0.5（秒）
+- 429 限流：按概率返回，带 Retry-After 头
+- 5xx 突发：每 N 个请求中连续 M 个返回 503
+- 慢速流式输出：每个 chunk 之间的延迟
+- token 统计：按字符数估算 prompt / completion tokens，写入 usage
+- 提示词缓存：与之前请求相同的最长消息前缀计为 cached_tokens（和提供方一样按前缀逐字节匹配）
+
+响应内容：
+- 请求带 tools（LangChain with_structured_output 的 function calling）时，按参数的 JSON Schema 生成假数据并以 tool_calls 返回
+  （枚举字段默认取第一个值，--enum-alt-rate 按概率改取第二个值，例如让小说写作的编辑节点返回 "revise"）
+- 请求带 response_format=json_schema 时，按 schema 生成 JSON 文本
+- 其他情况：对最后一条用户消息做确定性的伪翻译；内容较长的写作类请求返回 --completion-words 个词的占位正文
+
+其他接口：GET /v1/models、GET /stats（请求与 token 统计）、POST /config（运行时修改场景参数）
+
+用法：
+    python benchmarks/fake_openai_server.py --port 8765 --latency exp:0.2 --rate-429 0.05 --burst-5xx 50,5
+
+    # 翻译器：OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-local streamlit run app.py
+    # 小说写作：DEEPSEEK_API_BASE=http://127.0.0.1:8765/v1 DEEPSEEK_API_KEY=sk-local langgraph dev
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import pseudo_translate_payload  # noqa: E402
+
+LOREM = ("the city lights flickered as she crossed the bridge and remembered the promise "
+         "made long ago under a different sky while the river carried its secrets").split()
+
+
+# ==========================================
+# 1. 场景配置与统计
+# ==========================================
+class Scenario:
+    """可在运行时通过 POST /config 修改的故障场景"""
+
+    def __init__(self, latency: str = "fixed:0.05", rate_429: float = 0.0, retry_after: float = 1.0,
+                 burst_5xx: str = "", stream_delay: float = 0.0, completion_words: int = 300,
+                 array_len: int = 3, enum_alt_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.burst_5xx = burst_5xx
+        self.stream_delay = stream_delay
+        self.completion_words = completion_words
+        self.array_len = array_len
+        self.enum_alt_rate = enum_alt_rate
+        self.rng = random.Random(seed)
+
+    def update(self, values: Dict[str, Any]) -> None:
+        for key, value in values.items():
+            if hasattr(self, key) and key != "rng":
+                setattr(self, key, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in vars(self).items() if k != "rng"}
+
+    def sample_latency(self) -> float:
+        kind, _, params = self.latency.partition(":")
+        values = [float(v) for v in params.split(",") if v]
+        if kind == "fixed":
+            return values[0]
+        if kind == "uniform":
+            return self.rng.uniform(values[0], values[1])
+        if kind == "exp":
+            return self.rng.expovariate(1 / values[0])
+        if kind == "lognormal":
+            return self.rng.lognormvariate(values[0], values[1])
+        raise ValueError(f"未知的延迟分布: {self.latency}")
+
+    def injected_status(self, request_no: int) -> Optional[int]:
+        """决定本次请求是否注入 429 / 503"""
+        if self.burst_5xx:
+            every, length = (int(v) for v in self.burst_5xx.split(","))
+            if every and request_no % every < length:
+                return 503
+        if self.rate_429 and self.rng.random() < self.rate_429:
+            return 429
+        return None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at = time.time()
+        self.requests = 0
+        self.status = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.prefix_cache = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def cached_prefix_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """之前出现过的最长消息前缀的 token 数，并记录本次请求的所有前缀"""
+        prefixes = [json.dumps(messages[:k], ensure_ascii=False) for k in range(1, len(messages))]
+        with self.lock:
+            hit = next((prefix for prefix in reversed(prefixes) if prefix in self.prefix_cache), None)
+            self.prefix_cache.update(prefixes)
+        return estimate_tokens(hit) if hit else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        return {
+            "requests": self.requests,
+            "requests_per_second": round(self.requests / elapsed, 2),
+            "status": {str(k): v for k, v in sorted(self.status.items())},
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+# ==========================================
+# 2. 假数据生成
+# ==========================================
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / 4))
+
+
+def fake_from_schema(schema: Dict[str, Any], defs: Dict[str, Any], array_len: int, path: str = "", index: int = 0,
+                     scenario: Optional["Scenario"] = None) -> Any:
+    """
+    按 JSON Schema 生成确定性的假数据，足够让 pydantic 校验通过
+    枚举默认取第一个值；scenario.enum_alt_rate > 0 时按该概率改取第二个值（如让编辑节点返回 "revise"）
+    """
+    if "$ref" in schema:
+        return fake_from_schema(defs[schema["$ref"].split("/")[-1]], defs, array_len, path, index, scenario)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return fake_from_schema(options[0], defs, array_len, path, index, scenario)
+    if "enum" in schema:
+        if scenario is not None and len(schema["enum"]) > 1 and scenario.rng.random() < scenario.enum_alt_rate:
+            return schema["enum"][1]
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    kind = schema.get("type", "object" if "properties" in schema else "string")
+    if kind == "object":
+        return {
+            name: fake_from_schema(prop, defs, array_len, name, index, scenario)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [fake_from_schema(schema.get("items", {}), defs, array_len, path, i, scenario) for i in range(array_len)]
+    if kind == "integer":
+        return index + 1
+    if kind == "number":
+        return float(index + 1)
+    if kind == "boolean":
+        return True
+    return f"{path or 'text'} {index + 1}: " + " ".join(LOREM[:12])
+
+
+def build_reply(body: Dict[str, Any], scenario: Scenario) -> Dict[str, Any]:
+    """返回 {"content": str | None, "tool_calls": list | None}"""
+    tools = body.get("tools") or []
+    if tools:
+        function = tools[0]["function"]
+        choice = body.get("tool_choice")
+        if isinstance(choice, dict):
+            wanted = choice.get("function", {}).get("name")
+            function = next((t["function"] for t in tools if t["function"]["name"] == wanted), function)
+        schema = function.get("parameters", {})
+        arguments = fake_from_schema(schema, schema.get("$defs", {}), scenario.array_len, scenario=scenario)
+        return {"content": None, "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": function["name"], "arguments": json.dumps(arguments, ensure_ascii=False)},
+        }]}
+
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema = response_format["json_schema"].get("schema", {})
+        data = fake_from_schema(schema, schema.get("$defs", {}), scenario.array_len, scenario=scenario)
+        return {"content": json.dumps(data, ensure_ascii=False), "tool_calls": None}
+
+    messages = body.get("messages") or []
+    user_text = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "") or ""
+    if isinstance(user_text, list):
+        user_text = " ".join(part.get("text", "") for part in user_text if isinstance(part, dict))
+    # 翻译请求的用户消息很短；写作类长提示词返回占位正文
+    if len(user_text) > 1500:
+        words = [LOREM[i % len(LOREM)] for i in range(scenario.completion_words)]
+        return {"content": " ".join(words).capitalize() + ".", "tool_calls": None}
+    return {"content": pseudo_translate_payload(user_text), "tool_calls": None}
+
+
+# ==========================================
+# 3. HTTP 服务
+# ==========================================
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOpenAI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            with self.server.stats.lock:
+                self._send_json(200, {**self.server.stats.to_dict(), "scenario": self.server.scenario.to_dict()})
+        elif self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_POST(self) -> None:
+        path = self.path.rstrip("/")
+        if path == "/config":
+            values = self._read_json()
+            if values.pop("reset_stats", False):
+                with self.server.stats.lock:
+                    self.server.stats.reset()
+            self.server.scenario.update(values)
+            self._send_json(200, self.server.scenario.to_dict())
+            return
+        if not path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        body = self._read_json()
+        stats, scenario = self.server.stats, self.server.scenario
+        with stats.lock:
+            stats.requests += 1
+            request_no = stats.requests
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            status = scenario.injected_status(request_no)
+            latency = scenario.sample_latency()
+        try:
+            time.sleep(latency)
+            if status == 429:
+                self._count(429)
+                self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                                headers={"Retry-After": str(scenario.retry_after)})
+                return
+            if status:
+                self._count(status)
+                self._send_json(status, {"error": {"message": "Service temporarily unavailable", "type": "server_error"}})
+                return
+            self._complete(body, scenario)
+        finally:
+            with stats.lock:
+                stats.in_flight -= 1
+
+    def _count(self, status: int, prompt_tokens: int = 0, completion_tokens: int = 0,
+               cached_tokens: int = 0) -> None:
+        stats = self.server.stats
+        with stats.lock:
+            stats.status[status] = stats.status.get(status, 0) + 1
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cached_tokens += cached_tokens
+
+    def _complete(self, body: Dict[str, Any], scenario: Scenario) -> None:
+        reply = build_reply(body, scenario)
+        prompt_text = json.dumps(body.get("messages", []), ensure_ascii=False)
+        prompt_tokens = estimate_tokens(prompt_text)
+        # 模拟提供方的提示词缓存：前缀与之前某次请求逐字节一致的部分命中缓存
+        cached_tokens = self.server.stats.cached_prefix_tokens(body.get("messages", []))
+        completion_text = reply["content"] or json.dumps(reply["tool_calls"], ensure_ascii=False)
+        completion_tokens = estimate_tokens(completion_text)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        self._count(200, prompt_tokens, completion_tokens, cached_tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:16]}"
+        model = body.get("model", "fake-model")
+        finish_reason = "tool_calls" if reply["tool_calls"] else "stop"
+
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": reply["content"]}
+            if reply["tool_calls"]:
+                message["tool_calls"] = reply["tool_calls"]
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+            return
+
+        # SSE 流式输出
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def emit(delta: Dict[str, Any], finish: Optional[str] = None, with_usage: bool = False) -> None:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            if with_usage:
+                chunk["choices"] = []
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        emit({"role": "assistant", "content": ""})
+        if reply["tool_calls"]:
+            call = reply["tool_calls"][0]
+            emit({"tool_calls": [{"index": 0, "id": call["id"], "type": "function",
+                                  "function": {"name": call["function"]["name"], "arguments": ""}}]})
+            arguments = call["function"]["arguments"]
+            for i in range(0, len(arguments), 40):
+                time.sleep(scenario.stream_delay)
+                emit({"tool_calls": [{"index": 0, "function": {"arguments": arguments[i:i + 40]}}]})
+        else:
+            for word in (reply["content"] or "").split(" "):
+                time.sleep(scenario.stream_delay)
+                emit({"content": word + " "})
+        emit({}, finish=finish_reason)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            emit({}, with_usage=True)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, scenario: Scenario):
+        super().__init__((host, port), FakeOpenAIHandler)
+        self.scenario = scenario
+        self.stats = Stats()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 0, **scenario_kwargs: Any) -> FakeOpenAIServer:
+    """在后台线程中启动服务（port=0 时自动分配端口），供压测脚本直接使用"""
+    server = FakeOpenAIServer(host, port, Scenario(**scenario_kwargs))
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def add_scenario_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="fixed:0.05", help="fixed:S | uniform:A,B | exp:MEAN | lognormal:MU,SIGMA")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 响应的 Retry-After 秒数")
+    parser.add_argument("--burst-5xx", default="", help="N,M：每 N 个请求中连续 M 个返回 503")
+    parser.add_argument("--stream-delay", type=float, default=0.0, help="流式输出每个 chunk 的间隔秒数")
+    parser.add_argument("--completion-words", type=int, default=300, help="写作类请求返回的正文词数")
+    parser.add_argument("--array-len", type=int, default=3, help="结构化输出中每个数组的元素个数")
+    parser.add_argument("--enum-alt-rate", type=float, default=0.0, help="结构化输出中枚举字段改取第二个值的概率")
+    parser.add_argument("--chaos-seed", type=int, default=0, help="延迟与故障注入的随机种子")
+
+
+def scenario_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "latency": args.latency,
+        "rate_429": args.rate_429,
+        "retry_after": args.retry_after,
+        "burst_5xx": args.burst_5xx,
+        "stream_delay": args.stream_delay,
+        "completion_words": args.completion_words,
+        "array_len": args.array_len,
+        "enum_alt_rate": args.enum_alt_rate,
+        "seed": args.chaos_seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_scenario_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, Scenario(**scenario_kwargs(args)))
+    print(f"🚀 Fake OpenAI server: {server.base_url}  (stats: http://{args.host}:{args.port}/stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
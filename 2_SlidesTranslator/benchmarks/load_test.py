@@ -0,0 +1,99 @@
+"""
+压测驱动：通过真实的 HTTP 客户端（init_chat_model + base_url）对本地替身服务跑翻译流程
+
+同时提交 --jobs 个翻译任务（每个任务一份合成 PPT），报告：
+- 总耗时、吞吐（文本块/秒）
+- 替身服务侧的请求数、状态码分布（429 / 503 注入）、最大并发
+- 错误恢复情况：重试后仍失败、保留原文的文本块数
+
+不传 --base-url 时会在进程内启动 fake_openai_server。
+
+用法：
+    python benchmarks/load_test.py --jobs 4 --slides 30 --latency exp:0.1 --rate-429 0.05 --burst-5xx 40,4
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8765/v1 --jobs 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openai_server import add_scenario_arguments, scenario_kwargs, start_in_thread  # noqa: E402
+from synthetic_deck import add_deck_arguments, deck_kwargs, generate_deck  # noqa: E402
+
+
+def fetch_stats(base_url: str) -> dict:
+    stats_url = base_url.rsplit("/v1", 1)[0] + "/stats"
+    with urllib.request.urlopen(stats_url) as resp:
+        return json.loads(resp.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SlidesTranslator 压测（本地 OpenAI 兼容服务）")
+    add_deck_arguments(parser)
+    add_scenario_arguments(parser)
+    parser.add_argument("--base-url", help="已启动的替身服务地址；不传则在进程内启动")
+    parser.add_argument("--jobs", type=int, default=4, help="同时运行的翻译任务数")
+    parser.add_argument("--max-concurrent", type=int, default=10)
+    parser.add_argument("--progress-interval", type=int, default=10, help="每完成多少个文本块上报一次进度")
+    parser.add_argument("--client-retries", type=int, default=2, help="openai SDK 层的重试次数")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = start_in_thread(**scenario_kwargs(args))
+        base_url = server.base_url
+
+    from graph import create_graph
+    from resources import get_chat_model
+
+    llm = get_chat_model("openai", "fake-model", "sk-local", 0.3, base_url=base_url, max_retries=args.client_retries)
+    app = create_graph(llm)
+    decks = [generate_deck(**{**deck_kwargs(args), "seed": args.seed + i}) for i in range(args.jobs)]
+
+    def run_job(deck_bytes: bytes) -> dict:
+        start = time.perf_counter()
+        state = app.invoke({
+            "input_ppt_bytes": deck_bytes,
+            "target_language": "English",
+            "max_concurrent": args.max_concurrent,
+            "progress_interval": args.progress_interval,
+        })
+        return {
+            "seconds": time.perf_counter() - start,
+            "blocks": len(state.get("extracted_data", [])),
+            "untranslated": len(state.get("untranslated", [])),
+        }
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(executor.map(run_job, decks))
+    elapsed = time.perf_counter() - start
+
+    blocks = sum(r["blocks"] for r in results)
+    server_stats = fetch_stats(base_url)
+    report = {
+        "jobs": args.jobs,
+        "elapsed_seconds": round(elapsed, 3),
+        "blocks": blocks,
+        "blocks_per_second": round(blocks / elapsed, 2) if elapsed else 0.0,
+        "job_seconds": [round(r["seconds"], 3) for r in results],
+        "untranslated_blocks": sum(r["untranslated"] for r in results),
+        "server": server_stats,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
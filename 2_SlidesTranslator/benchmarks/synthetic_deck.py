@@ -0,0 +1,178 @@
+"""
+合成 .pptx 生成器：按配置生成指定规模的 PPT，用于离线基准测试
+
+可配置项：幻灯片数、每页文本框数、文本长度、语系（CJK / Latin / mixed）、
+项目符号段落数、每页图片数，以及每页表格数、图表数、组合数和是否带演讲者备注。
+相同 seed 生成的 PPT 内容完全一致。
+"""
+import argparse
+import io
+import random
+import struct
+import zlib
+from typing import Optional
+
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE
+from pptx.util import Inches, Pt
+
+CJK_CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处理府研质"
+LATIN_WORDS = ("market growth revenue strategy customer analysis quarterly report platform "
+               "user retention segment channel pricing forecast region product launch team "
+               "population flow commute district weekday weekend share trend").split()
+
+
+def random_text(rng: random.Random, length: int, script: str) -> str:
+    """生成约 length 个字符的文本，夹带数字以覆盖数字保护逻辑"""
+    if script == "mixed":
+        script = rng.choice(["CJK", "Latin"])
+    if script == "CJK":
+        body = "".join(rng.choice(CJK_CHARS) for _ in range(length))
+    else:
+        words = []
+        while sum(len(w) + 1 for w in words) < length:
+            words.append(rng.choice(LATIN_WORDS))
+        body = " ".join(words).capitalize()
+    if rng.random() < 0.3:
+        body += f" {rng.randint(1, 999)}%"
+    return body
+
+
+def tiny_png(rng: random.Random, size: int = 8) -> bytes:
+    """不依赖 PIL，直接拼出一张纯色的小 PNG"""
+    color = bytes(rng.randint(0, 255) for _ in range(3))
+    raw = b"".join(b"\x00" + color * size for _ in range(size))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def generate_deck(
+    slides: int = 20,
+    shapes_per_slide: int = 4,
+    text_length: int = 40,
+    script: str = "CJK",
+    bullets: int = 0,
+    images: int = 0,
+    tables: int = 0,
+    charts: int = 0,
+    groups: int = 0,
+    notes: bool = False,
+    seed: int = 0,
+    output_path: Optional[str] = None,
+) -> bytes:
+    """生成合成 PPT，返回 .pptx 字节；给出 output_path 时同时写入磁盘"""
+    rng = random.Random(seed)
+    prs = Presentation()
+    layout = prs.slide_layouts[5]  # 仅标题
+    slide_width, slide_height = prs.slide_width, prs.slide_height
+
+    for slide_idx in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = random_text(rng, max(text_length // 4, 4), script)
+
+        columns = 2 if shapes_per_slide > 3 else 1
+        box_width = int((slide_width - Inches(1)) / columns) - Inches(0.2)
+        box_height = Inches(0.8)
+        for shape_idx in range(shapes_per_slide):
+            left = Inches(0.5) + (shape_idx % columns) * (box_width + Inches(0.2))
+            top = Inches(1.6) + (shape_idx // columns) * (box_height + Inches(0.1))
+            textbox = slide.shapes.add_textbox(left, top, box_width, box_height)
+            text_frame = textbox.text_frame
+            text_frame.text = random_text(rng, text_length, script)
+            text_frame.paragraphs[0].runs[0].font.size = Pt(rng.choice([14, 16, 18, 20]))
+
+            # 项目符号段落：显式写入 buChar，覆盖项目符号的提取与恢复逻辑
+            for _ in range(bullets):
+                paragraph = text_frame.add_paragraph()
+                paragraph.text = random_text(rng, max(text_length // 2, 4), script)
+                paragraph.level = 1
+                pPr = paragraph._p.get_or_add_pPr()
+                buChar = pPr.makeelement("{http://schemas.openxmlformats.org/drawingml/2006/main}buChar", {"char": "•"})
+                pPr.append(buChar)
+
+        for image_idx in range(images):
+            left = slide_width - Inches(1.5) - image_idx * Inches(1.1)
+            slide.shapes.add_picture(io.BytesIO(tiny_png(rng)), left, slide_height - Inches(1.5),
+                                     Inches(1), Inches(1))
+
+        short_length = max(text_length // 5, 2)
+        for table_idx in range(tables):
+            rows, cols = 4, 3
+            frame = slide.shapes.add_table(rows, cols, Inches(0.5) + table_idx * Inches(0.3), Inches(4.2),
+                                           Inches(6), Inches(1.6))
+            for row in frame.table.rows:
+                for cell in row.cells:
+                    # 表格中夹带纯数字单元格
+                    cell.text = str(rng.randint(1, 9999)) if rng.random() < 0.25 else random_text(rng, short_length, script)
+
+        for chart_idx in range(charts):
+            chart_data = CategoryChartData()
+            chart_data.categories = [random_text(rng, short_length, script) for _ in range(3)]
+            for _ in range(2):
+                chart_data.add_series(random_text(rng, short_length, script), [rng.randint(1, 100) for _ in range(3)])
+            frame = slide.shapes.add_chart(XL_CHART_TYPE.COLUMN_CLUSTERED, Inches(6.5), Inches(1.6) + chart_idx * Inches(0.3),
+                                           Inches(3), Inches(2.5), chart_data)
+            frame.chart.has_title = True
+            frame.chart.chart_title.text_frame.text = random_text(rng, short_length, script)
+
+        for group_idx in range(groups):
+            group = slide.shapes.add_group_shape()
+            for child_idx in range(2):
+                textbox = group.shapes.add_textbox(Inches(0.5) + child_idx * Inches(2.2), Inches(6) + group_idx * Inches(0.4),
+                                                   Inches(2), Inches(0.4))
+                textbox.text_frame.text = random_text(rng, short_length, script)
+
+        if notes:
+            slide.notes_slide.notes_text_frame.text = random_text(rng, text_length * 2, script)
+
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    data = buffer.getvalue()
+    if output_path:
+        with open(output_path, "wb") as f:
+            f.write(data)
+    return data
+
+
+def add_deck_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--slides", type=int, default=20)
+    parser.add_argument("--shapes-per-slide", type=int, default=4)
+    parser.add_argument("--text-length", type=int, default=40)
+    parser.add_argument("--script", choices=["CJK", "Latin", "mixed"], default="CJK")
+    parser.add_argument("--bullets", type=int, default=0, help="每个文本框追加的项目符号段落数")
+    parser.add_argument("--images", type=int, default=0, help="每页图片数")
+    parser.add_argument("--tables", type=int, default=0, help="每页表格数（4x3）")
+    parser.add_argument("--charts", type=int, default=0, help="每页柱状图数")
+    parser.add_argument("--groups", type=int, default=0, help="每页组合数（每个组合含两个文本框）")
+    parser.add_argument("--notes", action="store_true", help="每页添加演讲者备注")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def deck_kwargs(args: argparse.Namespace) -> dict:
+    return {
+        "slides": args.slides,
+        "shapes_per_slide": args.shapes_per_slide,
+        "text_length": args.text_length,
+        "script": args.script,
+        "bullets": args.bullets,
+        "images": args.images,
+        "tables": args.tables,
+        "charts": args.charts,
+        "groups": args.groups,
+        "notes": args.notes,
+        "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成合成 PPT")
+    add_deck_arguments(parser)
+    parser.add_argument("--output", default="synthetic_deck.pptx")
+    args = parser.parse_args()
+    data = generate_deck(output_path=args.output, **deck_kwargs(args))
+    print(f"已生成 {args.output} ({len(data) / 1024:.1f} KB)")
@@ -0,0 +1,223 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# 大小模型级联
+# 按长度、文字类型和复杂度把每个文本块分给小模型（便宜、低延迟）或大模型：
+# - 标签、标题等短文本 -> 小模型
+# - 长段落、多句文本、表格批量请求（JSON）-> 大模型
+# 小模型的输出先经过本地校验（空结果、数字被改动、目标文字类型不对），
+# 不通过或调用失败时升级到大模型重新翻译
+# ==========================================
+
+CJK_PATTERN = re.compile(r'[一-鿿぀-ゟ゠-ヿ가-힯]')
+# 各 CJK 目标语言应出现的文字
+TARGET_SCRIPTS = {
+    "Chinese": re.compile(r'[一-鿿]'),
+    "Japanese": re.compile(r'[一-鿿぀-ゟ゠-ヿ]'),
+    "Korean": re.compile(r'[가-힯]'),
+}
+NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)*')
+# 出现数量级单位时，数字本身可能合理地发生换算（如 "100-200万" -> "1-2 million"），不做数字校验
+MAGNITUDE_PATTERN = re.compile(r'[万亿兆千百]|\b(?:thousand|million|billion|trillion|[kKmM]|bn)\b')
+SENTENCE_END_PATTERN = re.compile(r'[。！？；.!?;]\s|[。！？；]|\n')
+WORD_PATTERN = re.compile(r'[A-Za-z]{2,}')
+
+
+def source_text(input: Any) -> str:
+    """从 Runnable 的输入中取出待翻译的原文（最后一条消息的内容）"""
+    if isinstance(input, str):
+        return input
+    messages = input.to_messages() if hasattr(input, "to_messages") else input
+    if isinstance(messages, list) and messages:
+        content = getattr(messages[-1], "content", messages[-1])
+        return content if isinstance(content, str) else str(content)
+    return str(input)
+
+
+def visual_length(text: str) -> int:
+    """CJK 字符信息密度高，按 2 个字符计"""
+    return sum(2 if CJK_PATTERN.match(char) else 1 for char in text)
+
+
+def validate_translation(source: str, output: str, target_language: Optional[str] = None) -> Optional[str]:
+    """本地校验译文，通过返回 None，否则返回不通过的原因"""
+    output = (output or "").strip()
+    if not output:
+        return "empty"
+
+    if not MAGNITUDE_PATTERN.search(source) and not MAGNITUDE_PATTERN.search(output):
+        source_numbers = sorted(n.replace(",", "") for n in NUMBER_PATTERN.findall(source))
+        output_numbers = sorted(n.replace(",", "") for n in NUMBER_PATTERN.findall(output))
+        if source_numbers != output_numbers:
+            return "numerals"
+
+    if target_language:
+        script = TARGET_SCRIPTS.get(target_language)
+        if script is not None:
+            # 原文是成句的拉丁文字，译文却没有目标语言文字：没有翻译
+            if len(WORD_PATTERN.findall(source)) >= 3 and not script.search(output):
+                return "script"
+        else:
+            # 目标是拉丁文字语言，原文和译文却都以 CJK 为主：没有翻译
+            letters = [char for char in output if char.isalpha()]
+            source_letters = [char for char in source if char.isalpha()]
+            if letters and source_letters:
+                output_cjk = sum(1 for char in letters if CJK_PATTERN.match(char)) / len(letters)
+                source_cjk = sum(1 for char in source_letters if CJK_PATTERN.match(char)) / len(source_letters)
+                if output_cjk > 0.5 and source_cjk > 0.5:
+                    return "script"
+    return None
+
+
+class TierStats:
+    """单个层级（小模型 / 大模型）的调用统计"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, seconds: float, result: Any = None, ok: bool = True) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        if not ok:
+            self.errors += 1
+        usage = getattr(result, "usage_metadata", None) or {}
+        self.input_tokens += usage.get("input_tokens", 0) or 0
+        self.output_tokens += usage.get("output_tokens", 0) or 0
+        self.cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "tier": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_latency": round(self.seconds / self.calls, 3) if self.calls else None,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
+
+
+class ModelCascade(Runnable):
+    """
+    小模型 + 大模型的两级级联，本身是一个 Runnable，可以直接替代单个 llm：`prompt | cascade`
+    - short_max_chars：视觉长度（CJK 计 2）不超过该值、且不超过 max_sentences 句的文本走小模型
+    - escalate：小模型输出未通过校验或调用失败时，升级到大模型
+    目标语言通过 config["configurable"]["target_language"] 传入，用于文字类型校验
+    """
+
+    def __init__(self, small: Any, large: Any, short_max_chars: int = 80, max_sentences: int = 1,
+                 escalate: bool = True):
+        self.small = small
+        self.large = large
+        self.short_max_chars = short_max_chars
+        self.max_sentences = max_sentences
+        self.escalate = escalate
+        self.stats = {"small": TierStats("small"), "large": TierStats("large")}
+        self.escalations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ---------- 路由与校验 ----------
+    def route(self, text: str) -> str:
+        """返回 "small" 或 "large" """
+        stripped = text.strip()
+        if stripped.startswith("[["):
+            # 表格批量请求需要严格保持 JSON 结构
+            return "large"
+        sentences = len(SENTENCE_END_PATTERN.findall(stripped.rstrip("。！？；.!?;")))
+        if visual_length(stripped) <= self.short_max_chars and sentences < self.max_sentences:
+            return "small"
+        return "large"
+
+    def _record(self, tier: str, seconds: float, result: Any = None, ok: bool = True) -> None:
+        with self._lock:
+            self.stats[tier].record(seconds, result, ok)
+
+    def _check_small(self, text: str, result: Any, config: Optional[RunnableConfig]) -> Optional[str]:
+        """小模型结果需要升级时返回原因"""
+        if not self.escalate:
+            return None
+        target_language = (config or {}).get("configurable", {}).get("target_language")
+        return validate_translation(text, getattr(result, "content", result), target_language)
+
+    def _escalated(self, text: str, reason: str) -> None:
+        with self._lock:
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+        logger.info("⤴️  小模型结果未通过校验 (%s)，升级到大模型: %s...", reason, text[:20],
+                    extra={"sample": "cascade.escalate"})
+
+    def snapshot(self) -> List[Dict]:
+        """各层级的调用统计和升级原因，便于在界面或日志中展示"""
+        with self._lock:
+            rows = [tier.to_dict() for tier in self.stats.values()]
+            rows[0]["escalations"] = sum(self.escalations.values())
+            rows[0]["escalation_reasons"] = dict(self.escalations)
+            return rows
+
+    # ---------- Runnable 接口 ----------
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        text = source_text(input)
+        if self.route(text) == "small":
+            start = time.monotonic()
+            try:
+                result = self.small.invoke(input, config, **kwargs)
+            except Exception as e:
+                self._record("small", time.monotonic() - start, ok=False)
+                if not self.escalate:
+                    raise
+                self._escalated(text, f"error: {type(e).__name__}")
+            else:
+                self._record("small", time.monotonic() - start, result)
+                reason = self._check_small(text, result, config)
+                if reason is None:
+                    return result
+                self._escalated(text, reason)
+
+        start = time.monotonic()
+        try:
+            result = self.large.invoke(input, config, **kwargs)
+        except Exception:
+            self._record("large", time.monotonic() - start, ok=False)
+            raise
+        self._record("large", time.monotonic() - start, result)
+        return result
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        text = source_text(input)
+        if self.route(text) == "small":
+            start = time.monotonic()
+            try:
+                result = await self.small.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                self._record("small", time.monotonic() - start, ok=False)
+                if not self.escalate:
+                    raise
+                self._escalated(text, f"error: {type(e).__name__}")
+            else:
+                self._record("small", time.monotonic() - start, result)
+                reason = self._check_small(text, result, config)
+                if reason is None:
+                    return result
+                self._escalated(text, reason)
+
+        start = time.monotonic()
+        try:
+            result = await self.large.ainvoke(input, config, **kwargs)
+        except Exception:
+            self._record("large", time.monotonic() - start, ok=False)
+            raise
+        self._record("large", time.monotonic() - start, result)
+        return result
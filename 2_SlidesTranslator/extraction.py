@@ -0,0 +1,211 @@
+import copy
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pptx.enum.chart import XL_CHART_TYPE
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+# ==========================================
+# 递归遍历 PPT 中所有可翻译的文本容器
+# - 普通文本框：包括组合（group）内部的文本框
+# - 表格：按表格整体提取单元格文本，翻译阶段一个表格一次结构化请求
+# - 图表：标题、坐标轴标题、系列名称、分类标签
+# - 备注页：演讲者备注
+# 解析和重构使用同一套遍历函数，保证两边看到的容器一致
+# ==========================================
+
+# 无分类轴的图表，系列 / 分类标签不做替换
+NON_CATEGORY_CHART_TYPES = {
+    XL_CHART_TYPE.XY_SCATTER, XL_CHART_TYPE.XY_SCATTER_LINES, XL_CHART_TYPE.XY_SCATTER_LINES_NO_MARKERS,
+    XL_CHART_TYPE.XY_SCATTER_SMOOTH, XL_CHART_TYPE.XY_SCATTER_SMOOTH_NO_MARKERS,
+    XL_CHART_TYPE.BUBBLE, XL_CHART_TYPE.BUBBLE_THREE_D_EFFECT,
+}
+
+
+def iter_text_shapes(shapes, in_group: bool = False) -> Iterator[Tuple[object, bool]]:
+    """遍历带文本的形状（递归进入组合），返回 (shape, 是否位于组合内)"""
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from iter_text_shapes(shape.shapes, in_group=True)
+        elif shape.has_text_frame and shape.text.strip():
+            yield shape, in_group
+
+
+def iter_graphic_frames(shapes, attr: str) -> Iterator[object]:
+    """遍历带表格（attr="has_table"）或图表（attr="has_chart"）的图形框，递归进入组合"""
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from iter_graphic_frames(shape.shapes, attr)
+        elif getattr(shape, attr, False):
+            yield shape
+
+
+def table_cells(table) -> List[List[str]]:
+    """表格的单元格文本（按行），被合并覆盖的单元格记为空字符串"""
+    return [
+        ["" if cell.is_spanned else cell.text.strip() for cell in row.cells]
+        for row in table.rows
+    ]
+
+
+def chart_text_frames(chart) -> Iterator[object]:
+    """图表标题和坐标轴标题的文本框"""
+    if chart.has_title and chart.chart_title.has_text_frame:
+        yield chart.chart_title.text_frame
+    for axis_name in ("category_axis", "value_axis"):
+        try:
+            axis = getattr(chart, axis_name)
+        except (ValueError, NotImplementedError):
+            # 饼图等没有坐标轴
+            continue
+        if axis.has_title and axis.axis_title.has_text_frame:
+            yield axis.axis_title.text_frame
+
+
+def chart_labels(chart) -> Optional[Tuple[List[str], List[str]]]:
+    """分类图表的 (分类标签, 系列名称)，散点图、气泡图和多级分类返回 None"""
+    if chart.chart_type in NON_CATEGORY_CHART_TYPES or not chart.plots:
+        return None
+    categories = chart.plots[0].categories
+    if categories.depth != 1:
+        return None
+    return [str(label) for label in categories], [series.name or "" for series in chart.series]
+
+
+def notes_text_frame(slide):
+    """演讲者备注的文本框；没有备注页时返回 None（不会新建备注页）"""
+    if not slide.has_notes_slide:
+        return None
+    return slide.notes_slide.notes_text_frame
+
+
+# ==========================================
+# 解析：提取一页中的全部文本
+# ==========================================
+def extract_slide(slide, slide_idx: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    返回 (文本块列表, 表格列表)
+    - 文本块：{"slide_index", "original_text", "kind"}，kind 为 shape / chart / notes
+    - 表格：{"slide_index", "cells"}，cells 为按行排列的单元格文本
+    """
+    items = []
+    tables = []
+
+    def add(text: str, kind: str) -> None:
+        text = text.strip()
+        if text:
+            items.append({"slide_index": slide_idx, "original_text": text, "kind": kind})
+
+    for shape, _ in iter_text_shapes(slide.shapes):
+        add(shape.text, "shape")
+
+    for frame in iter_graphic_frames(slide.shapes, "has_table"):
+        cells = table_cells(frame.table)
+        if any(text for row in cells for text in row):
+            tables.append({"slide_index": slide_idx, "cells": cells})
+
+    for frame in iter_graphic_frames(slide.shapes, "has_chart"):
+        chart = frame.chart
+        for text_frame in chart_text_frames(chart):
+            add(text_frame.text, "chart")
+        labels = chart_labels(chart)
+        if labels:
+            for label in labels[0] + labels[1]:
+                add(label, "chart")
+
+    notes = notes_text_frame(slide)
+    if notes is not None:
+        add(notes.text, "notes")
+
+    return items, tables
+
+
+# ==========================================
+# 重构：把译文写回表格、图表和备注
+# ==========================================
+def set_text_keep_style(text_frame, text: str) -> None:
+    """
+    替换文本框内容，沿用第一个段落和第一个 run 的格式
+    用于表格单元格、图表标题和备注这类不需要版式调整的文本
+    """
+    paragraphs = text_frame.paragraphs
+    first_p = paragraphs[0]._p if paragraphs else None
+    pPr = first_p.pPr if first_p is not None else None
+    first_run = next((r for p in paragraphs for r in p.runs), None)
+    rPr = first_run._r.rPr if first_run is not None else None
+    pPr = copy.deepcopy(pPr) if pPr is not None else None
+    rPr = copy.deepcopy(rPr) if rPr is not None else None
+
+    text_frame.text = text
+    for paragraph in text_frame.paragraphs:
+        p_elem = paragraph._p
+        if pPr is not None:
+            if p_elem.pPr is not None:
+                p_elem.remove(p_elem.pPr)
+            p_elem.insert(0, copy.deepcopy(pPr))
+        if rPr is not None:
+            for run in paragraph.runs:
+                r_elem = run._r
+                if r_elem.rPr is not None:
+                    r_elem.remove(r_elem.rPr)
+                r_elem.insert(0, copy.deepcopy(rPr))
+
+
+def write_table(table, translation_map: Dict[str, str]) -> int:
+    """把译文写回表格单元格，返回替换的单元格数"""
+    replaced = 0
+    for row in table.rows:
+        for cell in row.cells:
+            if cell.is_spanned:
+                continue
+            original = cell.text.strip()
+            translated = translation_map.get(original)
+            if original and translated and translated != original:
+                set_text_keep_style(cell.text_frame, translated)
+                replaced += 1
+    return replaced
+
+
+def write_chart(chart, translation_map: Dict[str, str]) -> int:
+    """把译文写回图表标题、坐标轴标题、系列名称和分类标签，返回替换处数"""
+    replaced = 0
+    for text_frame in chart_text_frames(chart):
+        translated = translation_map.get(text_frame.text.strip())
+        if translated:
+            set_text_keep_style(text_frame, translated)
+            replaced += 1
+
+    labels = chart_labels(chart)
+    if not labels:
+        return replaced
+    categories, series_names = labels
+    new_categories = [translation_map.get(label.strip(), label) for label in categories]
+    new_names = [translation_map.get(name.strip(), name) for name in series_names]
+    if new_categories == categories and new_names == series_names:
+        return replaced
+
+    # 系列名称和分类标签保存在图表内嵌的工作簿里，只能通过 replace_data 整体替换（数值不变）
+    from pptx.chart.data import CategoryChartData
+
+    chart_data = CategoryChartData()
+    chart_data.categories = new_categories
+    for series, name in zip(chart.series, new_names):
+        chart_data.add_series(name, series.values)
+    chart.replace_data(chart_data)
+    return replaced + sum(a != b for a, b in zip(categories + series_names, new_categories + new_names))
+
+
+def write_slide_extras(slide, translation_map: Dict[str, str], include_tables: bool = True) -> Dict[str, int]:
+    """写回一页中的表格、图表和备注，返回各类替换数（表格已在子进程中处理时传 include_tables=False）"""
+    counts = {"table_cells": 0, "chart_labels": 0, "notes": 0}
+    if include_tables:
+        for frame in iter_graphic_frames(slide.shapes, "has_table"):
+            counts["table_cells"] += write_table(frame.table, translation_map)
+    for frame in iter_graphic_frames(slide.shapes, "has_chart"):
+        counts["chart_labels"] += write_chart(frame.chart, translation_map)
+    notes = notes_text_frame(slide)
+    if notes is not None:
+        translated = translation_map.get(notes.text.strip())
+        if translated:
+            set_text_keep_style(notes, translated)
+            counts["notes"] += 1
+    return counts
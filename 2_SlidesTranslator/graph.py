@@ -1,576 +1,462 @@
 import asyncio
+import io
+import json
 import logging
+import os
+import re
+from concurrent.futures import as_completed
 from pathlib import Path
-from typing import List, Dict, Any, TypedDict, Tuple, Optional, NotRequired
-from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from typing import List, Dict, Any, TypedDict, Tuple, Optional, NotRequired, Union, BinaryIO
 from langchain_core.runnables import RunnableConfig
+from lxml import etree
 from pptx import Presentation
-from pptx.dml.color import RGBColor
-from collections import defaultdict
-from pptx.enum.text import MSO_AUTO_SIZE, PP_ALIGN, MSO_ANCHOR
-import re
-import shutil
-import tempfile
+from pptx.oxml import parse_xml
+import threading
 import time
-from statistics import median
+from collections import defaultdict
 
-from utils import *
+from backends import as_backend
+from resources import get_process_pool, run_coroutine
+from extraction import extract_slide, write_slide_extras
+from layout import collect_text_boxes, new_slide_stats, reconstruct_slide_text, reconstruct_slide_xml
+from metrics import get_metrics
 
 # 定义全局的 logger
 logger = logging.getLogger(__name__)
 
+# 表格每次结构化请求最多包含的单元格数，超出时按行切分
+TABLE_MAX_CELLS = 120
+# reconstruct_mode="auto" 时，达到该页数才使用多进程重构（进程间传输 XML 有固定开销）
+PROCESS_RECONSTRUCT_MIN_SLIDES = 40
+
 
 # ==========================================
 # 1. 定义 Agent State
 # ==========================================
 class AgentState(TypedDict):
-    input_ppt_path: str        
+    # 输入二选一：文件路径，或内存中的 bytes / 文件对象（优先）
+    input_ppt_path: NotRequired[str]
+    input_ppt_bytes: NotRequired[Union[bytes, BinaryIO]]
+    # 给出 output_ppt_path 时写入磁盘，否则在内存中返回 output_ppt_bytes
     output_ppt_path: NotRequired[str]
+    output_ppt_bytes: NotRequired[bytes]
     target_language: str = "English"
     extracted_data: NotRequired[List[Dict]]
+    # 表格单独提取，翻译时一个表格（或一段行）一次结构化请求
+    extracted_tables: NotRequired[List[Dict]]
     translation_map: NotRequired[Dict]    
     status_msg: NotRequired[str]
     max_concurrent: NotRequired[int]
-    batch_size: NotRequired[int]
+    # 每完成多少个文本块上报一次进度（请求的批大小由后端的 batch_size 决定）
+    progress_interval: NotRequired[int]
+    deadline_seconds: NotRequired[float]
+    untranslated: NotRequired[List[str]]
+    # 重构方式：serial（默认，单线程）/ process（按页分发到进程池）/ auto（页数较多时用 process）
+    reconstruct_mode: NotRequired[str]
+    reconstruct_workers: NotRequired[int]
+
+def open_presentation(state: AgentState):
+    """从内存（input_ppt_bytes）或磁盘（input_ppt_path）打开 PPT，不落临时文件"""
+    data = state.get('input_ppt_bytes')
+    if data is None:
+        return Presentation(state['input_ppt_path'])
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return Presentation(io.BytesIO(data))
+    # 文件对象会被解析和重构各读取一次，每次从头读
+    data.seek(0)
+    return Presentation(data)
+
+def report_progress(config: Optional[RunnableConfig], **event) -> None:
+    """
+    通过 configurable.progress_callback 向调用方（如后台任务队列）上报进度
+    未配置回调时什么也不做；回调异常不影响翻译流程
+    """
+    callback = (config or {}).get("configurable", {}).get("progress_callback")
+    if callback is None:
+        return
+    try:
+        callback(event)
+    except Exception as e:
+        logger.warning("进度回调失败: %s", e)
 
 # ==========================================
 # 1. 节点一：解析PPT并提取文本
 # ==========================================
 
-def node_parse_ppt(state: AgentState) -> AgentState:
-    """同步节点：解析 PPT 并提取文本"""
+def split_table(cells: List[List[str]], max_cells: int) -> List[List[List[str]]]:
+    """大表格按行切分，每段不超过 max_cells 个单元格（至少一行）"""
+    chunks, current, size = [], [], 0
+    for row in cells:
+        if current and size + len(row) > max_cells:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(row)
+        size += len(row)
+    if current:
+        chunks.append(current)
+    return chunks
+
+def count_translation_units(extracted_data: List[Dict], extracted_tables: List[Dict]) -> int:
+    """翻译阶段的工作单元数：去重后的文本块 + 表格分段"""
+    unique_texts = {item["original_text"] for item in extracted_data}
+    return len(unique_texts) + sum(len(split_table(t["cells"], TABLE_MAX_CELLS)) for t in extracted_tables)
+
+def node_parse_ppt(state: AgentState, config: RunnableConfig = None) -> AgentState:
+    """同步节点：解析 PPT 并提取文本（包括组合内的文本框、表格、图表和备注）"""
     logger.info("🔍 开始解析 PPT...")
-    prs = Presentation(state['input_ppt_path'])
+    prs = open_presentation(state)
     extracted_data = []
+    extracted_tables = []
     
     for slide_idx, slide in enumerate(prs.slides):
-        for shape in slide.shapes:
-            if not shape.has_text_frame:
-                continue
-            
-            text = shape.text.strip()
-            if not text:
-                continue
-            
-            extracted_data.append({
-                "slide_index": slide_idx,
-                "original_text": text, 
-            })
+        items, tables = extract_slide(slide, slide_idx)
+        extracted_data.extend(items)
+        extracted_tables.extend(tables)
     
     state["extracted_data"] = extracted_data
-    state["status_msg"] = f"✅ 解析完成：提取了 {len(extracted_data)} 个文本块"
-    logger.info(f"📊 解析完成：{len(extracted_data)} 个文本块")
+    state["extracted_tables"] = extracted_tables
+    state["status_msg"] = f"✅ 解析完成：提取了 {len(extracted_data)} 个文本块、{len(extracted_tables)} 个表格"
+    report_progress(config, stage="parse", slides_total=len(prs.slides),
+                    blocks_total=count_translation_units(extracted_data, extracted_tables))
+    logger.info("📊 解析完成：%d 个文本块，%d 个表格", len(extracted_data), len(extracted_tables))
     return state
 
 # ==========================================
 # 2. 节点二：使用异步 LLM 进行高效的并发翻译
 # ==========================================
 
-async def async_node_translate_text(llm, state: AgentState) -> AgentState:
+class TranslationCancelled(Exception):
+    """翻译任务被用户中止（例如关闭了页面）"""
+
+
+def parse_table_reply(reply: str, rows: List[List[str]]) -> Optional[List[List[str]]]:
+    """
+    解析表格翻译的 JSON 回复，形状必须与原表一致，否则返回 None；
+    单元格为 null 表示后端未能翻译该格
+    """
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", reply.strip())
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, list) or len(data) != len(rows):
+        return None
+    for row, new_row in zip(rows, data):
+        if not isinstance(new_row, list) or len(new_row) != len(row):
+            return None
+        if not all(cell is None or isinstance(cell, str) for cell in new_row):
+            return None
+    return data
+
+
+async def async_node_translate_text(llm, state: AgentState, cancel_event: Optional[threading.Event] = None,
+                                    config: Optional[RunnableConfig] = None) -> AgentState:
     """
     异步节点：使用异步 LLM 进行高效的并发翻译
+
+    llm 可以是 chat model（包装为 ChatModelBackend），也可以直接是 TranslationBackend（如离线短语表）。
+    使用有界队列 + 固定数量的 worker，而不是一次性为整份 PPT 创建全部协程，
+    因此内存和连接数只与并发数有关，与文本块数量无关。
+    - deadline_seconds：整体截止时间，超时后未完成的文本块保留原文并记录在 untranslated 中
+    - cancel_event：被设置后立即取消所有在途请求并抛出 TranslationCancelled
+    - config：每完成一个批次通过 report_progress 上报进度
     """
     logger.info("🌍 开始翻译...")
-    translation_instruction = load_prompt("./prompts/translation_instruction.txt")
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", translation_instruction),
-        ("user", "{text}")
-    ])
-    chain = prompt | llm
+    backend = as_backend(llm)
     
     translation_map = {}
-    batch_texts = [(item["original_text"], item) for item in state["extracted_data"]]
+    # 相同文本只翻译一次
+    unique_texts = list(dict.fromkeys(item["original_text"] for item in state["extracted_data"]))
+    # 大表格按行切分，每段一次结构化请求
+    table_chunks = [
+        chunk
+        for table in state.get("extracted_tables", [])
+        for chunk in split_table(table["cells"], TABLE_MAX_CELLS)
+    ]
+    cell_texts = list(dict.fromkeys(text for chunk in table_chunks for row in chunk for text in row if text))
+    total = len(unique_texts) + len(table_chunks)
+    # 普通文本按后端声明的 batch_size 组成批次
+    text_batches = [unique_texts[i:i + backend.batch_size] for i in range(0, len(unique_texts), backend.batch_size)]
     
-    # 并发控制参数
+    # 并发控制参数：界面设置的并发数，后端声明了并发上限时取两者的较小值
     MAX_CONCURRENT = state.get('max_concurrent', 10)
-    BATCH_SIZE = state.get('batch_size', 10)
-    logger.info(f"配置: 并发数={MAX_CONCURRENT}, 批次大小={BATCH_SIZE}")
+    if backend.max_concurrency is not None:
+        MAX_CONCURRENT = min(MAX_CONCURRENT, backend.max_concurrency)
+    PROGRESS_INTERVAL = state.get('progress_interval', 10)
+    DEADLINE = state.get('deadline_seconds')
+    logger.info("配置: 后端=%s, 并发数=%s, 后端批大小=%s, 截止时间=%s",
+                backend.name, MAX_CONCURRENT, backend.batch_size, DEADLINE or '无')
 
     MAX_RETRIES = 2
+    POLL_INTERVAL = 0.2
+    
+    num_workers = min(MAX_CONCURRENT, max(len(text_batches) + len(table_chunks), 1))
+    queue = asyncio.Queue(maxsize=MAX_CONCURRENT * 2)
+    # 表格逐格回退时也不超过并发上限
+    call_slots = asyncio.Semaphore(MAX_CONCURRENT)
+    progress = {"done": 0, "success": 0}
+    
+    metrics = get_metrics(config)
+    
+    async def invoke_with_retry(texts: List[str], kind: str = "text") -> Optional[List[Optional[str]]]:
+        """调用一次后端翻译一批文本，带重试；最终失败返回 None"""
+        for attempt in range(MAX_RETRIES + 1):
+            call_start = time.perf_counter()
+            try:
+                async with call_slots:
+                    result = await backend.translate_batch(texts, state['target_language'], kind)
+                if metrics is not None:
+                    metrics.record_call(time.perf_counter() - call_start, True, result.usage)
+                return result.translations
+            except Exception as e:
+                if metrics is not None:
+                    metrics.record_call(time.perf_counter() - call_start, False)
+                if attempt < MAX_RETRIES:
+                    if metrics is not None:
+                        metrics.record_retry()
+                    wait_time = (2 ** attempt) * 0.5  # 指数退避
+                    logger.warning("⚠️  重试 %d/%d: %s... (%s)", attempt + 1, MAX_RETRIES, texts[0][:20], e)
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error("❌ 最终失败: %s... (%s)", texts[0][:20], e)
+                    return await invoke_fallback(texts, kind)
     
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+    async def invoke_fallback(texts: List[str], kind: str) -> Optional[List[Optional[str]]]:
+        """重试用尽后改用后端声明的兜底后端（如离线短语表）；没有兜底或兜底也失败时返回 None"""
+        if backend.fallback is None:
+            return None
+        logger.warning("⚠️  改用 %s 后端: %s...", backend.fallback.name, texts[0][:20])
+        try:
+            result = await backend.fallback.translate_batch(texts, state['target_language'], kind)
+        except Exception as e:
+            logger.error("❌ %s 后端也失败了: %s... (%s)", backend.fallback.name, texts[0][:20], e)
+            return None
+        return result.translations
     
-    async def translate_single(text: str) -> Tuple[str, Optional[str]]:
-        """翻译单个文本，带重试"""
-        async with semaphore:
-            for attempt in range(MAX_RETRIES + 1):
-                try:
-                    config = RunnableConfig(tags=["translation"])
-                    res = await chain.ainvoke(
-                        {"target_language": state['target_language'], "text": text},
-                        config=config
-                    )
-                    return (text, res.content)
-                except Exception as e:
-                    if attempt < MAX_RETRIES:
-                        wait_time = (2 ** attempt) * 0.5  # 指数退避
-                        logger.warning(f"⚠️  重试 {attempt + 1}/{MAX_RETRIES}: {text[:20]}... ({e})")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        logger.error(f"❌ 最终失败: {text[:20]}... ({e})")
-                        return (text, None)
+    async def translate_texts(texts: List[str]) -> Dict[str, str]:
+        """翻译一批文本，返回 {原文: 译文}"""
+        translations = await invoke_with_retry(texts)
+        return {text: translated for text, translated in zip(texts, translations or []) if translated}
     
-    # 分批处理
-    batches = [batch_texts[i:i + BATCH_SIZE] for i in range(0, len(batch_texts), BATCH_SIZE)]
-    total_batches = len(batches)
+    async def translate_table(rows: List[List[str]]) -> Dict[str, str]:
+        """
+        整段表格一次请求（JSON 二维数组进、同形状的 JSON 二维数组出），术语在同一表格内保持一致；
+        回复无法解析或形状不符时逐个单元格翻译，回复中为 null 的单元格也逐个重试
+        """
+        replies = await invoke_with_retry([json.dumps(rows, ensure_ascii=False)], kind="table")
+        reply = replies[0] if replies else None
+        translated_rows = parse_table_reply(reply, rows) if reply else None
+        if translated_rows is not None:
+            translated = {
+                original: cell
+                for row, new_row in zip(rows, translated_rows)
+                for original, cell in zip(row, new_row)
+                if original and cell
+            }
+            texts = list(dict.fromkeys(text for row in rows for text in row if text and text not in translated))
+            if not texts:
+                return translated
+        else:
+            translated = {}
+            texts = list(dict.fromkeys(text for row in rows for text in row if text))
+            logger.warning("⚠️  表格批量翻译失败，逐个单元格翻译 (%d 个)", len(texts))
+        results = await asyncio.gather(*(
+            translate_texts(texts[i:i + backend.batch_size]) for i in range(0, len(texts), backend.batch_size)
+        ))
+        return {**translated, **{original: text for result in results for original, text in result.items()}}
     
-    logger.info(f"📦 总计 {len(batch_texts)} 个文本，分成 {total_batches} 个批次处理")
+    async def producer() -> None:
+        # 队列满时阻塞，形成背压
+        for batch in text_batches:
+            # 同时记录入队时间，用于统计排队等待
+            await queue.put((translate_texts, batch, time.perf_counter()))
+        for chunk in table_chunks:
+            await queue.put((translate_table, chunk, time.perf_counter()))
+        for _ in range(num_workers):
+            await queue.put(None)
+    
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            handler, payload, enqueued_at = item
+            if metrics is not None:
+                metrics.record_queue_wait(time.perf_counter() - enqueued_at)
+            result = await handler(payload)
+            if result:
+                translation_map.update(result)
+            # 进度按文本块计：一个文本批次计 len(batch) 个，一段表格计 1 个
+            if handler is translate_texts:
+                units, succeeded = len(payload), len(result)
+            else:
+                units, succeeded = 1, int(bool(result))
+            reported = progress["done"] // PROGRESS_INTERVAL
+            progress["done"] += units
+            progress["success"] += succeeded
+            if progress["done"] // PROGRESS_INTERVAL > reported or progress["done"] == total:
+                logger.info("✅ 进度 %d/%d (%d 成功)", progress['done'], total, progress['success'])
+                report_progress(config, stage="translate", done=progress["done"], total=total)
+    
+    logger.info("📦 总计 %d 个文本块，去重后 %d 个（%d 批），另有 %d 段表格，%d 个 worker 处理",
+                len(state['extracted_data']), len(unique_texts), len(text_batches), len(table_chunks), num_workers)
     
     start_time = time.time()
+    deadline_at = start_time + DEADLINE if DEADLINE else None
     
-    # 为每个批次创建任务
-    batch_tasks = []
-    for batch_idx, batch in enumerate(batches):
-        # 创建批次内的所有翻译任务
-        batch_length = len(batch)
-        tasks = [translate_single(text) for text, _ in batch]
-        
-        # 创建批次处理任务（收集该批次的结果）
-        async def process_batch(batch_idx: int, tasks: List, batch_length: int) -> None:
-            logger.info(f"🚀 开始处理批次 {batch_idx + 1}/{total_batches}")
-            results = await asyncio.gather(*tasks)
-            
-            # 处理批次结果
-            batch_success = 0
-            for original_text, translated_text in results:
-                if translated_text:
-                    translation_map[original_text] = translated_text
-                    batch_success += 1
-                else:
-                    translation_map[original_text] = original_text
-            
-            logger.info(f"✅ 批次 {batch_idx + 1} 完成 ({batch_success}/{batch_length} 成功)")
-        
-        batch_tasks.append(process_batch(batch_idx, tasks, batch_length))
+    tasks = {asyncio.create_task(producer())}
+    tasks.update(asyncio.create_task(worker()) for _ in range(num_workers))
+    pending = set(tasks)
+    cancelled = False
+    try:
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            if deadline_at is not None and time.time() >= deadline_at:
+                logger.warning("⏰ 已到截止时间 %s 秒，停止翻译", DEADLINE)
+                break
+            done, pending = await asyncio.wait(pending, timeout=POLL_INTERVAL)
+            for task in done:
+                task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
     
-    # 并发执行所有批次
-    await asyncio.gather(*batch_tasks)
+    if cancelled:
+        logger.warning("🛑 翻译已中止，完成 %d/%d", progress['done'], total)
+        raise TranslationCancelled(f"翻译已中止（已完成 {progress['done']}/{total}）")
+    
+    # 未完成或失败的文本块保留原文，并单独标记
+    untranslated = [text for text in dict.fromkeys(unique_texts + cell_texts) if text not in translation_map]
+    for text in untranslated:
+        translation_map[text] = text
     
     elapsed_time = time.time() - start_time
     
-    logger.info(f"🎉 所有翻译完成！")
-    logger.info(f"⏱️  总耗时: {elapsed_time:.2f} 秒")
-    logger.info(f"🚀 平均每个文本: {elapsed_time/len(batch_texts):.2f} 秒")
+    logger.info("🎉 所有翻译完成！总耗时 %.2f 秒，平均每个文本 %.2f 秒", elapsed_time, elapsed_time / max(total, 1))
+    if metrics is not None and metrics.input_tokens:
+        # 静态指令前缀命中供应商提示词缓存的比例（usage_metadata.input_token_details.cache_read）
+        logger.info("🧮 输入 token %d（提示词缓存命中 %d，%.0f%%），输出 token %d",
+                    metrics.input_tokens, metrics.cached_tokens, 100 * metrics.cached_tokens / metrics.input_tokens,
+                    metrics.output_tokens)
     
     state["translation_map"] = translation_map
-    state["status_msg"] = f"✅ 翻译完成，正在重构 PPT..."
+    state["untranslated"] = untranslated
+    if untranslated:
+        logger.warning("⚠️  %d 个文本块未翻译，保留原文", len(untranslated))
+        state["status_msg"] = f"⚠️ 翻译部分完成（{len(untranslated)} 处保留原文），正在重构 PPT..."
+    else:
+        state["status_msg"] = f"✅ 翻译完成，正在重构 PPT..."
     return state
 
 
-def node_reconstruct_ppt(state: AgentState) -> AgentState:
+def texts_by_slide(state: AgentState) -> Dict[int, set]:
+    """每页文本框和表格中出现的原文，多进程模式下只把本页用到的译文发给子进程"""
+    slide_texts = defaultdict(set)
+    for item in state.get("extracted_data", []):
+        if item.get("kind", "shape") == "shape":
+            slide_texts[item["slide_index"]].add(item["original_text"])
+    for table in state.get("extracted_tables", []):
+        slide_texts[table["slide_index"]].update(text for row in table["cells"] for text in row if text)
+    return slide_texts
+
+def materialize_placeholder_geometry(slide, slide_map: Dict[str, str]) -> None:
+    """
+    占位符的位置和尺寸可能继承自版式，子进程中没有版式部件可查；
+    对将被替换的占位符写入显式的位置和尺寸（串行重构替换文本后同样会写入，结果一致）
+    """
+    for shape in slide.shapes:
+        if shape.is_placeholder and shape.has_text_frame and shape.text.strip() in slide_map:
+            left, top, width, height = shape.left, shape.top, shape.width, shape.height
+            shape.left, shape.top, shape.width, shape.height = left, top, width, height
+
+def node_reconstruct_ppt(state: AgentState, config: RunnableConfig = None) -> AgentState:
     logger.info("🔨 开始智能重构 PPT ...")
     
-    prs = Presentation(state['input_ppt_path'])
+    prs = open_presentation(state)
     translation_map = state["translation_map"]
     
-    # 样式保持的关键参数
-    MIN_FONT_SIZE_PT = 12
-    MAX_FONT_REDUCTION = 0.5
-    WIDTH_EXPANSION_LIMIT = 1.15
-    MIN_RIGHT_MARGIN = Inches(0.3)
-    MIN_LEFT_MARGIN = Inches(0.3)
-    
     slide_width = prs.slide_width
-    slide_height = prs.slide_height
-
-    # 扩展宽度函数
-    def expand_box_width_aware(
-        shape, 
-        alignment: PP_ALIGN,
-        current_slide_boxes: List[Dict]
-    ) -> bool:
-        """
-        根据对齐方式智能扩展文本框宽度 (修复方向性和边距问题)
-        """
-        old_width = shape.width
-        old_left = shape.left
-        old_right = old_left + old_width
-        
-        # 计算可用空间
-        if alignment == PP_ALIGN.LEFT:
-            # 左对齐：只能向右扩展
-            max_possible_width = slide_width - MIN_RIGHT_MARGIN - old_left
-            if max_possible_width <= old_width:
-                return False
-            
-        elif alignment == PP_ALIGN.RIGHT:
-            # 右对齐：只能向左扩展
-            max_possible_width = old_right - MIN_LEFT_MARGIN
-            if max_possible_width <= old_width:
-                return False
-            
-        elif alignment == PP_ALIGN.CENTER:
-            # 居中对齐：向两边扩展
-            center = old_left + old_width / 2
-            left_space = center - MIN_LEFT_MARGIN
-            right_space = (slide_width - MIN_RIGHT_MARGIN) - center
-            half_expansion = min(left_space, right_space)
-            max_possible_width = half_expansion * 2
-            
-            if max_possible_width <= old_width:
-                return False
-            
-            # 智能侧边扩展逻辑：如果一侧受阻，优先使用另一侧
-            # 这里计算纯几何空间，后续碰撞检测会处理具体阻挡
-            # 尝试非对称扩展的简单策略
-            if left_space > right_space * 1.5:
-                # 左侧空间大得多，尝试向左多扩一点（保持视觉中心感）
-                # 这里暂不改变 center，仅在碰撞检测时微调
-                pass
-            elif right_space > left_space * 1.5:
-                pass
-                
-        else:
-            # 默认：左对齐处理
-            max_possible_width = slide_width - MIN_RIGHT_MARGIN - old_left
-            if max_possible_width <= old_width:
-                return False
-        
-        # 计算目标宽度
-        target_width = min(old_width * WIDTH_EXPANSION_LIMIT, max_possible_width)
-        
-        # 确保宽度增加（避免浮点误差）
-        if target_width <= old_width:
-            return False
-        
-        # 转换为整数
-        target_width = int(target_width)
-        
-        # 预计算新的位置和尺寸
-        new_left = old_left
-        new_width = target_width
-        
-        if alignment == PP_ALIGN.CENTER:
-            new_left = center - target_width / 2
-            # 边界修正
-            if new_left < MIN_LEFT_MARGIN:
-                new_left = MIN_LEFT_MARGIN
-                new_width = min(target_width, (center + old_width / 2) - MIN_LEFT_MARGIN)
-            if new_left + new_width > slide_width - MIN_RIGHT_MARGIN:
-                new_width = slide_width - MIN_RIGHT_MARGIN - new_left
-                new_left = center - new_width / 2
-        elif alignment == PP_ALIGN.RIGHT:
-            new_left = old_right - new_width
-            if new_left < MIN_LEFT_MARGIN:
-                new_width = old_right - MIN_LEFT_MARGIN
-                new_left = MIN_LEFT_MARGIN
-        
-        # 边界检查，防止负数宽度
-        if new_width <= old_width:
-            return False
-
-        # 碰撞检测 (方向性过滤 + 零边距)
-        test_box = {
-            'left': new_left,
-            'top': shape.top,
-            'width': new_width,
-            'height': shape.height,
-            'shape_id': id(shape)
-        }
-        
-        blocked_by = None
-        
-        for other_box in current_slide_boxes:
-            if other_box['shape_id'] == id(shape):
-                continue
-            
-            # --- 方向性过滤 ---
-            # 1. 左对齐扩展向右：忽略完全在当前文本框左侧的物体
-            if alignment == PP_ALIGN.LEFT:
-                other_right = other_box['left'] + other_box['width']
-                # 如果邻居在旧右边界的左侧，忽略它（我们在往右走）
-                if other_right <= old_right + Inches(0.01):
-                    continue
-            
-            # 2. 右对齐扩展向左：忽略完全在右侧的物体
-            elif alignment == PP_ALIGN.RIGHT:
-                # 如果邻居在旧左边界的右侧，忽略它
-                if other_box['left'] >= old_left - Inches(0.01):
-                    continue
-            
-            # 3. 居中对齐：两端都要检测，暂不做特殊过滤
-            
-            # 执行碰撞检测 (margin设为0，允许紧贴)
-            if is_overlap(test_box, other_box, margin=Inches(0.0)):
-                blocked_by = other_box['shape_id']
-                # 如果被挡住，尝试回退
-                break
-        
-        if blocked_by:
-            # 如果居中对齐被挡，尝试偏移中心点（简单的挽救措施）
-            if alignment == PP_ALIGN.CENTER:
-                # 尝试只向没有阻挡的一侧扩展
-                # 这里为了简化，如果居中被挡，直接返回失败
-                # 因为偏移中心点会改变设计意图
-                pass 
-            return False
-        
-        # 应用修改
-        shape.left = int(new_left)
-        shape.width = int(new_width)
-        return True
+    slides = list(prs.slides)
+    mode = state.get('reconstruct_mode', 'serial')
+    if mode == 'auto':
+        mode = 'process' if len(slides) >= PROCESS_RECONSTRUCT_MIN_SLIDES else 'serial'
 
-    # ========== 主处理流程 ==========
-    
-    # 收集文本框位置信息
-    all_text_boxes = []
-    for slide_idx, slide in enumerate(prs.slides):
-        for shape in slide.shapes:
-            if shape.has_text_frame and shape.text.strip():
-                all_text_boxes.append({
-                    'slide_idx': slide_idx,
-                    'shape_id': id(shape),
-                    'left': shape.left,
-                    'top': shape.top,
-                    'width': shape.width,
-                    'height': shape.height
-                })
-    
-    replaced_count = 0
-    adjustment_count = 0
-    stats = {
-        'font_reduced': 0,
-        'width_expanded': 0,
-        'wrap_enabled': 0,
-        'no_adjustment': 0
-    }
-    
-    for slide_idx, slide in enumerate(prs.slides):
-        current_slide_boxes = [
-            box for box in all_text_boxes 
-            if box['slide_idx'] == slide_idx
-        ]
-        
-        # 第一阶段：收集本页需要翻译的文本框信息
-        group_candidates = defaultdict(list)
-        
-        for shape in slide.shapes:
-            if not shape.has_text_frame:
-                continue
-            
-            original_text = shape.text.strip()
-            if original_text not in translation_map:
+    totals = new_slide_stats()
+    extra_counts = {'table_cells': 0, 'chart_labels': 0, 'notes': 0}
+
+    def merge(slide_stats: Dict[str, int]) -> None:
+        for key, count in slide_stats.items():
+            totals[key] += count
+
+    if mode == 'process':
+        workers = state.get('reconstruct_workers') or os.cpu_count() or 1
+        logger.info("多进程重构: %d 页, %d 个进程", len(slides), workers)
+        slide_texts = texts_by_slide(state)
+        futures = {}
+        pool = get_process_pool(workers)
+        for slide_idx, slide in enumerate(slides):
+            # 图表和备注在其他部件中，先在主进程写回
+            for key, count in write_slide_extras(slide, translation_map, include_tables=False).items():
+                extra_counts[key] += count
+            slide_map = {text: translation_map[text] for text in slide_texts.get(slide_idx, ()) if text in translation_map}
+            if not slide_map:
                 continue
-            
-            translated_text = translation_map[original_text]
-            
-            # 获取特征属性用于分组
-            font_size = get_font_size(shape)
-            alignment = get_paragraph_alignment(shape)
-            font_name = "Arial"
-            for p in shape.text_frame.paragraphs:
-                for r in p.runs:
-                    if r.font.name:
-                        font_name = r.font.name
-                        break
-            
-            # 计算 ratio
-            length_ratio = get_visual_width_ratio(original_text, translated_text)
-            
-            group_candidates[(font_size.pt, alignment, font_name)].append({
-                'shape': shape,
-                'original_text': original_text,
-                'translated_text': translated_text,
-                'font_size_pt': font_size.pt,
-                'length_ratio': length_ratio,
-                'has_numbers': has_arabic_numbers(translated_text)
-            })
-        
-        # 第二阶段：按组处理
-        for group_key, group_members in group_candidates.items():
-            base_size, base_align, base_font = group_key
-            member_count = len(group_members)
-            if member_count == 0: continue
-            
-            # 计算全组的统一调整策略
-            ratios = [m['length_ratio'] for m in group_members]
-            max_ratio = max(ratios)
-            median_ratio = median(ratios)
-            
-            # 抗干扰算法
-            if max_ratio > 2.5 or max_ratio > median_ratio * 1.5:
-                effective_ratio = min(median_ratio * 1.5, 2.5)
-                logger.info(f"  📦 组处理 (字号={base_size}pt): 检测到异常值 (Max={max_ratio:.2f}, Median={median_ratio:.2f}), 采用比例上限 {effective_ratio:.2f}")
-            else:
-                effective_ratio = max_ratio
-                logger.info(f"  📦 组处理 (字号={base_size}pt): 正常调整 (Max={max_ratio:.2f})")
-            
-            reduction_ratio = calculate_dynamic_reduction_ratio(effective_ratio)
-            
-            # 应用样式替换和同步字号
-            for member in group_members:
-                shape = member['shape']
-                original_text = member['original_text']
-                translated_text = member['translated_text']
-
-                original_top = shape.top
-                original_left = shape.left
-                original_width = shape.width
-                original_height = shape.height
-
-                # A. 保存样式
-                original_styles = []
-    
-                for para_idx, paragraph in enumerate(shape.text_frame.paragraphs):
-                    para_alignment = paragraph.alignment
-                    para_space_before = paragraph.space_before
-                    para_space_after = paragraph.space_after
-                    para_level = paragraph.level
-                    
-                    p_elem = paragraph._p
-                    bullet_info = extract_bullet_info_from_xml(p_elem)
-                    
-                    for run_idx, run in enumerate(paragraph.runs):
-                        if not run.text:
-                            continue
-                        
-                        style = {
-                            'paragraph_idx': para_idx,
-                            'run_idx': run_idx,
-                            'text': run.text,
-                            # 段落级
-                            'alignment': para_alignment,
-                            'space_before': para_space_before,
-                            'space_after': para_space_after,
-                            'level': para_level,
-                            
-                            # ===== 项目符号/编号信息 =====
-                            'has_bullet': bullet_info.get('has_bullet', False),
-                            'bullet_type': bullet_info.get('bullet_type', 'inherited'),
-                            
-                            # 项目符号专用
-                            'bullet_char': bullet_info.get('bullet_char', None),
-                            
-                            # 编号专用
-                            'auto_num_type': bullet_info.get('auto_num_type', None),
-                            'auto_num_start': bullet_info.get('auto_num_start', 1),
-                            
-                            # 共用样式
-                            'bullet_font_name': bullet_info.get('bullet_font_name', None),
-                            'bullet_font_size': bullet_info.get('bullet_font_size', None),
-                            'bullet_color': bullet_info.get('bullet_color', None),
-                            'bullet_color_type': bullet_info.get('bullet_color_type', None),
-                            'bullet_level': bullet_info.get('level', 0),
-                            'bullet_marL': bullet_info.get('marL', None),
-                            'bullet_indent': bullet_info.get('indent', None),
-                            
-                            # 字符级
-                            'font_name': run.font.name,
-                            'font_size': run.font.size,
-                            'font_bold': run.font.bold,
-                            'font_italic': run.font.italic,
-                            'font_underline': run.font.underline,
-                            'color': None,
-                            'color_type': None,
-                        }
-                        
-                        # 提取字符颜色
-                        if run.font.color:
-                            if hasattr(run.font.color, 'rgb') and run.font.color.rgb:
-                                style['color'] = run.font.color.rgb
-                                style['color_type'] = 'RGB'
-                            elif hasattr(run.font.color, 'theme_color') and run.font.color.theme_color:
-                                style['color'] = run.font.color.theme_color
-                                style['color_type'] = 'theme'
-                        
-                        original_styles.append(style)
-                
-                # B. 替换文字
-                shape.text = translated_text
-                shape.top = original_top
-                shape.left = original_left
-                shape.width = original_width
-                shape.height = original_height
-                
-                # C. 恢复样式
-                apply_styles(shape, original_styles)
-                
-                # D. 设置自动调整选项 (不改变形状大小，允许文本溢出)
-                text_frame = shape.text_frame
-                try:
-                    text_frame.auto_size = MSO_AUTO_SIZE.NONE
-                    # text_frame.word_wrap = False
-                except Exception as e:
-                    logger.warning(f"设置 auto_size 失败: {e}")
-
-                for para_idx, paragraph in enumerate(text_frame.paragraphs):
-                    # 重新从 original_styles 中获取对齐方式并应用
-                    for style in original_styles:
-                        if style.get('paragraph_idx') == para_idx and style.get('alignment'):
-                            paragraph.alignment = style['alignment']
-                            break
-                
-                # E. 应用组统一的字号
-                new_font_size_pt = base_size * reduction_ratio
-                new_font_size_pt = max(new_font_size_pt, MIN_FONT_SIZE_PT)
-                new_font_size = Pt(new_font_size_pt)
-                for paragraph in text_frame.paragraphs:
-                    for run in paragraph.runs:
-                        if run.font.size:
-                            run.font.size = new_font_size
-                shape.top = original_top
-                shape.left = original_left
-                # width 和 height 可能已被 expand_box_width_aware 修改，所以只在需要时恢复
-                if not (new_font_size_pt <= MIN_FONT_SIZE_PT and member['length_ratio'] > 1.2) and member['length_ratio'] <= 2.0:
-                    # 只有在不扩展宽度的情况下，才恢复原始宽度和高度
-                    shape.width = original_width
-                    shape.height = original_height
-
-                replaced_count += 1
-                
-                # 第三阶段：个别优化
-                real_ratio = member['length_ratio']
-                
-                is_overcrowded = (new_font_size_pt <= MIN_FONT_SIZE_PT and real_ratio > 1.2) or (real_ratio > 2.0)
-                
-                if is_overcrowded:
-                    # 调用修复后的函数
-                    success = expand_box_width_aware(
-                        shape,
-                        base_align,
-                        current_slide_boxes
-                    )
-                    
-                    if success:
-                        stats['width_expanded'] += 1
-                        adjustment_count += 1
-                        logger.info(f"    ↔️  扩展宽度成功: {translated_text[:15]}...")
-                        # 宽度失败，尝试换行
-                    try:
-                        text_frame.word_wrap = True
-                        stats['wrap_enabled'] += 1
-                        logger.info(f"启用换行: {translated_text[:15]}...")
-                    except: pass
-                elif effective_ratio <= 1.05:
-                    stats['no_adjustment'] += 1
-                else:
-                    stats['font_reduced'] += 1
-                    adjustment_count += 1
-                    logger.info(f"    📏 同步字号: {base_size}pt -> {new_font_size_pt}pt")
+            materialize_placeholder_geometry(slide, slide_map)
+            # 只传本页的 XML、本页用到的译文和碰撞检测用的文本框位置
+            future = pool.submit(reconstruct_slide_xml, etree.tostring(slide._element), slide_idx, slide_width,
+                                 slide_map, collect_text_boxes(slide.shapes))
+            futures[future] = slide
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            xml_bytes, slide_stats = future.result()
+            # 用子进程返回的 XML 替换幻灯片部件的根元素，保存时直接序列化
+            futures[future].part._element = parse_xml(xml_bytes)
+            merge(slide_stats)
+            report_progress(config, stage="reconstruct", slides_done=done_count, slides_total=len(futures))
+    else:
+        for slide_idx, slide in enumerate(slides):
+            merge(reconstruct_slide_text(slide.shapes, slide_idx, slide_width, translation_map,
+                                         collect_text_boxes(slide.shapes)))
+            # 表格、图表和备注：直接写回译文，沿用原有格式
+            for key, count in write_slide_extras(slide, translation_map).items():
+                extra_counts[key] += count
+            report_progress(config, stage="reconstruct", slides_done=slide_idx + 1, slides_total=len(slides))
+
+    extra_counts['table_cells'] += totals.pop('table_cells')
+    replaced_count = totals['replaced']
+    adjustment_count = totals['adjusted']
+    stats = {key: totals[key] for key in ('font_reduced', 'width_expanded', 'wrap_enabled', 'no_adjustment')}
 
     # 保存文件
     output_ppt_path = state.get('output_ppt_path')
-    if not output_ppt_path:
+    if not output_ppt_path and state.get('input_ppt_bytes') is None:
         input_ppt_path = state.get('input_ppt_path')
         target_lang = state.get('target_language')
         path = Path(input_ppt_path)
         new_filename = f"{path.stem}_{target_lang}{path.suffix}"
         output_ppt_path = str(path.parent / new_filename)
         
-    prs.save(output_ppt_path)
+    if output_ppt_path:
+        prs.save(output_ppt_path)
+    else:
+        # 内存模式：直接返回生成的 PPT 字节，不经过文件系统
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        state["output_ppt_bytes"] = buffer.getvalue()
     
     # 输出统计信息
-    logger.info(f"✅ 重构完成！")
-    logger.info(f"   - 共替换 {replaced_count} 处文本")
-    logger.info(f"   - 总计调整 {adjustment_count} 处")
-    logger.info(f"   ├─ 缩小字号: {stats['font_reduced']}")
-    logger.info(f"   ├─ 扩展宽度: {stats['width_expanded']}")
-    logger.info(f"   ├─ 启用换行: {stats['wrap_enabled']}")
-    logger.info(f"   └─ 无需调整: {stats['no_adjustment']}")
+    logger.info("✅ 重构完成！共替换 %d 处文本，调整 %d 处（缩小字号 %d，扩展宽度 %d，启用换行 %d，无需调整 %d）",
+                replaced_count, adjustment_count, stats['font_reduced'], stats['width_expanded'],
+                stats['wrap_enabled'], stats['no_adjustment'], extra={"reconstruct_stats": stats})
+    logger.info("   表格单元格 %d 处，图表标签 %d 处，备注 %d 处",
+                extra_counts['table_cells'], extra_counts['chart_labels'], extra_counts['notes'])
     
+    replaced_count += sum(extra_counts.values())
     state["status_msg"] = f"✅ PPT 生成成功！共翻译 {replaced_count} 处，调整 {adjustment_count} 处"
+    if state.get("untranslated"):
+        state["status_msg"] += f"，{len(state['untranslated'])} 处因超时或失败保留原文"
     return state
 
 # ==========================================
@@ -581,26 +467,36 @@ def make_translate_node(llm):
     工厂函数：接收llm，返回绑定了llm的同步包装函数（函数对象）
     作用：让wrapper_translate_text能拿到llm，且返回的是可调用的函数对象
     """
-    def wrapper_translate_text(state: AgentState) -> AgentState:
+    def wrapper_translate_text(state: AgentState, config: RunnableConfig) -> AgentState:
         """包装异步节点为同步函数（现在绑定了llm）"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            # 调用异步节点时传入绑定的llm
-            return loop.run_until_complete(async_node_translate_text(llm, state))
-        finally:
-            loop.close()
+        # 调用方可以通过 configurable.cancel_event 传入 threading.Event 以中止任务
+        cancel_event = config.get("configurable", {}).get("cancel_event")
+        # 在进程级常驻事件循环上执行，异步 HTTP 连接池可以跨任务复用
+        return run_coroutine(async_node_translate_text(llm, state, cancel_event, config))
     return wrapper_translate_text
 
 # ==========================================
 # 4. 构建 LangGraph 工作流
 # ==========================================
+def timed_node(node_name: str, func):
+    """包装节点：配置了 configurable.metrics 时记录节点耗时"""
+    def wrapper(state: AgentState, config: RunnableConfig) -> AgentState:
+        metrics = get_metrics(config)
+        if metrics is None:
+            return func(state, config)
+        with metrics.time_node(node_name):
+            return func(state, config)
+    return wrapper
+
 def create_graph(llm):
+    # langgraph 只在真正构建工作流时才需要，延迟导入以加快应用冷启动
+    from langgraph.graph import StateGraph, END
+
     workflow = StateGraph(AgentState)
     
-    workflow.add_node("parse", node_parse_ppt)
-    workflow.add_node("translate", make_translate_node(llm))  # 使用包装后的同步节点
-    workflow.add_node("reconstruct", node_reconstruct_ppt)
+    workflow.add_node("parse", timed_node("parse", node_parse_ppt))
+    workflow.add_node("translate", timed_node("translate", make_translate_node(llm)))  # 使用包装后的同步节点
+    workflow.add_node("reconstruct", timed_node("reconstruct", node_reconstruct_ppt))
     
     workflow.set_entry_point("parse")
     workflow.add_edge("parse", "translate")
@@ -0,0 +1,212 @@
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from log_setup import bind_job
+from metrics import JobMetrics, REGISTRY
+from resources import get_compiled_graph
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================
+# 1. 单个翻译任务
+# ==========================================
+@dataclass
+class TranslationJob:
+    """后台翻译任务的状态快照，由 worker 线程更新，由界面线程读取"""
+    job_id: str
+    file_name: str
+    target_language: str
+    status: str = "queued"  # queued / running / done / failed / cancelled
+    stage: str = "排队中"
+    slides_total: int = 0
+    slides_done: int = 0
+    blocks_total: int = 0
+    blocks_done: int = 0
+    status_msg: str = ""
+    output_file_name: str = ""
+    output_bytes: Optional[bytes] = None
+    untranslated: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    # 界面最近一次轮询该任务的时间，用于识别已关闭页面、无人再查看的任务
+    last_seen_at: float = field(default_factory=time.time)
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    metrics: Optional[JobMetrics] = field(default=None, repr=False)
+
+    @property
+    def progress(self) -> float:
+        """整体进度 0~1：解析 10%，翻译 70%，重构 20%"""
+        if self.status == "done":
+            return 1.0
+        progress = 0.0
+        if self.slides_total:
+            progress += 0.1
+        if self.blocks_total:
+            progress += 0.7 * self.blocks_done / self.blocks_total
+        if self.slides_total and self.stage == "重构中":
+            progress += 0.2 * self.slides_done / self.slides_total
+        return min(progress, 0.99)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def handle_progress(self, event: Dict[str, Any]) -> None:
+        """graph 节点通过 configurable.progress_callback 回调的进度事件"""
+        stage = event.get("stage")
+        if stage == "parse":
+            self.stage = "翻译中"
+            self.slides_total = event.get("slides_total", 0)
+            self.blocks_total = event.get("blocks_total", 0)
+        elif stage == "translate":
+            self.blocks_done = event.get("done", 0)
+            self.blocks_total = event.get("total", self.blocks_total)
+        elif stage == "reconstruct":
+            self.stage = "重构中"
+            self.slides_done = event.get("slides_done", 0)
+            self.slides_total = event.get("slides_total", self.slides_total)
+
+
+# ==========================================
+# 2. 后台任务队列
+# ==========================================
+class JobManager:
+    """
+    用线程池在后台执行翻译任务，Streamlit 脚本线程只负责提交和轮询，不再被阻塞
+    同一进程内的所有会话共享一个 JobManager（见 app.py 中的 st.cache_resource）
+
+    会话关闭后任务不会再被移除，因此由后台线程定期清理：
+    - 已结束的任务在 job_ttl_seconds 后释放（连同生成的 PPT 字节）
+    - 超过 idle_timeout_seconds 无人轮询的任务视为已被遗弃，未结束的会先中止再释放
+    """
+
+    def __init__(self, max_workers: int = 2, job_ttl_seconds: float = 3600.0,
+                 idle_timeout_seconds: float = 300.0, prune_interval_seconds: float = 30.0):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate-job")
+        self.jobs: Dict[str, TranslationJob] = {}
+        self._lock = threading.Lock()
+        self.job_ttl_seconds = job_ttl_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._prune_interval = prune_interval_seconds
+        threading.Thread(target=self._prune_loop, name="translate-job-pruner", daemon=True).start()
+
+    def submit(self, llm, file_name: str, file_bytes: bytes, target_language: str, options: Dict[str, Any]) -> TranslationJob:
+        job = TranslationJob(
+            job_id=uuid.uuid4().hex[:8],
+            file_name=file_name,
+            target_language=target_language,
+            output_file_name=f"{target_language}_{file_name}",
+        )
+        with self._lock:
+            self.jobs[job.job_id] = job
+        # 每个任务在独立的 contextvars 上下文中运行，线程池复用线程时日志上下文不会串号
+        self.executor.submit(contextvars.copy_context().run, self._run, job, llm, file_bytes, options)
+        logger.info("📥 任务入队: %s 文件名=%s, 目标语言=%s", job.job_id, file_name, target_language)
+        return job
+
+    def get(self, job_id: str) -> Optional[TranslationJob]:
+        job = self.jobs.get(job_id)
+        if job:
+            job.last_seen_at = time.time()
+        return job
+
+    def cancel(self, job_id: str) -> None:
+        job = self.jobs.get(job_id)
+        if job and job.is_active:
+            job.cancel_event.set()
+            logger.info("🛑 请求中止任务: %s", job_id)
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+        if job:
+            job.cancel_event.set()
+
+    def prune(self, now: Optional[float] = None) -> List[str]:
+        """释放过期和被遗弃的任务，返回被移除的任务 ID"""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                job for job in self.jobs.values()
+                if now - job.last_seen_at > self.idle_timeout_seconds
+                or (job.finished_at is not None and now - job.finished_at > self.job_ttl_seconds)
+            ]
+        for job in expired:
+            self.remove(job.job_id)
+            logger.info("🧹 清理任务: %s 状态=%s", job.job_id, job.status)
+        return [job.job_id for job in expired]
+
+    def _prune_loop(self) -> None:
+        while True:
+            time.sleep(self._prune_interval)
+            try:
+                self.prune()
+            except Exception:
+                logger.exception("❌ 清理任务失败")
+
+    def _run(self, job: TranslationJob, llm, file_bytes: bytes, options: Dict[str, Any]) -> None:
+        # graph 依赖 python-pptx / langchain，只在第一次执行任务时导入
+        from graph import TranslationCancelled
+
+        bind_job(job.job_id)
+        if job.cancel_event.is_set():
+            job.status = "cancelled"
+            job.stage = "已中止"
+            return
+
+        job.status = "running"
+        job.stage = "解析中"
+        job.metrics = JobMetrics(job.job_id, registry=REGISTRY)
+        try:
+            # 上传内容全程在内存中流转：解析、重构和下载都不经过文件系统
+            initial_state = {
+                "input_ppt_bytes": file_bytes,
+                "target_language": job.target_language,
+                "extracted_data": [],
+                "translation_map": {},
+                "status_msg": "初始化中...",
+                **options,
+            }
+            config = {
+                "configurable": {
+                    "cancel_event": job.cancel_event,
+                    "progress_callback": job.handle_progress,
+                    "metrics": job.metrics,
+                }
+            }
+
+            app = get_compiled_graph(llm)
+            final_state = dict(initial_state)
+            # 逐节点流式获取状态更新
+            for update in app.stream(initial_state, config=config, stream_mode="updates"):
+                for node_name, node_state in update.items():
+                    logger.info("📡 完成节点: %s", node_name)
+                    if node_state:
+                        final_state.update(node_state)
+                        job.status_msg = node_state.get("status_msg", job.status_msg)
+
+            job.output_bytes = final_state["output_ppt_bytes"]
+            job.untranslated = final_state.get("untranslated", [])
+            job.status = "done"
+            job.stage = "已完成"
+        except TranslationCancelled as e:
+            job.status = "cancelled"
+            job.stage = "已中止"
+            job.status_msg = str(e)
+        except Exception as e:
+            logger.exception("❌ 任务失败")
+            job.status = "failed"
+            job.stage = "失败"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.metrics.finish(job.status)
+            logger.info("📈 任务指标", extra={"metrics": job.metrics.to_dict()})
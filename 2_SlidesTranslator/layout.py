@@ -0,0 +1,437 @@
+import logging
+from collections import defaultdict
+from statistics import median
+from typing import Dict, List, Tuple
+
+from pptx.enum.text import MSO_AUTO_SIZE, PP_ALIGN
+
+from utils import (
+    Inches, Pt, get_visual_width_ratio, is_overlap, has_arabic_numbers, get_font_size,
+    get_paragraph_alignment, apply_styles, calculate_dynamic_reduction_ratio, extract_bullet_info_from_xml,
+)
+from extraction import iter_graphic_frames, iter_text_shapes, write_table
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# 单页文本重构：替换文字、恢复样式、统一组内字号、扩展宽度 / 换行
+# 只读写幻灯片自身的 XML，不访问 presentation 的其他部件，因此既可以在主进程中
+# 直接处理 slide.shapes，也可以在子进程中处理序列化后的幻灯片 XML（见 reconstruct_slide_xml）
+# 本模块只依赖 python-pptx / lxml，子进程导入很快
+# ==========================================
+
+# 样式保持的关键参数
+MIN_FONT_SIZE_PT = 12
+MAX_FONT_REDUCTION = 0.5
+WIDTH_EXPANSION_LIMIT = 1.15
+MIN_RIGHT_MARGIN = Inches(0.3)
+MIN_LEFT_MARGIN = Inches(0.3)
+
+
+def new_slide_stats() -> Dict[str, int]:
+    return {
+        'replaced': 0,
+        'adjusted': 0,
+        'font_reduced': 0,
+        'width_expanded': 0,
+        'wrap_enabled': 0,
+        'no_adjustment': 0,
+        'table_cells': 0,
+    }
+
+
+def collect_text_boxes(shapes) -> List[Dict]:
+    """收集一页顶层文本框的位置，用于宽度扩展时的碰撞检测（布局计划）"""
+    return [
+        {
+            'shape_id': shape.shape_id,
+            'left': shape.left,
+            'top': shape.top,
+            'width': shape.width,
+            'height': shape.height
+        }
+        for shape in shapes
+        if shape.has_text_frame and shape.text.strip()
+    ]
+
+
+# 扩展宽度函数
+def expand_box_width_aware(
+    shape, 
+    alignment: PP_ALIGN,
+    current_slide_boxes: List[Dict],
+    slide_width: int
+) -> bool:
+    """
+    根据对齐方式智能扩展文本框宽度 (修复方向性和边距问题)
+    """
+    old_width = shape.width
+    old_left = shape.left
+    old_right = old_left + old_width
+
+    # 计算可用空间
+    if alignment == PP_ALIGN.LEFT:
+        # 左对齐：只能向右扩展
+        max_possible_width = slide_width - MIN_RIGHT_MARGIN - old_left
+        if max_possible_width <= old_width:
+            return False
+
+    elif alignment == PP_ALIGN.RIGHT:
+        # 右对齐：只能向左扩展
+        max_possible_width = old_right - MIN_LEFT_MARGIN
+        if max_possible_width <= old_width:
+            return False
+
+    elif alignment == PP_ALIGN.CENTER:
+        # 居中对齐：向两边扩展
+        center = old_left + old_width / 2
+        left_space = center - MIN_LEFT_MARGIN
+        right_space = (slide_width - MIN_RIGHT_MARGIN) - center
+        half_expansion = min(left_space, right_space)
+        max_possible_width = half_expansion * 2
+
+        if max_possible_width <= old_width:
+            return False
+
+        # 智能侧边扩展逻辑：如果一侧受阻，优先使用另一侧
+        # 这里计算纯几何空间，后续碰撞检测会处理具体阻挡
+        # 尝试非对称扩展的简单策略
+        if left_space > right_space * 1.5:
+            # 左侧空间大得多，尝试向左多扩一点（保持视觉中心感）
+            # 这里暂不改变 center，仅在碰撞检测时微调
+            pass
+        elif right_space > left_space * 1.5:
+            pass
+
+    else:
+        # 默认：左对齐处理
+        max_possible_width = slide_width - MIN_RIGHT_MARGIN - old_left
+        if max_possible_width <= old_width:
+            return False
+
+    # 计算目标宽度
+    target_width = min(old_width * WIDTH_EXPANSION_LIMIT, max_possible_width)
+
+    # 确保宽度增加（避免浮点误差）
+    if target_width <= old_width:
+        return False
+
+    # 转换为整数
+    target_width = int(target_width)
+
+    # 预计算新的位置和尺寸
+    new_left = old_left
+    new_width = target_width
+
+    if alignment == PP_ALIGN.CENTER:
+        new_left = center - target_width / 2
+        # 边界修正
+        if new_left < MIN_LEFT_MARGIN:
+            new_left = MIN_LEFT_MARGIN
+            new_width = min(target_width, (center + old_width / 2) - MIN_LEFT_MARGIN)
+        if new_left + new_width > slide_width - MIN_RIGHT_MARGIN:
+            new_width = slide_width - MIN_RIGHT_MARGIN - new_left
+            new_left = center - new_width / 2
+    elif alignment == PP_ALIGN.RIGHT:
+        new_left = old_right - new_width
+        if new_left < MIN_LEFT_MARGIN:
+            new_width = old_right - MIN_LEFT_MARGIN
+            new_left = MIN_LEFT_MARGIN
+
+    # 边界检查，防止负数宽度
+    if new_width <= old_width:
+        return False
+
+    # 碰撞检测 (方向性过滤 + 零边距)
+    test_box = {
+        'left': new_left,
+        'top': shape.top,
+        'width': new_width,
+        'height': shape.height,
+        'shape_id': shape.shape_id
+    }
+
+    blocked_by = None
+
+    for other_box in current_slide_boxes:
+        if other_box['shape_id'] == shape.shape_id:
+            continue
+
+        # --- 方向性过滤 ---
+        # 1. 左对齐扩展向右：忽略完全在当前文本框左侧的物体
+        if alignment == PP_ALIGN.LEFT:
+            other_right = other_box['left'] + other_box['width']
+            # 如果邻居在旧右边界的左侧，忽略它（我们在往右走）
+            if other_right <= old_right + Inches(0.01):
+                continue
+
+        # 2. 右对齐扩展向左：忽略完全在右侧的物体
+        elif alignment == PP_ALIGN.RIGHT:
+            # 如果邻居在旧左边界的右侧，忽略它
+            if other_box['left'] >= old_left - Inches(0.01):
+                continue
+
+        # 3. 居中对齐：两端都要检测，暂不做特殊过滤
+
+        # 执行碰撞检测 (margin设为0，允许紧贴)
+        if is_overlap(test_box, other_box, margin=Inches(0.0)):
+            blocked_by = other_box['shape_id']
+            # 如果被挡住，尝试回退
+            break
+
+    if blocked_by:
+        # 如果居中对齐被挡，尝试偏移中心点（简单的挽救措施）
+        if alignment == PP_ALIGN.CENTER:
+            # 尝试只向没有阻挡的一侧扩展
+            # 这里为了简化，如果居中被挡，直接返回失败
+            # 因为偏移中心点会改变设计意图
+            pass 
+        return False
+
+    # 应用修改
+    shape.left = int(new_left)
+    shape.width = int(new_width)
+    return True
+
+
+def reconstruct_slide_text(shapes, slide_idx: int, slide_width: int, translation_map: Dict[str, str],
+                           current_slide_boxes: List[Dict]) -> Dict[str, int]:
+    """重构一页中的文本框（包括组合内的文本框），返回本页的统计"""
+    stats = new_slide_stats()
+    replaced_count = 0
+    adjustment_count = 0
+
+    # 第一阶段：收集本页需要翻译的文本框信息
+    group_candidates = defaultdict(list)
+
+    # 包括组合内的文本框（组合内的形状使用组合坐标，不做宽度扩展）
+    for shape, in_group in iter_text_shapes(shapes):
+        original_text = shape.text.strip()
+        if original_text not in translation_map:
+            continue
+
+        translated_text = translation_map[original_text]
+
+        # 获取特征属性用于分组
+        font_size = get_font_size(shape)
+        alignment = get_paragraph_alignment(shape)
+        font_name = "Arial"
+        for p in shape.text_frame.paragraphs:
+            for r in p.runs:
+                if r.font.name:
+                    font_name = r.font.name
+                    break
+
+        # 计算 ratio
+        length_ratio = get_visual_width_ratio(original_text, translated_text)
+
+        group_candidates[(font_size.pt, alignment, font_name)].append({
+            'shape': shape,
+            'original_text': original_text,
+            'translated_text': translated_text,
+            'font_size_pt': font_size.pt,
+            'length_ratio': length_ratio,
+            'has_numbers': has_arabic_numbers(translated_text),
+            'in_group': in_group,
+        })
+
+    # 第二阶段：按组处理
+    for group_key, group_members in group_candidates.items():
+        base_size, base_align, base_font = group_key
+        member_count = len(group_members)
+        if member_count == 0: continue
+
+        # 计算全组的统一调整策略
+        ratios = [m['length_ratio'] for m in group_members]
+        max_ratio = max(ratios)
+        median_ratio = median(ratios)
+
+        # 抗干扰算法
+        if max_ratio > 2.5 or max_ratio > median_ratio * 1.5:
+            effective_ratio = min(median_ratio * 1.5, 2.5)
+            logger.info("  📦 组处理 (字号=%spt): 检测到异常值 (Max=%.2f, Median=%.2f), 采用比例上限 %.2f",
+                        base_size, max_ratio, median_ratio, effective_ratio,
+                        extra={"slide": slide_idx, "sample": "reconstruct.group"})
+        else:
+            effective_ratio = max_ratio
+            logger.info("  📦 组处理 (字号=%spt): 正常调整 (Max=%.2f)", base_size, max_ratio,
+                        extra={"slide": slide_idx, "sample": "reconstruct.group"})
+
+        reduction_ratio = calculate_dynamic_reduction_ratio(effective_ratio)
+
+        # 应用样式替换和同步字号
+        for member in group_members:
+            shape = member['shape']
+            original_text = member['original_text']
+            translated_text = member['translated_text']
+
+            original_top = shape.top
+            original_left = shape.left
+            original_width = shape.width
+            original_height = shape.height
+
+            # A. 保存样式
+            original_styles = []
+
+            for para_idx, paragraph in enumerate(shape.text_frame.paragraphs):
+                para_alignment = paragraph.alignment
+                para_space_before = paragraph.space_before
+                para_space_after = paragraph.space_after
+                para_level = paragraph.level
+
+                p_elem = paragraph._p
+                bullet_info = extract_bullet_info_from_xml(p_elem)
+
+                for run_idx, run in enumerate(paragraph.runs):
+                    if not run.text:
+                        continue
+
+                    style = {
+                        'paragraph_idx': para_idx,
+                        'run_idx': run_idx,
+                        'text': run.text,
+                        # 段落级
+                        'alignment': para_alignment,
+                        'space_before': para_space_before,
+                        'space_after': para_space_after,
+                        'level': para_level,
+
+                        # ===== 项目符号/编号信息 =====
+                        'has_bullet': bullet_info.get('has_bullet', False),
+                        'bullet_type': bullet_info.get('bullet_type', 'inherited'),
+
+                        # 项目符号专用
+                        'bullet_char': bullet_info.get('bullet_char', None),
+
+                        # 编号专用
+                        'auto_num_type': bullet_info.get('auto_num_type', None),
+                        'auto_num_start': bullet_info.get('auto_num_start', 1),
+
+                        # 共用样式
+                        'bullet_font_name': bullet_info.get('bullet_font_name', None),
+                        'bullet_font_size': bullet_info.get('bullet_font_size', None),
+                        'bullet_color': bullet_info.get('bullet_color', None),
+                        'bullet_color_type': bullet_info.get('bullet_color_type', None),
+                        'bullet_level': bullet_info.get('level', 0),
+                        'bullet_marL': bullet_info.get('marL', None),
+                        'bullet_indent': bullet_info.get('indent', None),
+
+                        # 字符级
+                        'font_name': run.font.name,
+                        'font_size': run.font.size,
+                        'font_bold': run.font.bold,
+                        'font_italic': run.font.italic,
+                        'font_underline': run.font.underline,
+                        'color': None,
+                        'color_type': None,
+                    }
+
+                    # 提取字符颜色
+                    if run.font.color:
+                        if hasattr(run.font.color, 'rgb') and run.font.color.rgb:
+                            style['color'] = run.font.color.rgb
+                            style['color_type'] = 'RGB'
+                        elif hasattr(run.font.color, 'theme_color') and run.font.color.theme_color:
+                            style['color'] = run.font.color.theme_color
+                            style['color_type'] = 'theme'
+
+                    original_styles.append(style)
+
+            # B. 替换文字
+            shape.text = translated_text
+            shape.top = original_top
+            shape.left = original_left
+            shape.width = original_width
+            shape.height = original_height
+
+            # C. 恢复样式
+            apply_styles(shape, original_styles)
+
+            # D. 设置自动调整选项 (不改变形状大小，允许文本溢出)
+            text_frame = shape.text_frame
+            try:
+                text_frame.auto_size = MSO_AUTO_SIZE.NONE
+                # text_frame.word_wrap = False
+            except Exception as e:
+                logger.warning("设置 auto_size 失败: %s", e, extra={"slide": slide_idx})
+
+            for para_idx, paragraph in enumerate(text_frame.paragraphs):
+                # 重新从 original_styles 中获取对齐方式并应用
+                for style in original_styles:
+                    if style.get('paragraph_idx') == para_idx and style.get('alignment'):
+                        paragraph.alignment = style['alignment']
+                        break
+
+            # E. 应用组统一的字号
+            new_font_size_pt = base_size * reduction_ratio
+            new_font_size_pt = max(new_font_size_pt, MIN_FONT_SIZE_PT)
+            new_font_size = Pt(new_font_size_pt)
+            for paragraph in text_frame.paragraphs:
+                for run in paragraph.runs:
+                    if run.font.size:
+                        run.font.size = new_font_size
+            shape.top = original_top
+            shape.left = original_left
+            # width 和 height 可能已被 expand_box_width_aware 修改，所以只在需要时恢复
+            if not (new_font_size_pt <= MIN_FONT_SIZE_PT and member['length_ratio'] > 1.2) and member['length_ratio'] <= 2.0:
+                # 只有在不扩展宽度的情况下，才恢复原始宽度和高度
+                shape.width = original_width
+                shape.height = original_height
+
+            replaced_count += 1
+
+            # 第三阶段：个别优化
+            real_ratio = member['length_ratio']
+
+            is_overcrowded = (new_font_size_pt <= MIN_FONT_SIZE_PT and real_ratio > 1.2) or (real_ratio > 2.0)
+
+            if is_overcrowded:
+                # 调用修复后的函数
+                success = not member['in_group'] and expand_box_width_aware(
+                    shape,
+                    base_align,
+                    current_slide_boxes,
+                    slide_width
+                )
+
+                if success:
+                    stats['width_expanded'] += 1
+                    adjustment_count += 1
+                    logger.info("    ↔️  扩展宽度成功: %s...", translated_text[:15],
+                                extra={"slide": slide_idx, "sample": "reconstruct.expand"})
+                    # 宽度失败，尝试换行
+                try:
+                    text_frame.word_wrap = True
+                    stats['wrap_enabled'] += 1
+                    logger.info("启用换行: %s...", translated_text[:15],
+                                extra={"slide": slide_idx, "sample": "reconstruct.wrap"})
+                except: pass
+            elif effective_ratio <= 1.05:
+                stats['no_adjustment'] += 1
+            else:
+                stats['font_reduced'] += 1
+                adjustment_count += 1
+                logger.info("    📏 同步字号: %spt -> %spt", base_size, new_font_size_pt,
+                            extra={"slide": slide_idx, "sample": "reconstruct.font"})
+
+    stats['replaced'] = replaced_count
+    stats['adjusted'] = adjustment_count
+    return stats
+
+
+def reconstruct_slide_xml(xml_bytes: bytes, slide_idx: int, slide_width: int, translation_map: Dict[str, str],
+                          current_slide_boxes: List[Dict]) -> Tuple[bytes, Dict[str, int]]:
+    """
+    子进程入口：在序列化的幻灯片 XML 上完成文本框和表格的重构，返回新的 XML 和统计
+    图表和备注位于其他部件中，由主进程处理
+    """
+    from lxml import etree
+    from pptx.oxml import parse_xml
+    from pptx.shapes.shapetree import SlideShapes
+
+    sld = parse_xml(xml_bytes)
+    shapes = SlideShapes(sld.cSld.spTree, None)
+    stats = reconstruct_slide_text(shapes, slide_idx, slide_width, translation_map, current_slide_boxes)
+    for frame in iter_graphic_frames(shapes, "has_table"):
+        stats['table_cells'] += write_table(frame.table, translation_map)
+    return etree.tostring(sld), stats
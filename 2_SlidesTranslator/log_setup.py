@@ -0,0 +1,159 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# ==========================================
+# 非阻塞的结构化日志
+# - 业务线程只把 LogRecord 放进内存队列（QueueHandler），文件 / 控制台 I/O 和格式化
+#   都在 QueueListener 的后台线程中完成
+# - 文件日志为每行一个 JSON 对象，自动带上当前任务的 job_id；热点循环通过
+#   extra={"slide": ...} 附带幻灯片编号
+# - 热点消息通过 extra={"sample": "<key>"} 标记，每个任务每个 key 只保留前
+#   SAMPLE_FIRST 条，之后每 SAMPLE_EVERY 条保留一条
+# ==========================================
+
+SAMPLE_FIRST = 20
+SAMPLE_EVERY = 100
+
+# 当前任务的 job_id 和采样计数，由 bind_job 在任务开始时设置
+_job_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("job_id", default=None)
+_sample_counts: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar("sample_counts", default=None)
+# 不在任务中时（如命令行直接调用 graph）共用的采样计数
+_global_sample_counts: Dict[str, int] = {}
+
+_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+
+# LogRecord 的标准属性，其余属性视为 extra 字段写入 JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "job_id"}
+
+
+def bind_job(job_id: str) -> None:
+    """在当前上下文中绑定 job_id，并为该任务开启一组新的采样计数"""
+    _job_id.set(job_id)
+    _sample_counts.set({})
+
+
+def current_job_id() -> Optional[str]:
+    return _job_id.get()
+
+
+class ContextFilter(logging.Filter):
+    """在产生日志的线程中注入 job_id（contextvars 只在当前线程 / 协程中可见）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.job_id = _job_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """按任务对带 sample 标记的热点消息采样，WARNING 及以上级别不采样"""
+
+    def __init__(self, first: int = SAMPLE_FIRST, every: int = SAMPLE_EVERY):
+        super().__init__()
+        self.first = first
+        self.every = every
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        counts = _sample_counts.get()
+        if counts is None:
+            counts = _global_sample_counts
+        # 计数只用于采样，并发下偶尔少计一次无关紧要，不加锁
+        seen = counts.get(key, 0)
+        counts[key] = seen + 1
+        return seen < self.first or (seen - self.first) % self.every == 0
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    进程内队列无需序列化：不在业务线程里格式化消息，直接入队原始 record，
+    %-格式化推迟到监听线程（日志参数应为字符串、数字等不可变值）
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "job_id": getattr(record, "job_id", None),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and key not in payload:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """控制台使用的可读格式，带上 job_id"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        job_id = getattr(record, "job_id", None)
+        return f"[{job_id}] {text}" if job_id else text
+
+
+def setup_logging(log_dir: str = "logs", level: int = logging.INFO, console: bool = True) -> None:
+    """
+    配置根 logger：QueueHandler -> QueueListener(JSON 文件 + 控制台)
+    Streamlit 每次交互都会重跑脚本，这里在进程内只配置一次
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.FileHandler(os.path.join(log_dir, "ppt_translator.jsonl"), encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        handlers = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(TextFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                                                       datefmt="%Y-%m-%d %H:%M:%S"))
+            handlers.append(console_handler)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = LazyQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        queue_handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """停止监听线程并写出队列中剩余的日志"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
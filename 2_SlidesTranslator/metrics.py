@@ -0,0 +1,237 @@
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# 翻译任务的指标采集
+# - JobMetrics：单个任务的指标（节点耗时、每次 LLM 调用的延迟 / 重试 / 排队等待 / token 数），
+#   任务结束后导出为 JSON 报告
+# - MetricsRegistry：进程级累计值，按 Prometheus 文本格式导出，可选地通过 HTTP 端点暴露
+# 通过 configurable.metrics 传入 graph，未传入时各节点不做任何采集
+# ==========================================
+
+# Prometheus 直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """最近秩法求分位数，样本为空时返回 0"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(samples),
+        "sum": round(sum(samples), 4),
+        "p50": round(percentile(samples, 50), 4),
+        "p95": round(percentile(samples, 95), 4),
+        "p99": round(percentile(samples, 99), 4),
+        "max": round(max(samples), 4) if samples else 0.0,
+    }
+
+
+def get_metrics(config: Optional[Dict[str, Any]]) -> Optional["JobMetrics"]:
+    """从 RunnableConfig 中取出 JobMetrics，未配置时返回 None"""
+    return (config or {}).get("configurable", {}).get("metrics")
+
+
+# ==========================================
+# 1. 单个任务的指标
+# ==========================================
+class JobMetrics:
+    """
+    单个翻译任务的指标，节点线程和事件循环线程都会写入，内部加锁
+    """
+
+    def __init__(self, job_id: str = "", registry: Optional["MetricsRegistry"] = None):
+        self.job_id = job_id
+        self.registry = registry
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.node_seconds: Dict[str, float] = {}
+        self.call_latencies: List[float] = []
+        self.queue_waits: List[float] = []
+        self.calls = 0
+        self.failed_calls = 0
+        self.retries = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time_node(self, node_name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.node_seconds[node_name] = self.node_seconds.get(node_name, 0.0) + elapsed
+            if self.registry is not None:
+                self.registry.observe("node_seconds", elapsed, node=node_name)
+
+    def record_call(self, latency: float, ok: bool, usage: Optional[Dict[str, Any]] = None) -> None:
+        """记录一次 LLM 调用（每次重试单独计一次），usage 为 AIMessage.usage_metadata"""
+        usage = usage or {}
+        input_tokens = usage.get("input_tokens", 0) or 0
+        output_tokens = usage.get("output_tokens", 0) or 0
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        with self._lock:
+            self.calls += 1
+            self.call_latencies.append(latency)
+            if not ok:
+                self.failed_calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.cached_tokens += cached_tokens
+        if self.registry is not None:
+            self.registry.observe("llm_call_seconds", latency, status="ok" if ok else "error")
+            self.registry.inc("llm_input_tokens_total", input_tokens)
+            self.registry.inc("llm_output_tokens_total", output_tokens)
+            self.registry.inc("llm_cached_tokens_total", cached_tokens)
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+        if self.registry is not None:
+            self.registry.inc("llm_retries_total")
+
+    def record_queue_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.queue_waits.append(seconds)
+        if self.registry is not None:
+            self.registry.observe("queue_wait_seconds", seconds)
+
+    def finish(self, status: str = "done") -> None:
+        self.finished_at = time.time()
+        if self.registry is not None:
+            self.registry.inc("jobs_total", status=status)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "wall_seconds": round((self.finished_at or time.time()) - self.started_at, 4),
+                "node_seconds": {name: round(s, 4) for name, s in self.node_seconds.items()},
+                "llm_calls": {
+                    "total": self.calls,
+                    "failed": self.failed_calls,
+                    "retries": self.retries,
+                    "latency_seconds": summarize(self.call_latencies),
+                },
+                "queue_wait_seconds": summarize(self.queue_waits),
+                "tokens": {
+                    "input": self.input_tokens,
+                    "output": self.output_tokens,
+                    "cached": self.cached_tokens,
+                },
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+
+# ==========================================
+# 2. 进程级累计值（Prometheus 文本格式）
+# ==========================================
+class MetricsRegistry:
+    """所有任务共享的累计计数器和直方图，前缀 ppt_translator_"""
+
+    PREFIX = "ppt_translator_"
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # (指标名, 标签) -> 计数
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        # (指标名, 标签) -> [各桶计数..., +Inf 计数, 总和]
+        self._histograms: Dict[Tuple[str, Tuple], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.setdefault(key, [0] * (len(self.buckets) + 2))
+            for idx, upper in enumerate(self.buckets):
+                if value <= upper:
+                    hist[idx] += 1
+            hist[-2] += 1
+            hist[-1] += value
+
+    @staticmethod
+    def _labels(labels: Tuple, extra: Tuple = ()) -> str:
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(hist) for key, hist in self._histograms.items()}
+
+        seen = set()
+        for (name, labels), value in sorted(counters.items()):
+            full_name = self.PREFIX + name
+            if full_name not in seen:
+                lines.append(f"# TYPE {full_name} counter")
+                seen.add(full_name)
+            lines.append(f"{full_name}{self._labels(labels)} {value}")
+
+        for (name, labels), hist in sorted(histograms.items()):
+            full_name = self.PREFIX + name
+            if full_name not in seen:
+                lines.append(f"# TYPE {full_name} histogram")
+                seen.add(full_name)
+            for upper, count in zip(self.buckets, hist):
+                lines.append(f"{full_name}_bucket{self._labels(labels, (('le', upper),))} {count}")
+            lines.append(f"{full_name}_bucket{self._labels(labels, (('le', '+Inf'),))} {hist[-2]}")
+            lines.append(f"{full_name}_count{self._labels(labels)} {hist[-2]}")
+            lines.append(f"{full_name}_sum{self._labels(labels)} {round(hist[-1], 6)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def start_metrics_server(port: int, registry: MetricsRegistry = REGISTRY, host: str = "0.0.0.0"):
+    """在后台线程中启动 Prometheus 文本端点（GET /metrics），返回 HTTPServer 实例"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("📈 Prometheus 指标端点: http://%s:%d/metrics", host, server.server_address[1])
+    return server
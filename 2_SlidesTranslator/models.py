@@ -1,8 +1,6 @@
 import os
 import streamlit as st
-from dotenv import load_dotenv, find_dotenv  # 新增：导入dotenv相关函数
-from langchain.chat_models import init_chat_model
-from langchain_core.exceptions import LangChainException
+from resources import load_env_once, get_chat_model, get_router, get_cascade, get_phrase_backend
 
 # ====================== 1. 加载.env文件 ======================
 def load_env_file():
@@ -11,11 +9,10 @@ def load_env_file():
     优先级：系统环境变量 > .env文件变量（load_dotenv默认不覆盖已存在的环境变量）
     """
     try:
-        # find_dotenv()：自动查找当前目录/上级目录的.env文件，返回文件路径
-        env_file_path = find_dotenv()
+        # 自动查找当前目录/上级目录的.env文件并加载（进程内只执行一次），返回文件路径
+        # override=False（默认）：不覆盖已有的系统环境变量
+        env_file_path = load_env_once()
         if env_file_path:
-            # 加载.env文件，override=False（默认）：不覆盖已有的系统环境变量
-            load_dotenv(dotenv_path=env_file_path, override=False)
             st.success(f"✅ 成功加载.env文件：{env_file_path}")
         else:
             st.info("ℹ️ 未找到.env文件，将优先读取系统环境变量或手动输入API Key")
@@ -48,24 +45,11 @@ MODEL_PROVIDERS = {
 }
 
 # ====================== 3. Streamlit交互界面 ======================
-def get_model_credentials():
+def get_provider_credentials(selected_provider_name, key_prefix=""):
     """
-    渲染模型供应商选择和API Key输入界面，返回选中的供应商配置和API Key
-    优先级：系统环境变量 > .env文件变量 > 手动输入
+    渲染单个供应商的 API Key 与模型名输入框，返回 (provider, model_name, api_key)
+    key_prefix 用于同一页面渲染多个供应商时区分 Streamlit 组件
     """
-    # 先加载.env文件（全局执行）
-    load_env_file()
-
-    st.subheader("🔑 大模型配置")
-    
-    # 步骤1：下拉选择模型供应商
-    selected_provider_name = st.selectbox(
-        label="选择模型供应商",
-        options=list(MODEL_PROVIDERS.keys()),
-        index=0,
-        help="支持OpenAI、Grok、DeepSeek、Anthropic等供应商"
-    )
-    
     # 步骤2：获取该供应商的配置
     provider_config = MODEL_PROVIDERS[selected_provider_name]
     
@@ -75,6 +59,7 @@ def get_model_credentials():
         api_key = st.text_input(
             label=f"{selected_provider_name} API Key",
             type="password",
+            key=f"{key_prefix}api_key_{selected_provider_name}",
             help=f"请输入{selected_provider_name}的API Key（可提前在.env文件中配置{provider_config['api_key_env']}）"
         )
         # 输入后设置环境变量
@@ -85,6 +70,7 @@ def get_model_credentials():
     model_name = st.text_input(
         label="模型名称",
         value=provider_config["default_model"],
+        key=f"{key_prefix}model_{selected_provider_name}",
         help=f"{selected_provider_name}默认模型：{provider_config['default_model']}"
     )
     
@@ -95,6 +81,26 @@ def get_model_credentials():
     
     return provider_config["provider"], model_name, api_key
 
+def get_model_credentials():
+    """
+    渲染模型供应商选择和API Key输入界面，返回选中的供应商配置和API Key
+    优先级：系统环境变量 > .env文件变量 > 手动输入
+    """
+    # 先加载.env文件（全局执行）
+    load_env_file()
+
+    st.subheader("🔑 大模型配置")
+    
+    # 步骤1：下拉选择模型供应商
+    selected_provider_name = st.selectbox(
+        label="选择模型供应商",
+        options=list(MODEL_PROVIDERS.keys()),
+        index=0,
+        help="支持OpenAI、Grok、DeepSeek、Anthropic等供应商"
+    )
+    
+    return get_provider_credentials(selected_provider_name)
+
 # ====================== 4. 初始化大模型函数 ======================
 def init_llm_model(temperature=0.3):
     """初始化大模型实例，返回llm对象"""
@@ -103,13 +109,11 @@ def init_llm_model(temperature=0.3):
     if not all([model_provider, model_name, api_key]):
         return None
     
+    from langchain_core.exceptions import LangChainException
+
     try:
-        llm = init_chat_model(
-            model_provider=model_provider,
-            model=model_name,
-            temperature=temperature,
-            api_key=api_key
-        )
+        # 同一配置的模型实例在进程内复用，页面刷新不会重新创建
+        llm = get_chat_model(model_provider, model_name, api_key, temperature)
         st.success(f"✅ {model_provider} 模型初始化成功！")
         return llm
     
@@ -120,7 +124,100 @@ def init_llm_model(temperature=0.3):
         st.error(f"❌ 未知错误：{str(e)}")
         return None
 
-# ====================== 5. 主流程调用 ======================
+# ====================== 5. 初始化多供应商路由 ======================
+def init_llm_router(temperature=0.3):
+    """
+    渲染多供应商选择界面，为每个已配置的供应商初始化 llm，
+    返回按延迟与错误率自动分流、故障切换的 ProviderRouter
+    """
+    load_env_file()
+
+    st.subheader("🔀 多供应商路由")
+    selected_provider_names = st.multiselect(
+        label="参与路由的模型供应商",
+        options=list(MODEL_PROVIDERS.keys()),
+        default=list(MODEL_PROVIDERS.keys())[:1],
+        help="翻译请求会按权重和实时延迟分配到各供应商，故障时自动切换"
+    )
+
+    entries = []
+    for provider_name in selected_provider_names:
+        with st.expander(provider_name, expanded=False):
+            model_provider, model_name, api_key = get_provider_credentials(provider_name, key_prefix="router_")
+            weight = st.slider("流量权重", min_value=0.1, max_value=5.0, value=1.0, step=0.1,
+                               key=f"router_weight_{provider_name}")
+        if all([model_provider, model_name, api_key]):
+            entries.append((provider_name, model_provider, model_name, api_key, weight))
+
+    if not entries:
+        st.warning("请至少配置一个可用的模型供应商！")
+        return None
+
+    try:
+        # 同一配置复用同一个路由器，各供应商的健康统计在页面刷新之间保留
+        router = get_router(tuple(entries), temperature)
+    except Exception as e:
+        st.error(f"❌ 路由初始化失败：{str(e)}")
+        return None
+
+    st.success(f"✅ 已启用 {len(entries)} 个供应商：{'、'.join(name for name, *_ in entries)}")
+    return router
+
+# ====================== 6. 初始化大小模型级联 ======================
+def init_llm_cascade(temperature=0.3):
+    """
+    分别配置小模型（短文本、标签）和大模型（长段落、表格），
+    返回按文本长度和复杂度分流、小模型译文未通过本地校验时自动升级的 ModelCascade
+    """
+    load_env_file()
+
+    st.subheader("🪜 大小模型级联")
+    tiers = {}
+    for tier, label, default_index in (("small", "小模型（短文本）", 2), ("large", "大模型（长文本 / 表格）", 0)):
+        with st.expander(label, expanded=False):
+            provider_name = st.selectbox(
+                label="模型供应商",
+                options=list(MODEL_PROVIDERS.keys()),
+                index=default_index,
+                key=f"cascade_provider_{tier}"
+            )
+            tiers[tier] = get_provider_credentials(provider_name, key_prefix=f"cascade_{tier}_")
+
+    short_max_chars = st.slider("小模型处理的最大长度（字符，中日韩文字计 2）", min_value=10, max_value=300,
+                                value=80, step=10)
+    escalate = st.checkbox("小模型译文未通过校验时升级到大模型", value=True,
+                           help="本地校验：译文为空、数字被改动、文字类型与目标语言不符")
+
+    if not all(all(credentials) for credentials in tiers.values()):
+        st.warning("请完成小模型和大模型的配置！")
+        return None
+
+    try:
+        cascade = get_cascade(tiers["small"], tiers["large"], temperature, short_max_chars, escalate)
+    except Exception as e:
+        st.error(f"❌ 级联初始化失败：{str(e)}")
+        return None
+
+    st.success(f"✅ 小模型 {tiers['small'][1]}，大模型 {tiers['large'][1]}")
+    return cascade
+
+# ====================== 7. 初始化离线翻译后端 ======================
+def init_phrase_backend(temperature=0.3):
+    """
+    本地短语表后端：不调用任何模型、不需要网络，适合内网环境或快速预览
+    temperature 参数仅为与其他初始化函数保持一致，不使用
+    """
+    st.subheader("📖 离线短语表")
+    try:
+        backend = get_phrase_backend()
+    except (OSError, ValueError) as e:
+        st.error(f"❌ 短语表加载失败：{str(e)}")
+        return None
+    st.success(f"✅ 已加载短语表，支持：{'、'.join(backend.tables)}")
+    st.caption("仅替换短语表中收录的词条，未收录的文本保留原文")
+    return backend
+
+# ====================== 8. 主流程调用 ======================
 if __name__ == "__main__":
     st.title("大模型供应商配置与初始化")
     
@@ -0,0 +1,281 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv, find_dotenv
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# 进程级资源层
+# Streamlit 每次交互都会重跑整个脚本，这里的对象在进程内只创建一次：
+# - .env 只查找和加载一次
+# - chat model 按 (供应商, 模型, key 指纹, 温度) 复用，保留 HTTP keep-alive 连接
+# - 多供应商路由器、大小模型级联按配置复用，统计数据在页面刷新之间保留
+# - 离线短语表只读取一次
+# - 翻译提示词模板只从磁盘读取、编译一次
+# - 编译后的 LangGraph 和带兜底的后端按 llm 复用，只保留最近使用的 LLM_CACHE_SIZE 个，不会随模型实例增多而泄漏
+# - 所有异步翻译都跑在同一个常驻事件循环上，异步连接池不会因事件循环关闭而失效
+# - 多进程重构使用的进程池按进程数复用，子进程只启动一次
+# langchain / httpx 等重量级依赖只在第一次真正创建模型时才导入
+# ==========================================
+
+# OpenAI 兼容接口的供应商（均基于 openai SDK，可以注入共享的 httpx 连接池）
+OPENAI_COMPATIBLE_PROVIDERS = {"openai", "xai", "deepseek"}
+
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+PROMPT_FILES = {"text": "translation_instruction.txt", "table": "table_translation_instruction.txt"}
+
+HTTP_MAX_CONNECTIONS = 50
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 60.0
+HTTP_TIMEOUT = 60.0
+HTTP_CONNECT_TIMEOUT = 10.0
+
+# 按 llm 实例缓存的对象（编译图、带兜底的后端）最多保留的个数
+LLM_CACHE_SIZE = 8
+
+_lock = threading.Lock()
+_env_file_path: Optional[str] = None
+_env_loaded = False
+_llm_cache: Dict[Tuple, Any] = {}
+_router_cache: Dict[Tuple, Any] = {}
+_cascade_cache: Dict[Tuple, Any] = {}
+_backend_cache: Dict[Tuple, Any] = {}
+_chat_backend_cache: "OrderedDict[Tuple, Tuple[Any, Any]]" = OrderedDict()
+_prompt_cache: Dict[str, Any] = {}
+_graph_cache: "OrderedDict[int, Tuple[Any, Any]]" = OrderedDict()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_process_pools: Dict[int, Any] = {}
+
+
+def load_env_once() -> Optional[str]:
+    """查找并加载 .env 文件（进程内只执行一次），返回 .env 路径，未找到时返回 None"""
+    global _env_file_path, _env_loaded
+    with _lock:
+        if not _env_loaded:
+            _env_file_path = find_dotenv() or None
+            if _env_file_path:
+                load_dotenv(dotenv_path=_env_file_path, override=False)
+            _env_loaded = True
+        return _env_file_path
+
+
+def _lru_get(cache: OrderedDict, key, llm):
+    """按 llm 取缓存（调用方持有 _lock）；同时校验保存的 llm 引用，保证 id 被新对象复用时不会误命中"""
+    cached = cache.get(key)
+    if cached is None or cached[0] is not llm:
+        return None
+    cache.move_to_end(key)
+    return cached[1]
+
+
+def _lru_put(cache: OrderedDict, key, llm, value) -> None:
+    """写入缓存（调用方持有 _lock），超过 LLM_CACHE_SIZE 时淘汰最久未使用的条目"""
+    cache[key] = (llm, value)
+    cache.move_to_end(key)
+    while len(cache) > LLM_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def key_fingerprint(api_key: str) -> str:
+    """API Key 的指纹，用作缓存键，避免明文 key 出现在缓存或日志里"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def get_chat_model(model_provider: str, model_name: str, api_key: str, temperature: float = 0.3, **kwargs):
+    """按 (供应商, 模型, key 指纹, 温度, 其他参数) 复用 chat model 实例"""
+    cache_key = (model_provider, model_name, key_fingerprint(api_key), temperature, tuple(sorted(kwargs.items())))
+    with _lock:
+        llm = _llm_cache.get(cache_key)
+        if llm is not None:
+            return llm
+
+        from langchain.chat_models import init_chat_model
+
+        if model_provider in OPENAI_COMPATIBLE_PROVIDERS:
+            import httpx
+
+            # 每个客户端持有自己的连接池，跨请求、跨任务复用 keep-alive 连接
+            limits = httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            )
+            timeout = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+            kwargs.setdefault("http_client", httpx.Client(limits=limits, timeout=timeout))
+            kwargs.setdefault("http_async_client", httpx.AsyncClient(limits=limits, timeout=timeout))
+
+        llm = init_chat_model(
+            model_provider=model_provider,
+            model=model_name,
+            temperature=temperature,
+            api_key=api_key,
+            **kwargs
+        )
+        _llm_cache[cache_key] = llm
+        logger.info("🆕 创建 chat model: %s/%s", model_provider, model_name)
+        return llm
+
+
+def get_router(entries: Tuple[Tuple[str, str, str, str, float], ...], temperature: float = 0.3):
+    """
+    按配置复用 ProviderRouter，使各供应商的延迟、错误率和熔断状态在页面刷新之间保留
+    entries: ((显示名, 供应商, 模型, api_key, 权重), ...)
+    """
+    cache_key = tuple(
+        (name, provider, model, key_fingerprint(api_key), weight)
+        for name, provider, model, api_key, weight in entries
+    ) + (temperature,)
+    clients = {
+        name: get_chat_model(provider, model, api_key, temperature)
+        for name, provider, model, api_key, _ in entries
+    }
+    from router import ProviderRouter
+
+    with _lock:
+        router = _router_cache.get(cache_key)
+        if router is None:
+            router = ProviderRouter(clients, weights={name: weight for name, _, _, _, weight in entries})
+            _router_cache[cache_key] = router
+        return router
+
+
+def get_cascade(small: Tuple[str, str, str], large: Tuple[str, str, str], temperature: float = 0.3,
+                short_max_chars: int = 80, escalate: bool = True):
+    """
+    按配置复用 ModelCascade，使各层级的调用和升级统计在页面刷新之间保留
+    small / large: (供应商, 模型, api_key)
+    """
+    cache_key = tuple(
+        (provider, model, key_fingerprint(api_key)) for provider, model, api_key in (small, large)
+    ) + (temperature, short_max_chars, escalate)
+    small_llm = get_chat_model(*small, temperature)
+    large_llm = get_chat_model(*large, temperature)
+    from cascade import ModelCascade
+
+    with _lock:
+        cascade = _cascade_cache.get(cache_key)
+        if cascade is None:
+            cascade = ModelCascade(small_llm, large_llm, short_max_chars=short_max_chars, escalate=escalate)
+            _cascade_cache[cache_key] = cascade
+        return cascade
+
+
+def get_translation_prompt(kind: str = "text"):
+    """
+    按类型（text / table）复用翻译提示词模板
+    system 消息是不含任何变量的静态指令，所有请求的前缀逐字节一致，可以命中供应商的提示词缓存；
+    目标语言和待翻译文本等可变部分放在其后的 user 消息中，待翻译文本始终是最后一条消息
+    """
+    with _lock:
+        prompt = _prompt_cache.get(kind)
+        if prompt is not None:
+            return prompt
+
+    from langchain_core.messages import SystemMessage
+    from langchain_core.prompts import ChatPromptTemplate
+    from utils import load_prompt
+
+    instruction = load_prompt(os.path.join(PROMPT_DIR, PROMPT_FILES[kind]))
+    prompt = ChatPromptTemplate.from_messages([
+        # 直接使用消息对象而不是模板字符串，指令中的花括号不会被当作变量
+        SystemMessage(content=instruction),
+        ("user", "Target language: {target_language}"),
+        ("user", "{text}"),
+    ])
+    with _lock:
+        return _prompt_cache.setdefault(kind, prompt)
+
+
+def get_phrase_backend(path: Optional[str] = None):
+    """按短语表路径复用离线翻译后端，短语表只读取一次"""
+    from backends import DEFAULT_PHRASE_TABLE, PhraseTableBackend
+
+    path = path or DEFAULT_PHRASE_TABLE
+    with _lock:
+        backend = _backend_cache.get(("phrase", path))
+        if backend is None:
+            backend = PhraseTableBackend.from_file(path)
+            _backend_cache[("phrase", path)] = backend
+        return backend
+
+
+def get_chat_backend(llm, fallback_path: Optional[str] = None):
+    """按 llm 复用带离线兜底的 ChatModelBackend，保证同一配置的编译图也能复用"""
+    from backends import ChatModelBackend
+
+    fallback = get_phrase_backend(fallback_path)
+    cache_key = ("chat", id(llm), fallback_path)
+    with _lock:
+        cached = _lru_get(_chat_backend_cache, cache_key, llm)
+        if cached is not None:
+            return cached
+
+    # ChatModelBackend 构造时会通过 get_translation_prompt 再次获取 _lock，必须在锁外创建
+    backend = ChatModelBackend(llm, fallback=fallback)
+    with _lock:
+        # 其他线程已抢先创建时使用已缓存的实例
+        cached = _lru_get(_chat_backend_cache, cache_key, llm)
+        if cached is not None:
+            return cached
+        _lru_put(_chat_backend_cache, cache_key, llm, backend)
+        return backend
+
+
+def get_compiled_graph(llm):
+    """按 llm 复用编译后的 LangGraph"""
+    # 在函数内导入，避免 graph -> resources -> graph 的循环导入
+    from graph import create_graph
+
+    with _lock:
+        app = _lru_get(_graph_cache, id(llm), llm)
+        if app is None:
+            app = create_graph(llm)
+            _lru_put(_graph_cache, id(llm), llm, app)
+        return app
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """返回在后台线程中常驻运行的事件循环"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+        return _loop
+
+
+async def _run_in_context(coro, context: contextvars.Context):
+    return await asyncio.get_running_loop().create_task(coro, context=context)
+
+
+def run_coroutine(coro):
+    """
+    在常驻事件循环上执行协程，阻塞等待结果（供同步的 LangGraph 节点调用）
+    协程在调用方的 contextvars 上下文中运行，日志中的 job_id 等上下文得以保留
+    """
+    context = contextvars.copy_context()
+    return asyncio.run_coroutine_threadsafe(_run_in_context(coro, context), get_event_loop()).result()
+
+
+def get_process_pool(max_workers: int):
+    """
+    按进程数复用重构用的进程池
+    使用 spawn 启动子进程：主进程中已有事件循环、日志等后台线程，fork 不安全
+    """
+    with _lock:
+        pool = _process_pools.get(max_workers)
+        if pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _process_pools[max_workers] = pool
+            logger.info("🆕 创建重构进程池: %d 个进程", max_workers)
+        return pool
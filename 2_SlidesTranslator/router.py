@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================
+# 1. 单个供应商的健康状态
+# ==========================================
+class ProviderHealth:
+    """
+    记录单个供应商最近 window 次调用的延迟与成败，并维护熔断器状态
+
+    熔断器三种状态：
+    - closed：正常接收流量
+    - open：熔断中，cooldown 秒内不再分配流量
+    - half_open：冷却结束，只放行一个探测请求，成功则恢复，失败则重新熔断
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, weight: float = 1.0, window: int = 50):
+        self.name = name
+        self.weight = weight
+        self.samples = deque(maxlen=window)  # (latency_seconds, ok)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """成功调用的延迟中位数（秒），无样本时返回 None"""
+        latencies = sorted(lat for lat, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[len(latencies) // 2]
+
+    def to_dict(self) -> Dict:
+        latency = self.latency
+        return {
+            "provider": self.name,
+            "state": self.state,
+            "weight": self.weight,
+            "calls": len(self.samples),
+            "error_rate": round(self.error_rate, 3),
+            "p50_latency": round(latency, 3) if latency is not None else None,
+        }
+
+
+# ==========================================
+# 2. 多供应商路由器
+# ==========================================
+class ProviderRouter(Runnable):
+    """
+    持有多个供应商的 chat model，按"权重 / 延迟 × 成功率"加权随机分配流量，
+    调用失败时自动切换到下一个健康的供应商，并对不健康的供应商熔断
+
+    本身是一个 Runnable，可以直接替代单个 llm 使用：`prompt | router`
+    """
+
+    def __init__(
+        self,
+        clients: Dict[str, Any],
+        weights: Optional[Dict[str, float]] = None,
+        window: int = 50,
+        min_samples: int = 5,
+        error_threshold: float = 0.5,
+        max_consecutive_failures: int = 3,
+        cooldown: float = 30.0,
+    ):
+        if not clients:
+            raise ValueError("ProviderRouter 至少需要一个供应商")
+        weights = weights or {}
+        self.clients = dict(clients)
+        self.health = {
+            name: ProviderHealth(name, weight=weights.get(name, 1.0), window=window)
+            for name in self.clients
+        }
+        self.min_samples = min_samples
+        self.error_threshold = error_threshold
+        self.max_consecutive_failures = max_consecutive_failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    # ---------- 选择与记录 ----------
+    def _is_available(self, health: ProviderHealth, now: float) -> bool:
+        if health.state == ProviderHealth.CLOSED:
+            return True
+        if health.state == ProviderHealth.OPEN and now - health.opened_at >= self.cooldown:
+            health.state = ProviderHealth.HALF_OPEN
+            health.probe_in_flight = False
+        # 半开状态只放行一个探测请求
+        return health.state == ProviderHealth.HALF_OPEN and not health.probe_in_flight
+
+    def _score(self, health: ProviderHealth) -> float:
+        latency = health.latency or 1.0
+        return health.weight / max(latency, 0.05) * max(1.0 - health.error_rate, 0.05)
+
+    def _pick(self, exclude: set) -> Optional[str]:
+        """按得分加权随机挑选一个可用供应商；全部熔断时返回 None"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                h for name, h in self.health.items()
+                if name not in exclude and self._is_available(h, now)
+            ]
+            if not candidates:
+                return None
+            scores = [self._score(h) for h in candidates]
+            chosen = random.choices(candidates, weights=scores, k=1)[0]
+            if chosen.state == ProviderHealth.HALF_OPEN:
+                chosen.probe_in_flight = True
+            return chosen.name
+
+    def _record(self, name: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            health = self.health[name]
+            health.samples.append((latency, ok))
+            if ok:
+                health.consecutive_failures = 0
+                if health.state != ProviderHealth.CLOSED:
+                    logger.info("🟢 供应商 %s 探测成功，熔断器关闭", name)
+                    health.samples.clear()
+                    health.samples.append((latency, ok))
+                health.state = ProviderHealth.CLOSED
+                return
+
+            health.consecutive_failures += 1
+            tripped = (
+                health.state == ProviderHealth.HALF_OPEN
+                or health.consecutive_failures >= self.max_consecutive_failures
+                or (len(health.samples) >= self.min_samples and health.error_rate >= self.error_threshold)
+            )
+            if tripped and health.state != ProviderHealth.OPEN:
+                health.state = ProviderHealth.OPEN
+                health.opened_at = time.monotonic()
+                logger.warning(
+                    "🔴 供应商 %s 熔断 %.0f 秒 (错误率=%.0f%%, 连续失败=%d)",
+                    name, self.cooldown, health.error_rate * 100, health.consecutive_failures,
+                )
+            health.probe_in_flight = False
+
+    def snapshot(self) -> List[Dict]:
+        """返回各供应商当前的健康状况，便于在界面或日志中展示"""
+        with self._lock:
+            return [h.to_dict() for h in self.health.values()]
+
+    # ---------- Runnable 接口 ----------
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        tried = set()
+        last_error = None
+        while True:
+            name = self._pick(tried)
+            if name is None:
+                break
+            tried.add(name)
+            start = time.monotonic()
+            try:
+                result = self.clients[name].invoke(input, config, **kwargs)
+            except Exception as e:
+                self._record(name, time.monotonic() - start, ok=False)
+                logger.warning("⚠️  供应商 %s 调用失败，尝试切换: %s", name, e)
+                last_error = e
+                continue
+            self._record(name, time.monotonic() - start, ok=True)
+            return result
+        raise last_error or RuntimeError("所有供应商均处于熔断状态")
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        tried = set()
+        last_error = None
+        while True:
+            name = self._pick(tried)
+            if name is None:
+                break
+            tried.add(name)
+            start = time.monotonic()
+            try:
+                result = await self.clients[name].ainvoke(input, config, **kwargs)
+            except asyncio.CancelledError:
+                # 取消不是供应商的错误，释放探测名额后直接向上抛出
+                with self._lock:
+                    self.health[name].probe_in_flight = False
+                raise
+            except Exception as e:
+                self._record(name, time.monotonic() - start, ok=False)
+                logger.warning("⚠️  供应商 %s 调用失败，尝试切换: %s", name, e)
+                last_error = e
+                continue
+            self._record(name, time.monotonic() - start, ok=True)
+            return result
+        raise last_error or RuntimeError("所有供应商均处于熔断状态")
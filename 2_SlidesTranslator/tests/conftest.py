@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 项目模块（router、cascade、backends 等）位于上一级目录，以扁平方式导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
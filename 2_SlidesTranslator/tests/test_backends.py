@@ -0,0 +1,65 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from backends import DEFAULT_PHRASE_TABLE, PhraseTableBackend
+
+TABLES = {
+    "Chinese": {"quarterly report": "季度报告", "report": "报告", "plan": "计划", "Q3": "第三季度"},
+    "English": {"季度报告": "Quarterly Report", "计划": "plan", "完成": "completed"},
+}
+
+
+@pytest.fixture
+def backend():
+    return PhraseTableBackend(TABLES)
+
+
+@pytest.mark.parametrize("text, target, expected", [
+    # 最长匹配优先，忽略大小写
+    ("Quarterly Report", "Chinese", "季度报告"),
+    ("REPORT", "Chinese", "报告"),
+    # 中文目标语言去掉词与词之间的空格，未命中的部分保留原文
+    ("Q3 report", "Chinese", "第三季度报告"),
+    ("The plan", "Chinese", "The 计划"),
+    # 拉丁文字目标语言补空格，标点前不留空格
+    ("季度报告已完成。", "English", "Quarterly Report 已 completed。"),
+    ("计划,季度报告", "English", "plan, Quarterly Report"),
+])
+def test_translate_text(backend, text, target, expected):
+    assert backend.translate_text(text, target) == expected
+
+
+def test_latin_entries_match_whole_words_only(backend):
+    assert backend.translate_text("planet", "Chinese") is None
+    assert backend.translate_text("plans", "Chinese") is None
+    assert backend.translate_text("plan!", "Chinese") == "计划!"
+
+
+def test_unmatched_text(backend):
+    # 没有词条命中且含字母时视为未翻译
+    assert backend.translate_text("zzz", "Chinese") is None
+    # 纯数字、符号无需翻译，原样返回
+    assert backend.translate_text("42 %", "Chinese") == "42 %"
+    # 没有该目标语言的短语表
+    assert backend.translate_text("report", "Korean") is None
+
+
+def test_translate_batch_table_mode(backend):
+    payload = json.dumps([["report", "42"], ["zzz", ""]])
+    result = asyncio.run(backend.translate_batch([payload], "Chinese", kind="table"))
+    assert json.loads(result.translations[0]) == [["报告", "42"], [None, ""]]
+
+
+def test_translate_batch_keeps_order(backend):
+    result = asyncio.run(backend.translate_batch(["plan", "zzz", "report"], "Chinese"))
+    assert result.translations == ["计划", None, "报告"]
+
+
+def test_default_table_does_not_depend_on_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isabs(DEFAULT_PHRASE_TABLE)
+    backend = PhraseTableBackend.from_file()
+    assert backend.translate_text("Agenda", "Chinese") == "议程"
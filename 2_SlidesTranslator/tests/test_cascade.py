@@ -0,0 +1,99 @@
+import pytest
+
+from cascade import ModelCascade, validate_translation
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeModel:
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.inputs = []
+
+    def invoke(self, input, config=None, **kwargs):
+        self.inputs.append(input)
+        if self.error:
+            raise self.error
+        return Reply(self.reply)
+
+
+CHINESE = {"configurable": {"target_language": "Chinese"}}
+
+
+# ---------- validate_translation ----------
+@pytest.mark.parametrize("source, output, target, reason", [
+    ("Quarterly report", "季度报告", "Chinese", None),
+    ("Quarterly report", "   ", "Chinese", "empty"),
+    ("Revenue grew 12% in 2023", "2023 年收入增长 12%", "Chinese", None),
+    ("Revenue grew 12% in 2023", "2024 年收入增长 12%", "Chinese", "numerals"),
+    ("1,200 units", "1200 件", "Chinese", None),
+    # 出现数量级单位时允许数字换算
+    ("100-200万用户", "1-2 million users", "English", None),
+    ("The plan is ready now", "The plan is ready now", "Chinese", "script"),
+    # 少于 3 个单词的拉丁文字（如品牌名）可以原样保留
+    ("LangGraph", "LangGraph", "Chinese", None),
+    ("季度报告已经完成", "季度报告已经完成", "English", "script"),
+    ("季度报告", "Quarterly report", "English", None),
+    ("The plan is ready now", "計画は準備できました", "Japanese", None),
+    ("The plan is ready now", "계획이 준비되었습니다", "Korean", None),
+])
+def test_validate_translation(source, output, target, reason):
+    assert validate_translation(source, output, target) == reason
+
+
+def test_validate_translation_without_target_only_checks_content():
+    assert validate_translation("The plan is ready now", "The plan is ready now") is None
+    assert validate_translation("Page 3", "第 4 页") == "numerals"
+
+
+# ---------- route ----------
+def test_route():
+    cascade = ModelCascade(FakeModel(), FakeModel(), short_max_chars=20, max_sentences=1)
+    assert cascade.route("Quarterly report") == "small"
+    # 末尾的句号不算作多句
+    assert cascade.route("Sales grew.") == "small"
+    assert cascade.route("Sales grew. Costs fell.") == "large"
+    assert cascade.route("A" * 21) == "large"
+    # CJK 按 2 个字符计算长度
+    assert cascade.route("季" * 10) == "small"
+    assert cascade.route("季" * 11) == "large"
+    assert cascade.route("line one\nline two") == "large"
+    # 表格批量请求总是交给大模型
+    assert cascade.route('[["a"]]') == "large"
+
+
+# ---------- invoke ----------
+def test_short_text_stays_on_small_model():
+    small, large = FakeModel("季度报告"), FakeModel("大模型")
+    cascade = ModelCascade(small, large)
+    assert cascade.invoke("Quarterly report", CHINESE).content == "季度报告"
+    assert len(small.inputs) == 1 and not large.inputs
+
+
+def test_failed_validation_escalates():
+    small, large = FakeModel("Quarterly sales report"), FakeModel("季度销售报告")
+    cascade = ModelCascade(small, large)
+    assert cascade.invoke("Quarterly sales report", CHINESE).content == "季度销售报告"
+    assert cascade.escalations == {"script": 1}
+    rows = cascade.snapshot()
+    assert rows[0]["calls"] == 1 and rows[0]["escalations"] == 1
+    assert rows[1]["calls"] == 1
+
+
+def test_small_model_error_escalates():
+    cascade = ModelCascade(FakeModel(error=TimeoutError()), FakeModel("季度报告"))
+    assert cascade.invoke("Quarterly report", CHINESE).content == "季度报告"
+    assert cascade.escalations == {"error: TimeoutError": 1}
+    assert cascade.stats["small"].errors == 1
+
+
+def test_no_escalation_when_disabled():
+    cascade = ModelCascade(FakeModel("Quarterly report for Q3"), FakeModel("大模型"), escalate=False)
+    assert cascade.invoke("Quarterly report for Q3", CHINESE).content == "Quarterly report for Q3"
+    cascade = ModelCascade(FakeModel(error=TimeoutError()), FakeModel("大模型"), escalate=False)
+    with pytest.raises(TimeoutError):
+        cascade.invoke("Quarterly report", CHINESE)
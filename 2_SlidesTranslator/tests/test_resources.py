@@ -0,0 +1,41 @@
+import os
+import sys
+import threading
+
+import resources
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fake_llm import FakeChatModel  # noqa: E402
+
+
+def call_with_timeout(func, *args, timeout: float = 10.0):
+    """在后台线程中调用，超时视为死锁"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", func(*args)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), f"{func.__name__} 未在 {timeout} 秒内返回（死锁）"
+    return result["value"]
+
+
+def test_get_chat_backend_does_not_deadlock():
+    llm = FakeChatModel()
+    backend = call_with_timeout(resources.get_chat_backend, llm)
+    assert backend.llm is llm
+    assert backend.fallback is resources.get_phrase_backend()
+    # 同一个 llm 复用同一个后端，其他缓存也仍然可用
+    assert call_with_timeout(resources.get_chat_backend, llm) is backend
+    assert call_with_timeout(resources.get_translation_prompt, "table") is not None
+
+
+def test_per_llm_caches_are_bounded():
+    llms = [FakeChatModel() for _ in range(resources.LLM_CACHE_SIZE + 3)]
+    backends = [resources.get_chat_backend(llm) for llm in llms]
+    graphs = [resources.get_compiled_graph(backend) for backend in backends]
+    assert len(resources._chat_backend_cache) == resources.LLM_CACHE_SIZE
+    assert len(resources._graph_cache) == resources.LLM_CACHE_SIZE
+    # 最近使用的条目仍然复用，最早的已被淘汰
+    assert resources.get_chat_backend(llms[-1]) is backends[-1]
+    assert resources.get_compiled_graph(backends[-1]) is graphs[-1]
+    assert all(cached[0] is not llms[0] for cached in resources._chat_backend_cache.values())
+    assert all(cached[0] is not backends[0] for cached in resources._graph_cache.values())
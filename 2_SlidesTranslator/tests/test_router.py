@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from router import ProviderHealth, ProviderRouter
+
+
+class FakeClient:
+    """按预设结果依次返回或抛出异常的假 chat model"""
+
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.calls = 0
+
+    def invoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return f"{self.name}: {input}"
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return self.invoke(input, config, **kwargs)
+
+
+def make_router(*clients, **kwargs):
+    kwargs.setdefault("cooldown", 30.0)
+    return ProviderRouter({client.name: client for client in clients}, **kwargs)
+
+
+def expire_cooldown(router, name):
+    router.health[name].opened_at -= router.cooldown
+
+
+def test_requires_a_provider():
+    with pytest.raises(ValueError):
+        ProviderRouter({})
+
+
+def test_opens_after_consecutive_failures():
+    bad = FakeClient("bad", fail=True)
+    router = make_router(bad, max_consecutive_failures=3)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="bad down"):
+            router.invoke("hi")
+        assert router.health["bad"].state == ProviderHealth.CLOSED
+    with pytest.raises(RuntimeError, match="bad down"):
+        router.invoke("hi")
+    assert router.health["bad"].state == ProviderHealth.OPEN
+
+    # 熔断期间不再分配流量
+    with pytest.raises(RuntimeError, match="熔断"):
+        router.invoke("hi")
+    assert bad.calls == 3
+
+
+def test_opens_on_error_rate():
+    flaky = FakeClient("flaky")
+    router = make_router(flaky, min_samples=4, error_threshold=0.5, max_consecutive_failures=10)
+    for fail in (False, True, False, True):
+        flaky.fail = fail
+        try:
+            router.invoke("hi")
+        except RuntimeError:
+            pass
+    assert router.health["flaky"].error_rate == 0.5
+    assert router.health["flaky"].state == ProviderHealth.OPEN
+
+
+def test_fails_over_to_healthy_provider():
+    bad, good = FakeClient("bad", fail=True), FakeClient("good")
+    router = make_router(bad, good, max_consecutive_failures=1)
+    for _ in range(5):
+        assert router.invoke("hi") == "good: hi"
+    # 第一次失败后熔断，之后只走健康的供应商
+    assert bad.calls <= 1
+    if bad.calls:
+        assert router.health["bad"].state == ProviderHealth.OPEN
+
+
+def test_half_open_allows_a_single_probe():
+    bad = FakeClient("bad", fail=True)
+    router = make_router(bad, max_consecutive_failures=1)
+    with pytest.raises(RuntimeError):
+        router.invoke("hi")
+    assert router._pick(set()) is None
+
+    expire_cooldown(router, "bad")
+    assert router._pick(set()) == "bad"
+    assert router.health["bad"].state == ProviderHealth.HALF_OPEN
+    # 探测请求在途时不再放行第二个请求
+    assert router._pick(set()) is None
+
+
+def test_probe_success_closes_and_resets_samples():
+    client = FakeClient("p", fail=True)
+    router = make_router(client, max_consecutive_failures=2)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            router.invoke("hi")
+    assert router.health["p"].state == ProviderHealth.OPEN
+
+    expire_cooldown(router, "p")
+    client.fail = False
+    assert router.invoke("hi") == "p: hi"
+    health = router.health["p"]
+    assert health.state == ProviderHealth.CLOSED
+    assert health.consecutive_failures == 0
+    assert len(health.samples) == 1 and health.error_rate == 0.0
+
+
+def test_probe_failure_reopens():
+    client = FakeClient("p", fail=True)
+    router = make_router(client, max_consecutive_failures=1)
+    with pytest.raises(RuntimeError):
+        router.invoke("hi")
+    expire_cooldown(router, "p")
+    opened_at = router.health["p"].opened_at
+
+    with pytest.raises(RuntimeError, match="p down"):
+        router.invoke("hi")
+    health = router.health["p"]
+    assert health.state == ProviderHealth.OPEN
+    assert health.opened_at > opened_at
+    assert not health.probe_in_flight
+
+
+def test_cancelled_probe_releases_the_slot():
+    class SlowClient(FakeClient):
+        async def ainvoke(self, input, config=None, **kwargs):
+            await asyncio.sleep(10)
+
+    client = SlowClient("slow")
+    router = make_router(client)
+    router.health["slow"].state = ProviderHealth.OPEN
+    expire_cooldown(router, "slow")
+
+    async def run():
+        task = asyncio.create_task(router.ainvoke("hi"))
+        await asyncio.sleep(0.01)
+        assert router.health["slow"].probe_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    health = router.health["slow"]
+    assert health.state == ProviderHealth.HALF_OPEN
+    assert not health.probe_in_flight
+    # 取消不算作失败
+    assert len(health.samples) == 0